@@ -1,13 +1,30 @@
 import streamlit as st
 import os
-from langchain_core.tracers.context import collect_runs
-from langsmith import Client
-from streamlit_feedback import streamlit_feedback
-from utils import get_business_name_chain, initialize_vector_stores
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from utils import LiveNameIndexes, get_business_name_chain, initialize_vector_stores
+from hate_matcher import HateTermMatcher
+from name_extractor import extraction_path_stats
+from llm_cache import SQLiteLLMCache, stream_cached_chain
+from result_cache import AnalysisResultCache
+from chat_history import ChatHistory, ChatHistoryStore
+from metrics import (
+    collect_spans,
+    count_sdk_retries,
+    register_cache,
+    register_counts,
+    span,
+    span_summary,
+    start_metrics_server
+)
+from embedding_providers import backend_requires_openai_key, get_embedding_backend
+from chroma_server import get_chroma_server_url, server_health
 from business_validator import (
-    extract_business_name_from_query, 
+    extract_and_analyze_business_name, 
     analyze_business_name, 
-    display_analysis_results
+    display_analysis_results,
+    is_cacheable_result
 )
 
 # ============================================================================
@@ -18,7 +35,11 @@ os.environ["LANGCHAIN_ENDPOINT"] = "https://api.smith.langchain.com"
 os.environ["LANGCHAIN_API_KEY"] = st.secrets.get("LANGSMITH_API_KEY", "")
 os.environ["LANGCHAIN_PROJECT"] = "legal-rne"
 
-client = Client()
+@st.cache_resource
+def get_langsmith_client():
+    """LangSmith client, created on first feedback rather than at import"""
+    from langsmith import Client
+    return Client()
 
 # ============================================================================
 # CONFIGURATION
@@ -32,45 +53,239 @@ st.set_page_config(
 # ============================================================================
 # INITIALIZE COMPONENTS
 # ============================================================================
+def prime_embeddings(embeddings):
+    """Send one tiny embedding request, so the first user query reuses an open connection"""
+    # Go around the embedding cache, which would answer without a request
+    getattr(embeddings, "embeddings", embeddings).embed_query("warm-up")
+
+def warm_up_components(openai_key, groq_key, backend, server_url=None):
+    """Open the stores and collections, prime the embedding connection and build the in-memory indexes.
+
+    Runs on the warm-up thread, without Streamlit calls. Returns a dict of
+    components, or None when the keys for the configured backend are missing.
+    """
+    if not groq_key or (backend_requires_openai_key(backend) and not openai_key):
+        return None
+    
+    # Initialize vector stores (companies and hate words) and open their collections
+    companies_store, hate_store = initialize_vector_stores(openai_key, backend, server_url)
+    if not companies_store:
+        raise RuntimeError("Could not open the vector stores")
+    companies_store._collection.count()
+    hate_store._collection.count()
+    
+    try:
+        prime_embeddings(companies_store.embeddings)
+    except Exception as e:
+        print(f"Error priming embeddings: {str(e)}")
+    
+    # Initialize LLM
+    from langchain_groq import ChatGroq
+    llm = ChatGroq(
+        temperature=0.1,
+        model="llama-3.3-70b-versatile",
+        api_key=groq_key,
+        verbose=False,
+        max_retries=2,
+    )
+    
+    result_cache = AnalysisResultCache.for_stores(companies_store, hate_store)
+    registry_version = result_cache.current_stamp()
+    
+    # The indexes and caches only speed checks up: without one, checks fall back to the vector stores
+    name_indexes, name_index, fuzzy_index = None, None, None
+    try:
+        name_indexes = LiveNameIndexes(companies_store)
+        name_index, fuzzy_index = name_indexes.indexes()
+    except Exception as e:
+        print(f"Error building name indexes: {str(e)}")
+    
+    hate_matcher = None
+    try:
+        hate_matcher = HateTermMatcher(hate_store)
+    except Exception as e:
+        print(f"Error compiling hate terms: {str(e)}")
+    
+    llm_cache = None
+    try:
+        llm_cache = SQLiteLLMCache("./chroma_db/llm_cache.sqlite3")
+    except Exception as e:
+        print(f"Error opening LLM cache: {str(e)}")
+    
+    components = {
+        'companies_store': companies_store,
+        'hate_store': hate_store,
+        'llm': llm,
+        'name_index': name_index,
+        'fuzzy_index': fuzzy_index,
+        'name_indexes': name_indexes,
+        'hate_matcher': hate_matcher,
+        'llm_cache': llm_cache,
+        'result_cache': result_cache,
+        'registry_version': registry_version
+    }
+    return components
+
 @st.cache_resource
-def initialize_components():
-    """Initialize all components including vector stores"""
+def start_warm_up():
+    """Start warming up the components on a background thread, once per process.
+
+    The page renders while the stores open and the indexes build; only a
+    request that needs them waits on the returned future.
+    """
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="warm-up")
+    future = executor.submit(
+        warm_up_components,
+        st.secrets.get("OPENAI_API_KEY"),
+        st.secrets.get("GROQ_API_KEY"),
+        get_embedding_backend(st.secrets),
+        get_chroma_server_url(st.secrets)
+    )
+    executor.shutdown(wait=False)
+    return future
+
+def load_components(warm_up):
+    """Wait for the warm-up; name indexes are brought up to date if the registry changed since"""
     try:
-        openai_key = st.secrets.get("OPENAI_API_KEY")
-        groq_key = st.secrets.get("GROQ_API_KEY")
-        
-        if not openai_key or not groq_key:
-            return None, None, None, False
-        
-        # Initialize vector stores (companies and hate words)
-        companies_store, hate_store = initialize_vector_stores(openai_key)
-        
-        # Initialize LLM
-        from langchain_groq import ChatGroq
-        llm = ChatGroq(
-            temperature=0.1,
-            model="llama-3.3-70b-versatile",
-            api_key=groq_key,
-            verbose=False,
-            max_retries=2,
-        )
-        
-        return companies_store, hate_store, llm, True
+        with st.spinner("Opening the business registry..."):
+            components = warm_up.result()
     except Exception as e:
         st.error(f"Initialization error: {str(e)}")
-        return None, None, None, False
+        return None
+    if components is None:
+        return None
+    
+    registry_version = components['result_cache'].current_stamp()
+    if registry_version != components['registry_version'] and components['name_indexes'] is not None:
+        components = dict(components)
+        try:
+            with st.spinner("Indexing registered names..."):
+                components['name_indexes'].refresh()
+        except Exception as e:
+            print(f"Error refreshing name indexes: {str(e)}")
+        components['name_index'], components['fuzzy_index'] = components['name_indexes'].indexes()
+    return components
 
-def render_sidebar(companies_store, hate_store):
-    """Render the sidebar with status and controls"""
-    with st.sidebar:
-        st.header("📊 System Status")
+@st.cache_data(ttl=60, show_spinner=False)
+def collection_counts(_companies_store, _hate_store, registry_version=None):
+    """Company and hate word counts, refreshed when the registry version changes or after a minute"""
+    return (
+        _companies_store._collection.count() if _companies_store else 0,
+        _hate_store._collection.count() if _hate_store else 0
+    )
+
+@st.cache_data(ttl=15, show_spinner=False)
+def vector_store_health(server_url):
+    """Heartbeat of the Chroma server the stores live in, checked at most every 15 seconds"""
+    return server_health(server_url)
+
+@st.cache_resource
+def load_consultation_chain(_llm, _llm_cache=None):
+    """Build the consultation chain once per process"""
+    return get_business_name_chain(_llm, None, _llm_cache)
+
+@st.cache_resource
+def start_metrics_endpoint(_companies_store, _llm_cache=None, _result_cache=None):
+    """Serve Prometheus metrics on METRICS_PORT (default 9108, 0 disables) once per process"""
+    count_sdk_retries()
+    embeddings = _companies_store.embeddings if _companies_store else None
+    for name, cache in (("embedding", embeddings), ("llm", _llm_cache), ("result", _result_cache)):
+        if hasattr(cache, "stats"):
+            register_cache(name, cache)
+    register_counts(
+        "denomination_name_extractions_total", "Business name extractions by path",
+        "path", lambda: extraction_path_stats()['counts']
+    )
+    if hasattr(_companies_store, "source_stats"):
+        register_counts(
+            "denomination_company_searches_total", "Company similarity queries by source (snapshot or chroma)",
+            "source", _companies_store.source_stats
+        )
+    
+    port = int(os.getenv("METRICS_PORT", "9108"))
+    if not port:
+        return None
+    try:
+        return start_metrics_server(port, os.getenv("METRICS_HOST", "127.0.0.1"))
+    except OSError as e:
+        print(f"Metrics endpoint unavailable on port {port}: {str(e)}")
+        return None
+
+@contextmanager
+def traced_request(name, inputs):
+    """LangSmith run for one chat request, with its stage spans attached as run metadata"""
+    from langsmith import trace
+    
+    with collect_spans() as spans, trace(name, inputs=inputs) as run:
+        try:
+            with span("request"):
+                yield run
+        finally:
+            run.add_metadata({"stage_ms": span_summary(spans), "spans": spans})
+
+def timed_stream(chunks, timings):
+    """Pass chunks through, recording time to first token and total time in timings"""
+    start = time.perf_counter()
+    for chunk in chunks:
+        if 'first_token' not in timings:
+            timings['first_token'] = time.perf_counter() - start
+        yield chunk
+    timings['total'] = time.perf_counter() - start
+
+def render_system_status(status, companies_store, hate_store, llm_cache=None, result_cache=None,
+                         registry_version=None):
+    """Fill the sidebar status container with collection counts and cache statistics"""
+    with status:
         try:
-            company_count = companies_store._collection.count() if companies_store else 0
-            hate_count = hate_store._collection.count() if hate_store else 0
+            company_count, hate_count = collection_counts(companies_store, hate_store, registry_version)
             st.success(f"🏢 Companies: {company_count:,}")
             st.success(f"🛡️ Hate words: {hate_count:,}")
+            
+            server_url = get_chroma_server_url(st.secrets)
+            if server_url:
+                health = vector_store_health(server_url)
+                if health["status"] == "ok":
+                    st.caption(f"🗄️ Vector store server: {server_url} ({health['latency_ms']:.0f}ms)")
+                else:
+                    st.warning(f"🗄️ Vector store server unreachable: {server_url}")
+            
+            embeddings = companies_store.embeddings if companies_store else None
+            if hasattr(embeddings, "stats"):
+                cache_stats = embeddings.stats()
+                st.caption(
+                    f"🧠 Embedding cache: {cache_stats['hits']:,} hits / "
+                    f"{cache_stats['misses']:,} misses ({cache_stats['hit_rate']:.0%})"
+                )
+            
+            if llm_cache is not None:
+                llm_stats = llm_cache.stats()
+                st.caption(
+                    f"💾 LLM cache: {llm_stats['hits']:,} hits / "
+                    f"{llm_stats['misses']:,} misses ({llm_stats['hit_rate']:.0%})"
+                )
+            
+            if result_cache is not None:
+                result_stats = result_cache.stats()
+                st.caption(
+                    f"📋 Result cache: {result_stats['hits']:,} hits / "
+                    f"{result_stats['misses']:,} misses ({result_stats['hit_rate']:.0%})"
+                )
+            
+            extraction_stats = extraction_path_stats()
+            if extraction_stats['total']:
+                st.caption(
+                    f"⚡ Name extraction: {extraction_stats['counts'].get('rules', 0):,} by rules / "
+                    f"{extraction_stats['counts'].get('llm', 0):,} by LLM "
+                    f"({extraction_stats['rules_rate']:.0%} without LLM)"
+                )
         except:
             st.error("📊 Database connection failed")
+
+def render_sidebar():
+    """Render the sidebar controls; returns them with the (still empty) status container"""
+    with st.sidebar:
+        st.header("📊 System Status")
+        status = st.container()
         
         st.markdown("---")
         st.markdown("### 🔣 Validation Rules")
@@ -105,54 +320,120 @@ def render_sidebar(companies_store, hate_store):
         if st.button("🚫 Inappropriate", key="test_inappropriate", use_container_width=True):
             test_queries["inappropriate"] = "BadWordTech available?"
         
-        return feedback_option, test_queries
+        return feedback_option, test_queries, status
 
-def handle_test_query(test_query, companies_store, hate_store, llm):
+# ============================================================================
+# RESULT PANELS
+# ============================================================================
+
+# Analysis results memoized per session (by name and registry version)
+SESSION_ANALYSES_LIMIT = 64
+
+def session_analysis(business_name, components):
+    """analyze_business_name for this session, memoized until the registry or hate list changes"""
+    analyses = st.session_state.setdefault("analyses", {})
+    key = (business_name, components['result_cache'].current_stamp())
+    if key in analyses:
+        return analyses[key]
+    
+    analysis_result = analyze_business_name(
+        business_name, components['companies_store'], components['hate_store'], components['llm'],
+        components['name_index'], fuzzy_index=components['fuzzy_index'],
+        hate_matcher=components['hate_matcher'], result_cache=components['result_cache']
+    )
+    # Degraded and partial results are not memoized, so the next rerun checks again
+    if is_cacheable_result(analysis_result):
+        analyses[key] = analysis_result
+        while len(analyses) > SESSION_ANALYSES_LIMIT:
+            analyses.pop(next(iter(analyses)))
+    return analysis_result
+
+def add_analysis_message(business_name, analysis_result, result_cache=None):
+    """Add an analysis to the chat history as an assistant message with a result panel; returns the message"""
+    if result_cache is not None and is_cacheable_result(analysis_result):
+        analyses = st.session_state.setdefault("analyses", {})
+        analyses[(business_name, result_cache.current_stamp())] = analysis_result
+    return st.session_state.history.append({
+        "role": "assistant",
+        "content": f"Analyzed business name: {business_name}",
+        "checks": [[business_name, analysis_result]]
+    })
+
+@st.fragment
+def render_analysis_panel(seq):
+    """The result panel of a chat message: the analysis and every alternative checked from it.
+
+    A fragment, so clicking an alternative reruns this panel only: the
+    sidebar, the chat history and the other panels are left as they are.
+    """
+    message = st.session_state.history.message(seq)
+    checks = message.get("checks") if message else None
+    if not checks:
+        return
+    
+    for i, (business_name, analysis_result) in enumerate(checks):
+        if i:
+            st.markdown("---")
+        alternative = display_analysis_results(business_name, analysis_result, key_prefix=f"panel{seq}_{i}_")
+        # A checked alternative is appended, so this loop draws it next
+        if alternative and alternative not in [name for name, _ in checks]:
+            components = load_components(start_warm_up())
+            if components:
+                checks.append([alternative, session_analysis(alternative, components)])
+
+def handle_test_query(test_query, companies_store, hate_store, llm, name_index=None, fuzzy_index=None,
+                      hate_matcher=None, llm_cache=None, result_cache=None):
     """Handle test query processing"""
-    st.session_state.messages.append({"role": "user", "content": test_query})
+    st.session_state.history.append({"role": "user", "content": test_query})
     
     with st.chat_message("assistant", avatar="🤖"):
-        business_name = extract_business_name_from_query(test_query, llm)
+        business_name, analysis_result = extract_and_analyze_business_name(
+            test_query, companies_store, hate_store, llm, name_index,
+            fuzzy_index=fuzzy_index, hate_matcher=hate_matcher, llm_cache=llm_cache,
+            result_cache=result_cache
+        )
         if business_name:
-            analysis_result = analyze_business_name(business_name, companies_store, hate_store, llm)
-            alternative_to_check = display_analysis_results(business_name, analysis_result)
-            
-            if alternative_to_check:
-                st.session_state.check_alternative = alternative_to_check
-                st.rerun()
-            
-            response_content = f"Analyzed business name: {business_name}"
+            message = add_analysis_message(business_name, analysis_result, result_cache)
+            render_analysis_panel(message["seq"])
         else:
             response_content = "Test query processed"
             st.markdown(response_content)
-    
-    st.session_state.messages.append({"role": "assistant", "content": response_content})
+            st.session_state.history.append({"role": "assistant", "content": response_content})
 
-def handle_user_input(prompt, companies_store, hate_store, llm):
+def handle_user_input(prompt, companies_store, hate_store, llm, name_index=None, fuzzy_index=None,
+                      hate_matcher=None, llm_cache=None, result_cache=None):
     """Handle user input and generate response"""
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    st.session_state.history.append({"role": "user", "content": prompt})
     with st.chat_message("user", avatar="👤"):
         st.markdown(prompt)
     
+    from langchain_core.tracers.context import collect_runs
+    
     with st.chat_message("assistant", avatar="🤖"):
-        with collect_runs() as cb:
-            business_name = extract_business_name_from_query(prompt, llm)
+        with collect_runs() as cb, traced_request("handle_user_input", {"query": prompt}):
+            with span("extract_and_analyze"):
+                business_name, analysis_result = extract_and_analyze_business_name(
+                    prompt, companies_store, hate_store, llm, name_index,
+                    fuzzy_index=fuzzy_index, hate_matcher=hate_matcher, llm_cache=llm_cache,
+                    result_cache=result_cache
+                )
             
             if business_name:
-                analysis_result = analyze_business_name(business_name, companies_store, hate_store, llm)
-                alternative_to_check = display_analysis_results(business_name, analysis_result)
-                
-                if alternative_to_check:
-                    st.session_state.check_alternative = alternative_to_check
-                    st.rerun()
-                
-                response_content = f"Analyzed business name: {business_name}"
+                message = add_analysis_message(business_name, analysis_result, result_cache)
+                with span("display"):
+                    render_analysis_panel(message["seq"])
             else:
                 try:
-                    chain = get_business_name_chain(llm, companies_store)
-                    response = chain.invoke({"query": prompt})
-                    response_content = response.content if hasattr(response, 'content') else str(response)
-                    st.markdown(response_content)
+                    chain = load_consultation_chain(llm, llm_cache)
+                    timings = {}
+                    with span("consultation"):
+                        response_content = st.write_stream(
+                            timed_stream(stream_cached_chain(chain, {"query": prompt}), timings)
+                        )
+                    if 'first_token' in timings and 'total' in timings:
+                        st.caption(
+                            f"⏱️ First token {timings['first_token']:.2f}s · total {timings['total']:.2f}s"
+                        )
                 except Exception as e:
                     response_content = f"""I'm here to help with business name validation! 
 
@@ -166,18 +447,16 @@ You can:
 
 What would you like to know?"""
                     st.markdown(response_content)
+                st.session_state.history.append({"role": "assistant", "content": response_content})
         
         if cb.traced_runs:
             st.session_state.run_id = cb.traced_runs[0].id
-    
-    st.session_state.messages.append({
-        "role": "assistant", 
-        "content": response_content
-    })
 
 def handle_feedback(feedback_option):
     """Handle user feedback submission"""
     if st.session_state.get("run_id"):
+        from streamlit_feedback import streamlit_feedback
+        
         run_id = st.session_state.run_id
         feedback = streamlit_feedback(
             feedback_type=feedback_option,
@@ -197,7 +476,7 @@ def handle_feedback(feedback_option):
             if score is not None:
                 feedback_type_str = f"{feedback_option} {feedback['score']}"
                 try:
-                    feedback_record = client.create_feedback(
+                    feedback_record = get_langsmith_client().create_feedback(
                         run_id,
                         feedback_type_str,
                         score=score,
@@ -211,11 +490,28 @@ def handle_feedback(feedback_option):
                 except Exception as e:
                     st.error(f"Feedback error: {str(e)}")
 
+# ============================================================================
+# CHAT HISTORY
+# ============================================================================
+
+# Messages a session keeps in memory; older ones are paged out to the chat history store
+HISTORY_CAPACITY = 40
+
+# Messages rendered on a rerun, and how many more each "load earlier" click adds
+HISTORY_WINDOW = 20
+HISTORY_PAGE = 20
+
+@st.cache_resource
+def load_chat_history_store():
+    """Open the store of paged-out chat messages once per process"""
+    return ChatHistoryStore()
+
 def initialize_chat_history():
     """Initialize chat history if not exists"""
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
-        st.session_state.messages.append({
+    if "history" not in st.session_state:
+        st.session_state.history = ChatHistory(load_chat_history_store(), capacity=HISTORY_CAPACITY)
+        st.session_state.history_window = HISTORY_WINDOW
+        st.session_state.history.append({
             "role": "assistant", 
             "content": """مرحباً! 👋 أنا مساعدك الذكي للتحقق من توفر أسماء الشركات في تونس.
 
@@ -237,48 +533,70 @@ def main():
     st.title("🏢 Business Name Checker AI Assistant")
     st.markdown("### 🤖 Intelligent Business Name Validation for Tunisia RNE")
     
-    # Initialize components
-    companies_store, hate_store, llm, components_loaded = initialize_components()
-    
-    if not components_loaded:
-        st.error("❌ Failed to initialize components. Please check your configuration.")
-        st.stop()
+    # Components warm up in the background while the page renders
+    warm_up = start_warm_up()
     
     # Render sidebar and get controls
-    feedback_option, test_queries = render_sidebar(companies_store, hate_store)
-    
-    # Handle test queries
-    for test_type, test_query in test_queries.items():
-        handle_test_query(test_query, companies_store, hate_store, llm)
-        st.rerun()
+    feedback_option, test_queries, status = render_sidebar()
     
     # Initialize chat history
     initialize_chat_history()
     
-    # Display chat history
-    for message in st.session_state.messages:
+    prompt = st.chat_input("Ask me about business names, or tell me a name to check...")
+    
+    # Display the recent chat history; earlier messages load on demand
+    history = st.session_state.history
+    if test_queries or prompt:
+        # A new question collapses the history back to the recent window
+        history.release()
+        st.session_state.history_window = HISTORY_WINDOW
+    earlier = len(history) - st.session_state.history_window
+    if earlier > 0 and st.button(f"⬆️ Load earlier messages ({earlier:,} more)", key="load_earlier"):
+        st.session_state.history_window += HISTORY_PAGE
+    for message in history.window(st.session_state.history_window):
         avatar = "🤖" if message["role"] == "assistant" else "👤"
         with st.chat_message(message["role"], avatar=avatar):
-            st.markdown(message["content"])
+            if message.get("checks"):
+                render_analysis_panel(message["seq"])
+            else:
+                st.markdown(message["content"])
     
-    # Handle chat input
-    if prompt := st.chat_input("Ask me about business names, or tell me a name to check..."):
-        handle_user_input(prompt, companies_store, hate_store, llm)
+    # Nothing to answer yet: render without waiting for the warm-up
+    if not (test_queries or prompt) and not warm_up.done():
+        status.info("⏳ Opening the business registry...")
+        handle_feedback(feedback_option)
+        return
     
-    # Handle alternative checking
-    if 'check_alternative' in st.session_state:
-        alternative = st.session_state.check_alternative
-        del st.session_state.check_alternative
-        
-        st.session_state.messages.append({"role": "user", "content": f"Check: {alternative}"})
-        with st.chat_message("assistant", avatar="🤖"):
-            analysis_result = analyze_business_name(alternative, companies_store, hate_store, llm)
-            display_analysis_results(alternative, analysis_result)
-        
-        st.session_state.messages.append({
-            "role": "assistant", 
-            "content": f"Checked alternative: {alternative}"
-        })
+    # Initialize components
+    components = load_components(warm_up)
+    if not components:
+        st.error("❌ Failed to initialize components. Please check your configuration.")
+        st.stop()
+    
+    companies_store, hate_store, llm = components['companies_store'], components['hate_store'], components['llm']
+    name_index, fuzzy_index = components['name_index'], components['fuzzy_index']
+    hate_matcher, llm_cache, result_cache = (
+        components['hate_matcher'], components['llm_cache'], components['result_cache']
+    )
+    start_metrics_endpoint(companies_store, llm_cache, result_cache)
+    render_system_status(
+        status, companies_store, hate_store, llm_cache, result_cache, result_cache.current_stamp()
+    )
+    
+    # Handle test queries
+    for test_type, test_query in test_queries.items():
+        handle_test_query(
+            test_query, companies_store, hate_store, llm, name_index, fuzzy_index, hate_matcher, llm_cache,
+            result_cache
+        )
+        st.rerun()
+    
+    # Handle chat input
+    if prompt:
+        handle_user_input(
+            prompt, companies_store, hate_store, llm, name_index, fuzzy_index, hate_matcher, llm_cache,
+            result_cache
+        )
     
     # Handle feedback
     handle_feedback(feedback_option)
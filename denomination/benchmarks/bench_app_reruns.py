@@ -0,0 +1,186 @@
+"""Benchmark: wall time of the Streamlit app's reruns per chat interaction.
+
+Starts `streamlit run app.py` against a synthetic registry (local embedding
+backend, no API key needed) and drives it over the same websocket protocol
+as the browser. Each round submits a chat prompt naming a company with
+special characters (blocked, with clean alternatives), clicks a suggested
+alternative in the result panel, then clicks it again (nothing new to
+analyze). Every rerun is timed from the request to the server's "script
+finished" message. The chat history grows with each round, as it does for
+a user, and clicks inside a fragment are sent as fragment reruns, as the
+browser does.
+
+Requires the websockets package (pip install websockets).
+
+Usage (from the denomination/ directory):
+    python benchmarks/bench_app_reruns.py --registry-size 20000 --rounds 8
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_pipeline import ACTIVITIES, FRESH_ROOTS, percentile
+from profile_cold_start import seed_registry
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_app(workdir, port):
+    """Run the app headless from workdir (its chroma_db and .streamlit/secrets.toml)"""
+    os.makedirs(os.path.join(workdir, ".streamlit"), exist_ok=True)
+    with open(os.path.join(workdir, ".streamlit", "secrets.toml"), "w", encoding="utf-8") as f:
+        f.write('GROQ_API_KEY = "bench"\nEMBEDDING_BACKEND = "local"\n')
+    return subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(APP_DIR, "app.py"),
+         "--server.headless", "true", "--server.port", str(port), "--browser.gatherUsageStats", "false"],
+        cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env={**os.environ, "METRICS_PORT": "0", "PYTHONWARNINGS": "ignore"}
+    )
+
+class AppSession:
+    """One browser session: sends reruns and collects the widgets and alerts they render"""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.widgets = {}
+        self.alerts = []
+        self.analyzed = []
+
+    async def rerun(self, widget_states=None, fragment_id=""):
+        """Request a rerun; returns its wall time in seconds once the server reports it finished"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.fragment_id = fragment_id
+        for state in widget_states or []:
+            message.rerun_script.widget_states.widgets.add().CopyFrom(state)
+        if not fragment_id:
+            self.widgets = {}
+        self.alerts = []
+        self.analyzed = []
+
+        start = time.perf_counter()
+        await self.websocket.send(message.SerializeToString())
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await self.websocket.recv())
+            kind = forward.WhichOneof("type")
+            if kind == "delta" and forward.delta.WhichOneof("type") == "new_element":
+                element = forward.delta.new_element
+                element_type = element.WhichOneof("type")
+                if element_type in ("button", "chat_input"):
+                    widget = getattr(element, element_type)
+                    self.widgets[widget.id] = (element_type, getattr(widget, "label", ""), forward.delta.fragment_id)
+                elif element_type == "alert":
+                    self.alerts.append(element.alert.body)
+                elif element_type == "markdown" and element.markdown.body.startswith("### 🎯 Analyzing:"):
+                    self.analyzed.append(element.markdown.body)
+            elif kind == "script_finished" and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return time.perf_counter() - start
+
+    def widget(self, element_type, key_part=""):
+        """(id, fragment_id) of the last rendered widget of this type whose ID (which ends with its key) has key_part"""
+        found = None
+        for widget_id, (kind, _, fragment_id) in self.widgets.items():
+            if kind == element_type and key_part in widget_id:
+                found = (widget_id, fragment_id)
+        return found
+
+    async def submit_chat(self, text):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        widget_id, _ = self.widget("chat_input")
+        state = WidgetState(id=widget_id)
+        state.chat_input_value.data = text
+        return await self.rerun([state])
+
+    async def click(self, widget_id, fragment_id):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        return await self.rerun([WidgetState(id=widget_id, trigger_value=True)], fragment_id)
+
+async def drive(port, rounds, timeout):
+    import websockets
+
+    async with websockets.connect(
+        f"ws://127.0.0.1:{port}/_stcore/stream", subprotocols=["streamlit"], max_size=None
+    ) as websocket:
+        session = AppSession(websocket)
+        start = time.perf_counter()
+        await session.rerun()
+        while any("Opening the business registry" in alert for alert in session.alerts):
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError("The app did not finish warming up")
+            await asyncio.sleep(0.2)
+            await session.rerun()
+
+        timings = {"prompt": [], "alternative": [], "repeat_click": []}
+        clicks = {"fragment": 0, "checked": 0}
+        for i in range(rounds):
+            # Special characters block the name and offer clean alternatives to click
+            name = f"{FRESH_ROOTS[i % len(FRESH_ROOTS)]}@{ACTIVITIES[i % len(ACTIVITIES)][0]}#{i + 1}"
+            timings["prompt"].append(await session.submit_chat(f"Check {name}"))
+            button = session.widget("button", "_alt_")
+            if button is None:
+                print(f"  round {i + 1}: no alternative offered for {name}")
+                continue
+            label = session.widgets[button[0]][1]
+            timings["alternative"].append(await session.click(*button))
+            clicks["fragment"] += bool(button[1])
+            clicks["checked"] += any(label[2:] in body for body in session.analyzed)
+            timings["repeat_click"].append(await session.click(*button))
+        return timings, clicks
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--registry-size", type=int, default=20000, help="Synthetic registry size to seed")
+    parser.add_argument("--rounds", type=int, default=8, help="Prompt + alternative click rounds")
+    parser.add_argument("--workdir", help="Run against this directory's chroma_db instead of a seeded scratch one")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds to wait for the warm-up")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        workdir = os.path.abspath(args.workdir or scratch_dir)
+        if not args.workdir:
+            os.chdir(workdir)
+            seed_registry(args.registry_size)
+        port = free_port()
+        server = start_app(workdir, port)
+        try:
+            for _ in range(100):
+                try:
+                    socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                    break
+                except OSError:
+                    time.sleep(0.2)
+            timings, clicks = asyncio.run(drive(port, args.rounds, args.timeout))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"\n{args.rounds} rounds, {args.registry_size:,} companies "
+          f"({clicks['fragment']} of {len(timings['alternative'])} alternative clicks ran as fragment reruns, "
+          f"{clicks['checked']} rendered the alternative's analysis)")
+    for kind, values in timings.items():
+        if values:
+            # Rerun cost as the history grows: the first tenth of the rounds against the last tenth
+            tenth = max(1, len(values) // 10)
+            first, last = statistics.median(values[:tenth]), statistics.median(values[-tenth:])
+            values = sorted(values)
+            print(f"  {kind:<13} p50 {percentile(values, 0.50) * 1000:8.1f} ms | "
+                  f"mean {statistics.mean(values) * 1000:8.1f} ms | max {values[-1] * 1000:8.1f} ms | "
+                  f"first/last tenth {first * 1000:6.1f} / {last * 1000:6.1f} ms")
@@ -0,0 +1,409 @@
+"""Benchmark suite: per-stage latency of the denomination pipeline on synthetic registries.
+
+Builds deterministic bilingual registries (10K, 100K and 1M names by default)
+with local hashing embeddings and a fake extraction LLM, so runs need no API
+key and give the same inputs on every machine. Each stage is timed per call:
+check_special_characters, the hate check, check_business_similarity, name
+extraction, generate_alternatives and the end-to-end analyze_business_name.
+p50/p95/p99, throughput and peak RSS are printed and saved as JSON; compare
+two runs to spot regressions between commits.
+
+Peak RSS is the process peak so far; run one size per process for per-size
+memory figures. Registries are rebuilt on every run unless --data-dir is set.
+
+Usage (from the denomination/ directory):
+    python benchmarks/bench_pipeline.py --sizes 10000,100000 --queries 500
+    python benchmarks/bench_pipeline.py --sizes 10000 --compare benchmarks/results/pipeline-abc1234.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_chroma import Chroma
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from business_validator import (
+    analyze_business_name,
+    check_business_similarity,
+    check_hate_words_similarity,
+    check_special_characters,
+    extract_business_name_from_query,
+    generate_alternatives
+)
+from embedding_providers import HashingEmbeddings
+from hate_matcher import HateTermMatcher
+from ingest import peak_rss_mb, write_company_records
+from name_extractor import extract_business_name_rules, extraction_path_stats
+from result_cache import use_registry_versions
+from utils import build_name_indexes
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+
+# ============================================================================
+# SYNTHETIC REGISTRY
+# ============================================================================
+
+# (French, Arabic) word pairs; every (root, activity, city) combination is one name
+ROOTS = [
+    ("Nour", "النور"), ("Avenir", "المستقبل"), ("Amal", "الأمل"), ("Yasmine", "الياسمين"),
+    ("Zitouna", "الزيتونة"), ("Carthage", "قرطاج"), ("Atlas", "الأطلس"), ("Sahel", "الساحل"),
+    ("Medina", "المدينة"), ("Salam", "السلام"), ("Baraka", "البركة"), ("Nakhla", "النخلة"),
+    ("Hilal", "الهلال"), ("Najma", "النجمة"), ("Rayhana", "الريحانة"), ("Fajr", "الفجر"),
+    ("Wafa", "الوفاء"), ("Ikhlas", "الإخلاص"), ("Rimal", "الرمال"), ("Bahr", "البحر"),
+    ("Jabal", "الجبل"), ("Wadi", "الوادي"), ("Khadra", "الخضراء"), ("Oasis", "الواحة"),
+    ("Horizon", "الأفق"), ("Etoile", "النجم"), ("Soleil", "الشمس"), ("Lune", "القمر"),
+    ("Perle", "اللؤلؤة"), ("Jasmin", "الفل"), ("Olivier", "الزيتون"), ("Palmier", "النخيل"),
+    ("Cedre", "الأرز"), ("Ambre", "العنبر"), ("Saphir", "الياقوت"), ("Emeraude", "الزمرد"),
+    ("Corail", "المرجان"), ("Phenix", "العنقاء"),
+]
+ACTIVITIES = [
+    ("Commerce", "للتجارة"), ("Services", "للخدمات"), ("Technologie", "للتكنولوجيا"),
+    ("Informatique", "للإعلامية"), ("Transport", "للنقل"), ("Construction", "للبناء"),
+    ("Immobilier", "للعقارات"), ("Tourisme", "للسياحة"), ("Agriculture", "للفلاحة"),
+    ("Textile", "للنسيج"), ("Conseil", "للاستشارات"), ("Distribution", "للتوزيع"),
+    ("Import Export", "للتوريد والتصدير"), ("Industrie", "للصناعة"), ("Energie", "للطاقة"),
+    ("Sante", "للصحة"), ("Formation", "للتكوين"), ("Logistique", "للخدمات اللوجستية"),
+    ("Peche", "للصيد البحري"), ("Alimentation", "للمواد الغذائية"),
+]
+CITIES = [
+    ("Tunis", "تونس"), ("Sfax", "صفاقس"), ("Sousse", "سوسة"), ("Nabeul", "نابل"),
+    ("Bizerte", "بنزرت"), ("Gabes", "قابس"), ("Kairouan", "القيروان"), ("Monastir", "المنستير"),
+    ("Gafsa", "قفصة"), ("Mahdia", "المهدية"), ("Ariana", "أريانة"), ("Beja", "باجة"),
+    ("Jendouba", "جندوبة"), ("Kef", "الكاف"), ("Medenine", "مدنين"), ("Tozeur", "توزر"),
+]
+PREFIXES = [("Société", "شركة"), ("Entreprise", "مؤسسة"), ("Groupe", "مجمع")]
+LEGAL_FORMS = ["SARL", "SA", "SUARL"]
+STATUSES = ["ACTIF", "ACTIF", "ACTIF", "RADIE"]
+
+# Roots never used by the registry, for names that should come back available
+FRESH_ROOTS = ["Nova", "Zenith", "Orion", "Vega", "Altair", "Lyra", "Sirius", "Kepler", "Helios", "Borealis"]
+
+HATE_TERMS = ["badword1", "offensive2", "inappropriate3"] + [f"prohibited{i}" for i in range(200)]
+SPECIAL_CHARS = "@#$%^*()+=[]{}|\\:;\"<>?/~"
+
+def synthetic_company(i, seed=42):
+    """Deterministic bilingual company record for registry index i"""
+    rng = random.Random(seed * 1_000_003 + i)
+    root, activity, city = (
+        ROOTS[i % len(ROOTS)],
+        ACTIVITIES[(i // len(ROOTS)) % len(ACTIVITIES)],
+        CITIES[(i // (len(ROOTS) * len(ACTIVITIES))) % len(CITIES)],
+    )
+    series = i // (len(ROOTS) * len(ACTIVITIES) * len(CITIES))
+    suffix = f" {series + 1}" if series else ""
+    prefix_fr, prefix_ar = rng.choice(PREFIXES)
+    return {
+        "id": f"B{i:07d}",
+        "nom_fr": f"{prefix_fr} {root[0]} {activity[0]} {city[0]}{suffix}",
+        "nom_ar": f"{prefix_ar} {root[1]} {activity[1]} {city[1]}{suffix}",
+        "forme_juridique": rng.choice(LEGAL_FORMS),
+        "statut": rng.choice(STATUSES),
+    }
+
+def _typo(name, rng):
+    """Name with one character dropped, doubled or swapped"""
+    pos = rng.randrange(1, len(name) - 1)
+    edit = rng.randrange(3)
+    if edit == 0:
+        return name[:pos] + name[pos + 1:]
+    if edit == 1:
+        return name[:pos] + name[pos] + name[pos:]
+    return name[:pos - 1] + name[pos] + name[pos - 1] + name[pos + 1:]
+
+def generate_query_names(size, count, seed=7):
+    """Deterministic mix of registered, misspelled, fresh, invalid and prohibited names"""
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        kind = rng.random()
+        record = synthetic_company(rng.randrange(size))
+        if kind < 0.3:
+            names.append(record[rng.choice(["nom_fr", "nom_ar"])])
+        elif kind < 0.5:
+            names.append(_typo(record["nom_fr"], rng))
+        elif kind < 0.8:
+            names.append(f"{rng.choice(FRESH_ROOTS)} {rng.choice(ACTIVITIES)[0]} {rng.randint(1, 999)}")
+        elif kind < 0.9:
+            name = record["nom_fr"]
+            pos = rng.randint(0, len(name))
+            names.append(name[:pos] + rng.choice(SPECIAL_CHARS) + name[pos:])
+        else:
+            names.append(f"{rng.choice(FRESH_ROOTS)} {rng.choice(HATE_TERMS)} {rng.choice(ACTIVITIES)[0]}")
+    return names
+
+# Queries the rules answer, and phrasings left to the LLM
+EXTRACTION_TEMPLATES = [
+    "Is {} available?",
+    "Check {}",
+    "Can I register '{}'?",
+    'هل اسم "{}" متاح؟',
+    "I was thinking {} maybe",
+    "{} for my new shop, what do you think",
+]
+
+def generate_queries(names, seed=11):
+    """Conversational queries around the query names"""
+    rng = random.Random(seed)
+    return [rng.choice(EXTRACTION_TEMPLATES).format(name) for name in names]
+
+# ============================================================================
+# DETERMINISTIC FAKES
+# ============================================================================
+
+class FakeExtractionLLM(BaseChatModel):
+    """Chat model stand-in answering extraction prompts with the rule-based candidate"""
+    latency_ms: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return "fake-extraction"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        name = extract_business_name_rules(messages[-1].content)["name"] or "NONE"
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=name))])
+
+class SimulatedLatencyEmbeddings(Embeddings):
+    """Wraps local embeddings with a fixed per-request delay, standing in for the API round trip"""
+
+    def __init__(self, embeddings, latency_ms=0.0):
+        self.embeddings = embeddings
+        self.latency = latency_ms / 1000
+
+    def embed_documents(self, texts):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.embeddings.embed_query(text)
+
+# ============================================================================
+# SETUP
+# ============================================================================
+
+def build_stores(size, data_dir, embedding_latency_ms=0.0, chunk_size=5000):
+    """Open (or build) the synthetic companies and hate stores for a registry size"""
+    embeddings = HashingEmbeddings()
+    directory = os.path.join(data_dir, f"registry_{size}")
+    # Writes bump version stamps next to the synthetic registry, never the app's ./chroma_db ones
+    use_registry_versions(os.path.join(directory, "registry_versions.sqlite3"))
+    companies_store = Chroma(
+        collection_name="bench_companies",
+        embedding_function=embeddings,
+        persist_directory=os.path.join(directory, "companies")
+    )
+    hate_store = Chroma(
+        collection_name="bench_hate_words",
+        embedding_function=embeddings,
+        persist_directory=os.path.join(directory, "hate_words")
+    )
+
+    setup = {"reused": companies_store._collection.count() == size}
+    start = time.perf_counter()
+    if not setup["reused"]:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for offset in range(companies_store._collection.count(), size, chunk_size):
+                records = [synthetic_company(i) for i in range(offset, min(offset + chunk_size, size))]
+                write_company_records(companies_store, records, executor)
+    if hate_store._collection.count() != len(HATE_TERMS):
+        hate_store.add_texts(
+            texts=HATE_TERMS, metadatas=[{"type": "synthetic"}] * len(HATE_TERMS), ids=HATE_TERMS
+        )
+    setup["ingest_seconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    name_index, fuzzy_index = build_name_indexes(companies_store)
+    hate_matcher = HateTermMatcher(hate_store)
+    setup["index_seconds"] = time.perf_counter() - start
+
+    # Queries pay the simulated API latency; ingestion above does not
+    if embedding_latency_ms:
+        latency_embeddings = SimulatedLatencyEmbeddings(embeddings, embedding_latency_ms)
+        companies_store._embedding_function = latency_embeddings
+        hate_store._embedding_function = latency_embeddings
+
+    return companies_store, hate_store, name_index, fuzzy_index, hate_matcher, setup
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def time_stage(func, inputs):
+    """Call func on every input; per-call latency percentiles (ms) and throughput"""
+    latencies = []
+    start = time.perf_counter()
+    for value in inputs:
+        call_start = time.perf_counter()
+        func(value)
+        latencies.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "calls": len(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+        "throughput_per_s": len(latencies) / elapsed if elapsed else 0.0,
+    }
+
+def run_size(size, data_dir, queries, llm_latency_ms, embedding_latency_ms):
+    """Build the registry for one size and time every stage over the same queries"""
+    companies_store, hate_store, name_index, fuzzy_index, hate_matcher, setup = build_stores(
+        size, data_dir, embedding_latency_ms
+    )
+    llm = FakeExtractionLLM(latency_ms=llm_latency_ms)
+    names = generate_query_names(size, queries)
+    conversational = generate_queries(names)
+    paths_before = extraction_path_stats()["counts"]
+
+    stages = {
+        "special_characters": time_stage(check_special_characters, names),
+        "hate_check": time_stage(
+            lambda name: check_hate_words_similarity(name, hate_store, hate_matcher=hate_matcher), names
+        ),
+        "similarity": time_stage(
+            lambda name: check_business_similarity(name, companies_store, fuzzy_index=fuzzy_index), names
+        ),
+        "extraction": time_stage(lambda query: extract_business_name_from_query(query, llm), conversational),
+        "alternatives": time_stage(generate_alternatives, names),
+        "analysis": time_stage(
+            lambda name: analyze_business_name(
+                name, companies_store, hate_store, llm, name_index,
+                fuzzy_index=fuzzy_index, hate_matcher=hate_matcher
+            ),
+            names
+        ),
+    }
+
+    paths_after = extraction_path_stats()["counts"]
+    return {
+        "setup": setup,
+        "stages": stages,
+        "extraction_paths": {path: paths_after[path] - paths_before.get(path, 0) for path in paths_after},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def git_revision():
+    """Short commit hash of the working tree, suffixed when there are local changes"""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=BENCHMARKS_DIR
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True, text=True, check=True, cwd=BENCHMARKS_DIR
+        ).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def print_size(size, result):
+    """Print the stage table for one registry size"""
+    setup = result["setup"]
+    built = "reused" if setup["reused"] else f"ingested in {setup['ingest_seconds']:.1f}s"
+    print(f"\n{size:,} names ({built}, indexed in {setup['index_seconds']:.1f}s)")
+    print(f"  {'stage':<20} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'calls/s':>11}")
+    for stage, stats in result["stages"].items():
+        print(f"  {stage:<20} {stats['p50_ms']:9.3f} {stats['p95_ms']:9.3f} {stats['p99_ms']:9.3f} "
+              f"{stats['throughput_per_s']:11,.1f}")
+    paths = ", ".join(f"{path} {count}" for path, count in result["extraction_paths"].items())
+    print(f"  extraction paths: {paths or 'none'}")
+    if result["peak_rss_mb"] is not None:
+        print(f"  peak RSS {result['peak_rss_mb']:,.0f} MB")
+
+def compare_results(baseline, current, threshold, min_delta_ms=0.05):
+    """Print p50/p95 changes against a baseline run; returns the regressed (size, stage, metric) list.
+
+    Slowdowns under min_delta_ms are timer noise on sub-millisecond stages and
+    are not reported as regressions.
+    """
+    regressions = []
+    print(f"\nCompared with {baseline['revision']} ({baseline['created_at']}):")
+    for size, result in current["sizes"].items():
+        baseline_stages = baseline["sizes"].get(size, {}).get("stages", {})
+        for stage, stats in result["stages"].items():
+            if stage not in baseline_stages:
+                continue
+            changes = []
+            for metric in ("p50_ms", "p95_ms"):
+                before, after = baseline_stages[stage][metric], stats[metric]
+                change = (after - before) / before if before else 0.0
+                changes.append(f"{metric[:3]} {change:+.0%}")
+                if change > threshold and after - before > min_delta_ms:
+                    regressions.append((size, stage, metric))
+            print(f"  {int(size):>9,} {stage:<20} {' | '.join(changes)}")
+    for size, stage, metric in regressions:
+        print(f"REGRESSION: {stage} {metric} at {int(size):,} names")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Comma-separated registry sizes")
+    parser.add_argument("--queries", type=int, default=500, help="Query names timed per stage")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="Simulated extraction LLM latency")
+    parser.add_argument("--embedding-latency-ms", type=float, default=0, help="Simulated embedding API latency")
+    parser.add_argument("--data-dir", help="Keep the synthetic registries here and reuse them across runs")
+    parser.add_argument("--output", help="Results JSON path (default: benchmarks/results/pipeline-<commit>.json)")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--regression-threshold", type=float, default=0.2,
+                        help="Relative p50/p95 slowdown reported as a regression (exit status 1)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    revision = git_revision()
+    results = {
+        "revision": revision,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "queries": args.queries,
+            "llm_latency_ms": args.llm_latency_ms,
+            "embedding_latency_ms": args.embedding_latency_ms,
+        },
+        "sizes": {},
+    }
+
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        for size in sizes:
+            results["sizes"][str(size)] = run_size(
+                size, args.data_dir or scratch_dir, args.queries, args.llm_latency_ms, args.embedding_latency_ms
+            )
+            print_size(size, results["sizes"][str(size)])
+
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{revision}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare_results(baseline, results, args.regression_threshold):
+            sys.exit(1)
@@ -0,0 +1,148 @@
+"""Benchmark: memory-mapped vector snapshots against Chroma on a synthetic registry.
+
+Exports the companies collection of a bench_pipeline registry to int8 and
+float16 snapshots, then runs the same query names through Chroma and through
+the snapshot-backed companies store. Reports recall@k
+of each against Chroma's results and against brute-force exact search over
+the float32 vectors (Chroma's HNSW index is approximate too), per-query and
+batched latency, snapshot size on disk and the anonymous (unshareable)
+memory each engine adds to the process. Chroma loads its index on the first
+query, so its figure is only meaningful for a registry reused via --data-dir.
+
+Usage (from the denomination/ directory):
+    python benchmarks/bench_snapshot.py --size 100000 --queries 500 --data-dir /tmp/rne-bench
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import numpy as np
+from langchain_core.documents import Document
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_pipeline import build_stores, generate_query_names, percentile
+from utils import embed_queries, query_store_by_vectors
+from vector_snapshot import SNAPSHOT_DTYPES, attach_snapshot, export_snapshot, snapshot_path
+
+def anonymous_memory_mb():
+    """Anonymous (not file-backed, so never shared between processes) memory of this process in MB, on Linux"""
+    try:
+        with open("/proc/self/smaps_rollup", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("Anonymous:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def hit_ids(hits):
+    return [doc.metadata.get("id") or doc.id for doc, _ in hits]
+
+def exact_search(store, query_embeddings, k):
+    """Brute-force exact (squared L2) search over every vector of a Chroma store"""
+    data = {"ids": [], "embeddings": [], "documents": [], "metadatas": []}
+    while True:
+        page = store._collection.get(
+            include=["embeddings", "documents", "metadatas"], limit=5000, offset=len(data["ids"])
+        )
+        if not page["ids"]:
+            break
+        for key in data:
+            data[key].extend(page[key])
+    matrix = np.asarray(data["embeddings"], dtype=np.float32)
+    results = []
+    for query in np.asarray(query_embeddings, dtype=np.float32):
+        distances = ((matrix - query) ** 2).sum(axis=1)
+        results.append([
+            (Document(page_content=data["documents"][i], metadata=data["metadatas"][i] or {}, id=data["ids"][i]),
+             float(distances[i]))
+            for i in np.argsort(distances)[:k]
+        ])
+    return results
+
+def directory_mb(directory):
+    return sum(
+        os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names
+    ) / (1024 * 1024)
+
+def recall(results, reference, k):
+    """Mean share of the reference top-k IDs found in the results"""
+    return statistics.mean(
+        len(set(found[:k]) & set(expected[:k])) / max(1, min(k, len(expected)))
+        for found, expected in zip(results, reference)
+    )
+
+def time_engine(search, vectors, k, batch_size):
+    """Per-query latency percentiles and batched throughput of search(query_embeddings, k)"""
+    latencies = []
+    results = []
+    for vector in vectors:
+        start = time.perf_counter()
+        results.extend(search([vector], k))
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+
+    start = time.perf_counter()
+    for i in range(0, len(vectors), batch_size):
+        search(vectors[i:i + batch_size], k)
+    elapsed = time.perf_counter() - start
+
+    return results, {
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "batch_per_s": len(vectors) / elapsed if elapsed else 0.0,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=100000, help="Registry size")
+    parser.add_argument("--queries", type=int, default=500, help="Query names")
+    parser.add_argument("--k", type=int, default=5, help="Results per query")
+    parser.add_argument("--batch-size", type=int, default=32, help="Queries per batched search")
+    parser.add_argument("--dtypes", default=",".join(SNAPSHOT_DTYPES), help="Snapshot dtypes to compare")
+    parser.add_argument("--data-dir", help="Keep the synthetic registry here and reuse it across runs")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        data_dir = args.data_dir or scratch_dir
+        companies_store = build_stores(args.size, data_dir)[0]
+        texts = generate_query_names(args.size, args.queries)
+        vectors = embed_queries(companies_store.embeddings, texts)
+        reference = [hit_ids(hits) for hits in exact_search(companies_store, vectors, args.k)]
+
+        before = anonymous_memory_mb()
+        chroma_results, chroma_stats = time_engine(
+            lambda queries, k: query_store_by_vectors(companies_store, queries, k=k), vectors, args.k, args.batch_size
+        )
+        chroma_anonymous = anonymous_memory_mb() - before if before is not None else None
+        chroma_ids = [hit_ids(hits) for hits in chroma_results]
+        print(f"\n{args.size:,} names, {len(texts)} queries, k={args.k}")
+        print(f"  {'engine':<10} {'p50 ms':>8} {'p95 ms':>8} {'batch q/s':>10} {'recall/chroma':>14} "
+              f"{'recall/exact':>13} {'size MB':>8} {'anon MB':>8}")
+        print(f"  {'chroma':<10} {chroma_stats['p50_ms']:8.3f} {chroma_stats['p95_ms']:8.3f} "
+              f"{chroma_stats['batch_per_s']:10,.0f} {1.0:14.3f} {recall(chroma_ids, reference, args.k):13.3f} "
+              f"{'':>8} " + (f"{chroma_anonymous:8,.1f}" if chroma_anonymous is not None else f"{'n/a':>8}"))
+
+        for dtype in args.dtypes.split(","):
+            directory = os.path.join(data_dir, f"registry_{args.size}", f"snapshots_{dtype}")
+            export_snapshot(companies_store, snapshot_path(companies_store._collection.name, directory), dtype=dtype)
+
+            before = anonymous_memory_mb()
+            snapshot_store = attach_snapshot(companies_store, directory)
+            results, stats = time_engine(
+                lambda queries, k: snapshot_store.search_by_vectors(queries, k=k), vectors, args.k, args.batch_size
+            )
+            after = anonymous_memory_mb()
+            snapshot_ids = [hit_ids(hits) for hits in results]
+
+            size_mb = directory_mb(directory)
+            anonymous = f"{after - before:8,.1f}" if before is not None else f"{'n/a':>8}"
+            print(f"  {dtype:<10} {stats['p50_ms']:8.3f} {stats['p95_ms']:8.3f} {stats['batch_per_s']:10,.0f} "
+                  f"{recall(snapshot_ids, chroma_ids, args.k):14.3f} {recall(snapshot_ids, reference, args.k):13.3f} "
+                  f"{size_mb:8.1f} {anonymous}")
+            if not snapshot_store.source_stats().get("snapshot"):
+                print(f"  warning: no {dtype} search was answered from the snapshot")
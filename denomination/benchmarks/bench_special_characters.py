@@ -0,0 +1,94 @@
+"""Micro-benchmark: compiled special-character validator vs the original per-call version.
+
+Usage (from the denomination/ directory):
+    python benchmarks/bench_special_characters.py --names 20000 --repeat 5
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from business_validator import check_special_characters
+
+# ============================================================================
+# REFERENCE IMPLEMENTATION
+# ============================================================================
+
+def legacy_check_special_characters(name: str) -> tuple:
+    """Original implementation: rebuilds the allowed set on every call"""
+    allowed_chars = set('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 ')
+    for i in range(0x0600, 0x06FF + 1):
+        allowed_chars.add(chr(i))
+    for char in 'àáâãäåæçèéêëìíîïðñòóôõöøùúûüýþÿÀÁÂÃÄÅÆÇÈÉÊËÌÍÎÏÐÑÒÓÔÕÖØÙÚÛÜÝÞŸ':
+        allowed_chars.add(char)
+    for char in ".-'&":
+        allowed_chars.add(char)
+
+    special_chars = []
+    for char in name:
+        if char not in allowed_chars:
+            special_chars.append(char)
+
+    if special_chars:
+        return True, list(set(special_chars))
+    return False, []
+
+# ============================================================================
+# SYNTHETIC NAMES
+# ============================================================================
+
+LATIN_WORDS = ["Tech", "Solutions", "Société", "Nour", "Avenir", "Commerce", "Smart", "Café", "Services", "Group"]
+ARABIC_WORDS = ["الشركة", "التونسية", "للتكنولوجيا", "مؤسسة", "النور", "للخدمات", "المستقبل", "للتجارة"]
+SPECIAL_CHARS = "@#$%^*()+=[]{}|\\:;\"<>?/~"
+
+def generate_names(count, special_ratio=0.2, seed=42):
+    """Generate a deterministic mix of Latin, Arabic and invalid names"""
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        words = rng.choice([LATIN_WORDS, ARABIC_WORDS])
+        name = " ".join(rng.choice(words) for _ in range(rng.randint(1, 4)))
+        if rng.random() < special_ratio:
+            pos = rng.randint(0, len(name))
+            name = name[:pos] + rng.choice(SPECIAL_CHARS) + name[pos:]
+        names.append(name)
+    return names
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def run_benchmark(count, repeat):
+    """Time the legacy and compiled validators over the same names"""
+    names = generate_names(count)
+
+    for name in names:
+        legacy = legacy_check_special_characters(name)
+        current = check_special_characters(name)
+        assert legacy[0] == current[0] and set(legacy[1]) == set(current[1]), name
+
+    timings = {
+        "legacy (per call)": lambda: [legacy_check_special_characters(n) for n in names],
+        "compiled (per call)": lambda: [check_special_characters(n) for n in names],
+    }
+
+    results = {}
+    for label, func in timings.items():
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        results[label] = best
+
+    baseline = results["legacy (per call)"]
+    print(f"{count:,} names, best of {repeat} runs")
+    for label, best in results.items():
+        print(f"  {label:<22} {best * 1000:9.2f} ms  {count / best:12,.0f} names/s  x{baseline / best:6.1f}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--names", type=int, default=20000, help="Number of names to validate")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timing runs")
+    args = parser.parse_args()
+    run_benchmark(args.names, args.repeat)
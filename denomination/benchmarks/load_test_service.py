@@ -0,0 +1,101 @@
+"""Load test for the denomination service (service.py).
+
+Runs concurrent clients that POST single names to /analyze for a fixed
+duration, then reports throughput, latency percentiles and the service's
+batching counters. Run the service against the stub embedding server; stub
+runs use their own collections and cache entries, so ingest into them first:
+
+    python benchmarks/stub_embedding_server.py --port 8600 --latency-ms 80
+    export OPENAI_EMBEDDING_BASE_URL=http://127.0.0.1:8600/v1
+    python ingest.py registry.csv
+    python service.py --port 8502
+
+Usage (from the denomination/ directory):
+    python benchmarks/load_test_service.py --url http://127.0.0.1:8502 --clients 32 --duration 20
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.request
+
+# Name parts combined into distinct query names
+PREFIXES = ["Tech", "Smart", "Atlas", "Carthage", "Medina", "Sahara", "Jasmin", "Olive", "Blue", "Nova"]
+SUFFIXES = ["Solutions", "Services", "Consulting", "Trading", "Digital", "Group", "Conseil", "Commerce"]
+ARABIC_NAMES = ["الشركة التونسية للتكنولوجيا", "مؤسسة النور", "شركة المستقبل للتجارة", "الشركة الذكية للبرمجيات"]
+
+def random_name(rng):
+    """A plausible business name, Latin or Arabic"""
+    if rng.random() < 0.2:
+        return rng.choice(ARABIC_NAMES)
+    return f"{rng.choice(PREFIXES)} {rng.choice(SUFFIXES)} {rng.randint(1, 500)}"
+
+def post_json(url, payload, timeout=60):
+    """POST a JSON payload and decode the JSON response"""
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+def get_json(url, timeout=10):
+    """GET a JSON document"""
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read())
+
+def run_client(url, deadline, seed, latencies, errors, lock):
+    """Send requests back to back until the deadline"""
+    rng = random.Random(seed)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            post_json(f"{url}/analyze", {"name": random_name(rng)})
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+        except Exception:
+            with lock:
+                errors.append(1)
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8502", help="Service base URL")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=20, help="Test duration in seconds")
+    args = parser.parse_args()
+
+    stats_before = get_json(f"{args.url}/stats")
+    latencies, errors, lock = [], [], threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    clients = [
+        threading.Thread(target=run_client, args=(args.url, deadline, seed, latencies, errors, lock))
+        for seed in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - start
+    stats_after = get_json(f"{args.url}/stats")
+
+    latencies.sort()
+    print(f"{len(latencies):,} requests, {len(errors):,} errors in {elapsed:.1f}s "
+          f"with {args.clients} clients: {len(latencies) / elapsed:,.1f} req/s")
+    if latencies:
+        print(f"latency p50 {percentile(latencies, 0.50) * 1000:,.1f} ms | "
+              f"p95 {percentile(latencies, 0.95) * 1000:,.1f} ms | "
+              f"p99 {percentile(latencies, 0.99) * 1000:,.1f} ms | "
+              f"mean {statistics.mean(latencies) * 1000:,.1f} ms")
+
+    batches = stats_after["batches"] - stats_before["batches"]
+    requests = stats_after["requests"] - stats_before["requests"]
+    if batches:
+        print(f"{batches:,} batches, mean batch size {requests / batches:.1f}, "
+              f"largest {stats_after['largest_batch']}")
@@ -0,0 +1,106 @@
+"""Cold start profile of the Streamlit app: import time and first script run.
+
+Reports the time `import app` takes (from python -X importtime, with the
+slowest direct imports), then runs the script under Streamlit's AppTest
+harness: the first run is what a user waits for before the page renders,
+"components ready" is when the stores and indexes are usable, and the rerun
+is the cost of every later interaction. The app runs with the local embedding backend against a
+synthetic registry in a scratch directory, so no API key is needed.
+
+Usage (from the denomination/ directory):
+    python benchmarks/profile_cold_start.py --registry-size 5000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+def import_profile(top=10):
+    """Import time of the app module (s) and its slowest direct imports"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=APP_DIR, capture_output=True, text=True,
+        env={**os.environ, "PYTHONWARNINGS": "ignore"}
+    )
+    total, imports = 0.0, []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        seconds = int(cumulative) / 1e6
+        if name.strip() == "app" and depth == 0:
+            total = seconds
+        elif depth == 1:
+            imports.append((seconds, name.strip()))
+    imports.sort(reverse=True)
+    return total, imports[:top]
+
+def seed_registry(size):
+    """Ingest a synthetic registry and the sample hate words into ./chroma_db with the local backend"""
+    from bench_pipeline import synthetic_company
+    from ingest import write_company_records
+    from utils import initialize_vector_stores, load_sample_data, setup_chroma_directories
+
+    setup_chroma_directories()
+    companies_store, hate_store = initialize_vector_stores(None, "local")
+    load_sample_data(None, hate_store)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for offset in range(0, size, 5000):
+            records = [synthetic_company(i) for i in range(offset, min(offset + 5000, size))]
+            write_company_records(companies_store, records, executor)
+
+def time_script_runs(timeout=300):
+    """First-run time, time until the components are ready, and a warm rerun time of app.py"""
+    from streamlit.testing.v1 import AppTest
+
+    app_test = AppTest.from_file(os.path.join(APP_DIR, "app.py"), default_timeout=timeout)
+    app_test.secrets["GROQ_API_KEY"] = "profile"
+    app_test.secrets["EMBEDDING_BACKEND"] = "local"
+
+    start = time.perf_counter()
+    app_test.run()
+    first_run = time.perf_counter() - start
+
+    # Rerun until the sidebar shows the registry instead of the warm-up notice
+    while any("Opening the business registry" in str(element.value) for element in app_test.info):
+        time.sleep(0.05)
+        app_test.run()
+    ready = time.perf_counter() - start
+
+    start = time.perf_counter()
+    app_test.run()
+    rerun = time.perf_counter() - start
+
+    errors = [element.value for element in app_test.error]
+    return first_run, ready, rerun, errors
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--registry-size", type=int, default=5000, help="Synthetic registry size to seed")
+    parser.add_argument("--workdir", help="Run against this directory's chroma_db instead of a seeded scratch one")
+    parser.add_argument("--top", type=int, default=10, help="Slowest top-level imports to list")
+    args = parser.parse_args()
+
+    total, slowest = import_profile(args.top)
+    print(f"import app: {total:.2f}s")
+    for seconds, name in slowest:
+        print(f"  {seconds:7.3f}s  {name}")
+
+    os.environ["METRICS_PORT"] = "0"
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        os.chdir(args.workdir or scratch_dir)
+        if not args.workdir:
+            seed_registry(args.registry_size)
+        first_run, ready, rerun, errors = time_script_runs()
+
+    print(f"first script run: {first_run:.2f}s | components ready: {ready:.2f}s | rerun: {rerun:.2f}s")
+    for error in errors:
+        print(f"  app error: {error}")
@@ -0,0 +1,105 @@
+"""Local stub of the OpenAI embeddings API for load tests.
+
+Answers POST /v1/embeddings with deterministic hashed n-gram vectors after a
+configurable delay, so the service can be load tested offline and without
+API costs. Point the app or service at it with:
+
+    OPENAI_EMBEDDING_BASE_URL=http://127.0.0.1:8600/v1
+
+Collections and cached embeddings are then keyed on this URL, apart from the
+OpenAI ones.
+
+Usage (from the denomination/ directory):
+    python benchmarks/stub_embedding_server.py --port 8600 --latency-ms 80
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_providers import HashingEmbeddings
+
+class StubEmbeddingServer(ThreadingHTTPServer):
+    """Threaded HTTP server with a listen backlog sized for load tests"""
+    daemon_threads = True
+    request_queue_size = 256
+
+def make_handler(embeddings, latency_ms):
+    """Request handler class returning embeddings after latency_ms"""
+    lock = threading.Lock()
+    counters = {"requests": 0, "inputs": 0}
+
+    class StubEmbeddingHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/stats"):
+                with lock:
+                    self._send_json(200, dict(counters))
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/embeddings"):
+                self._send_json(404, {"error": "Not found"})
+                return
+
+            data = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            texts = data.get("input", [])
+            if isinstance(texts, str):
+                texts = [texts]
+            # Token-id inputs are hashed as their text representation
+            texts = [text if isinstance(text, str) else " ".join(map(str, text)) for text in texts]
+
+            time.sleep(latency_ms / 1000)
+            vectors = embeddings.embed_documents(texts)
+            with lock:
+                counters["requests"] += 1
+                counters["inputs"] += len(texts)
+
+            self._send_json(200, {
+                "object": "list",
+                "model": data.get("model", "stub"),
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": vector}
+                    for i, vector in enumerate(vectors)
+                ],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0}
+            })
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubEmbeddingHandler
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8600, help="Port to listen on")
+    parser.add_argument("--latency-ms", type=float, default=80, help="Simulated API latency per request")
+    parser.add_argument("--dimensions", type=int, default=1536, help="Embedding dimensions")
+    args = parser.parse_args()
+
+    server = StubEmbeddingServer(
+        (args.host, args.port), make_handler(HashingEmbeddings(dimensions=args.dimensions), args.latency_ms)
+    )
+    print(f"Stub embedding server on http://{args.host}:{args.port}/v1 ({args.latency_ms:.0f} ms latency)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -1,6 +1,48 @@
 import streamlit as st
+import contextvars
 import re
-from langchain_core.prompts import ChatPromptTemplate
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from utils import (
+    build_company_filter, company_record_from_document, embed_queries, query_store_by_vectors
+)
+from name_index import exact_duplicate_result
+from name_extractor import DEFAULT_MIN_CONFIDENCE, extract_business_name_rules, record_extraction_path
+from llm_cache import with_llm_cache
+from metrics import record_stage_error, span
+from vector_snapshot import SnapshotCompanyStore
+from hate_matcher import MIN_SUBSTRING_LENGTH, term_variants
+
+# Bump when the extraction prompt changes, so cached extractions are not reused
+EXTRACTION_PROMPT_VERSION = "1"
+
+# Shared pool for the independent, network-bound validation stages
+STAGE_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="validation-stage")
+
+# Name extraction (an LLM call) has its own pool: a timed-out call keeps its worker
+# busy until the backend answers, and a slow LLM must not starve the search stages
+EXTRACTION_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="name-extraction")
+
+# Seconds a stage may run before its result is given up on
+DEFAULT_STAGE_TIMEOUTS = {'hate_words': 10.0, 'similarity': 15.0, 'extraction': 15.0}
+
+# ============================================================================
+# CHARACTER TABLES (built once at import time)
+# ============================================================================
+
+# French accented characters allowed in business names
+FRENCH_CHARS = 'àáâãäåæçèéêëìíîïðñòóôõöøùúûüýþÿÀÁÂÃÄÅÆÇÈÉÊËÌÍÎÏÐÑÒÓÔÕÖØÙÚÛÜÝÞŸ'
+
+# Basic allowed punctuation
+BASIC_PUNCTUATION = ".-'&"
+
+# Allowed characters, as a regex character class body: letters, numbers, spaces,
+# Arabic block, French accents and basic punctuation
+ALLOWED_CHARS = "a-zA-Z0-9 \u0600-\u06FF" + FRENCH_CHARS + re.escape(BASIC_PUNCTUATION)
+
+# Compiled matcher for any character outside ALLOWED_CHARS, so the scan over
+# a name runs inside the regex engine instead of a Python loop
+SPECIAL_CHARS_PATTERN = re.compile(f"[^{ALLOWED_CHARS}]")
 
 # ============================================================================
 # VALIDATION FUNCTIONS
@@ -8,138 +50,211 @@ from langchain_core.prompts import ChatPromptTemplate
 
 def check_special_characters(name: str) -> tuple:
     """Check if name contains prohibited special characters"""
-    # Allowed characters: letters, numbers, spaces, and basic punctuation
-    allowed_chars = set('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 ')
+    special_chars = SPECIAL_CHARS_PATTERN.findall(name)
     
-    # Add Arabic characters
-    for i in range(0x0600, 0x06FF + 1):
-        allowed_chars.add(chr(i))
+    if special_chars:
+        return True, list(dict.fromkeys(special_chars))  # Remove duplicates
+    return False, []
+
+def _hate_matches_from_results(results, threshold=0.8):
+    """Convert hate store (doc, score) hits into hate match dicts"""
+    hate_matches = []
     
-    # Add French accented characters
-    french_chars = 'àáâãäåæçèéêëìíîïðñòóôõöøùúûüýþÿÀÁÂÃÄÅÆÇÈÉÊËÌÍÎÏÐÑÒÓÔÕÖØÙÚÛÜÝÞŸ'
-    for char in french_chars:
-        allowed_chars.add(char)
+    for doc, score in results:
+        # Lower score means higher similarity in some embedding spaces
+        similarity = max(0, 1 - score)  # Convert to 0-1 similarity
+        if similarity >= threshold:
+            hate_matches.append({
+                'word': doc.page_content.strip(),
+                'similarity': similarity,
+                'type': doc.metadata.get('type', 'unknown')
+            })
     
-    # Basic allowed punctuation
-    basic_punctuation = ".-'&"
-    for char in basic_punctuation:
-        allowed_chars.add(char)
+    return hate_matches
+
+def _timed_similarity_search(store, text, stage, k=5, filter=None):
+    """similarity_search_with_score with the embedding call and the Chroma query timed as separate spans"""
+    with span(f"{stage}_embedding"):
+        embedding = store.embeddings.embed_query(text)
+    with span(f"{stage}_query"):
+        if isinstance(store, SnapshotCompanyStore):
+            return store.search_by_vectors([embedding], k=k, where=filter)[0]
+        return store.similarity_search_by_vector_with_relevance_scores(embedding, k=k, filter=filter)
+
+def _query_companies_by_vectors(companies_store, query_embeddings, k=5, where=None):
+    """query_store_by_vectors on the companies store, from its snapshot when one is attached"""
+    if isinstance(companies_store, SnapshotCompanyStore):
+        return companies_store.search_by_vectors(query_embeddings, k=k, where=where)
+    return query_store_by_vectors(companies_store, query_embeddings, k=k, where=where)
+
+def check_hate_words_similarity(text, hate_store, threshold=0.8, hate_matcher=None):
+    """Check for hate words: literal terms and their variants first, then vector similarity"""
+    if not text.strip():
+        return []
     
-    # Find special characters
-    special_chars = []
-    for char in name:
-        if char not in allowed_chars:
-            special_chars.append(char)
+    # Terms found by the compiled matcher settle the check without a network call
+    if hate_matcher is not None:
+        with span("hate_matcher"):
+            hate_matches = hate_matcher.match(text)
+        if hate_matches:
+            return hate_matches
     
-    if special_chars:
-        return True, list(set(special_chars))  # Remove duplicates
-    return False, []
-
-def check_hate_words_similarity(text, hate_store, threshold=0.8):
-    """Check for hate words using vector similarity"""
-    if not hate_store or not text.strip():
+    if not hate_store:
         return []
     
     try:
-        results = hate_store.similarity_search_with_score(text.lower(), k=5)
-        hate_matches = []
-        
-        for doc, score in results:
-            # Lower score means higher similarity in some embedding spaces
-            similarity = max(0, 1 - score)  # Convert to 0-1 similarity
-            if similarity >= threshold:
-                hate_matches.append({
-                    'word': doc.page_content.strip(),
-                    'similarity': similarity,
-                    'type': doc.metadata.get('type', 'unknown')
-                })
-        
-        return hate_matches
+        results = _timed_similarity_search(hate_store, text.lower(), "hate")
+        return _hate_matches_from_results(results, threshold)
     except Exception as e:
         st.error(f"Hate word check error: {str(e)}")
         return []
 
-def check_business_similarity(business_name, companies_store):
-    """Check similarity with existing business names"""
-    if not companies_store or not business_name.strip():
+def _merge_fuzzy_matches(matches, fuzzy_matches):
+    """Merge vector and fuzzy candidates by registry ID into one hybrid-scored list.
+
+    The hybrid score of a company is the closest of its vector distance and its
+    edit-distance score (both on the 0-2 scale), so a near-identical spelling is
+    flagged even when the embedding places it further away, and vice versa.
+    """
+    merged = {match['id']: match for match in matches}
+    
+    for fuzzy_match in fuzzy_matches:
+        match = merged.get(fuzzy_match['id'])
+        if match is None:
+            merged[fuzzy_match['id']] = {
+                'id': fuzzy_match['id'],
+                'arabic': fuzzy_match['arabic'],
+                'french': fuzzy_match['french'],
+                'score': fuzzy_match['score'],
+                'similarity': max(0, min(100, (2 - fuzzy_match['score']) * 50))
+            }
+        elif fuzzy_match['score'] < match['score']:
+            match['score'] = fuzzy_match['score']
+            match['similarity'] = max(0, min(100, (2 - fuzzy_match['score']) * 50))
+    
+    return sorted(merged.values(), key=lambda match: match['score'])
+
+def _similarity_result_from_results(business_name, results_with_scores, fuzzy_matches=None):
+    """Score company store (doc, score) hits, plus any fuzzy candidates, into a similarity result dict"""
+    if not results_with_scores and not fuzzy_matches:
         return {
-            'status': 'ERROR',
-            'reason': 'Invalid input or database unavailable',
+            'status': 'AVAILABLE',
+            'reason': 'No similar names found',
             'matches': []
         }
     
-    try:
-        results_with_scores = companies_store.similarity_search_with_score(business_name, k=5)
-        
-        if not results_with_scores:
-            return {
-                'status': 'AVAILABLE',
-                'reason': 'No similar names found',
-                'matches': []
-            }
-        
-        matches = []
-        exact_found = False
-        
-        for doc, score in results_with_scores:
-            content = doc.page_content
-            ar_name = ""
-            fr_name = ""
-            doc_id = ""
-            
-            lines = content.split('\n')
-            for line in lines:
-                if 'NOM_AR:' in line:
-                    ar_name = line.split('NOM_AR:')[1].strip()
-                elif 'NOM_FR:' in line:
-                    fr_name = line.split('NOM_FR:')[1].strip()
-                elif 'ID:' in line:
-                    doc_id = line.split('ID:')[1].strip()
-            
-            similarity_percent = max(0, min(100, (2 - score) * 50))
-            
-            matches.append({
-                'id': doc_id,
-                'arabic': ar_name,
-                'french': fr_name,
-                'score': score,
-                'similarity': similarity_percent
-            })
-            
-            input_lower = business_name.lower().strip()
-            if (ar_name and ar_name.lower().strip() == input_lower) or \
-               (fr_name and fr_name.lower().strip() == input_lower) or \
-               score < 0.1:  # Very high similarity threshold
-                exact_found = True
+    matches = []
+    
+    for doc, score in results_with_scores:
+        record = company_record_from_document(doc.page_content, doc.metadata)
         
-        if exact_found:
-            status = 'NOT AVAILABLE'
-            reason = 'Exact or very similar name found in database'
-        elif matches and matches[0]['score'] < 0.3:
-            status = 'HIGH RISK'
-            reason = 'Very similar names exist in database'
-        elif matches and matches[0]['score'] < 0.5:
-            status = 'MEDIUM RISK'
-            reason = 'Moderately similar names exist'
-        else:
-            status = 'AVAILABLE'
-            reason = 'No significant similarities found'
+        similarity_percent = max(0, min(100, (2 - score) * 50))
         
+        matches.append({
+            'id': record['id'],
+            'arabic': record['nom_ar'],
+            'french': record['nom_fr'],
+            'score': score,
+            'similarity': similarity_percent
+        })
+    
+    if fuzzy_matches:
+        matches = _merge_fuzzy_matches(matches, fuzzy_matches)
+    
+    exact_found = False
+    input_lower = business_name.lower().strip()
+    
+    for match in matches:
+        ar_name = match['arabic']
+        fr_name = match['french']
+        if (ar_name and ar_name.lower().strip() == input_lower) or \
+           (fr_name and fr_name.lower().strip() == input_lower) or \
+           match['score'] < 0.1:  # Very high similarity threshold
+            exact_found = True
+    
+    if exact_found:
+        status = 'NOT AVAILABLE'
+        reason = 'Exact or very similar name found in database'
+    elif matches and matches[0]['score'] < 0.3:
+        status = 'HIGH RISK'
+        reason = 'Very similar names exist in database'
+    elif matches and matches[0]['score'] < 0.5:
+        status = 'MEDIUM RISK'
+        reason = 'Moderately similar names exist'
+    else:
+        status = 'AVAILABLE'
+        reason = 'No significant similarities found'
+    
+    return {
+        'status': status,
+        'reason': reason,
+        'matches': matches if status != 'AVAILABLE' else [],
+        'nearest_score': min((match['score'] for match in matches), default=None)
+    }
+
+def _fuzzy_only_result(business_name, fuzzy_matches, error=None):
+    """Similarity result from the offline fuzzy engine alone"""
+    result = _similarity_result_from_results(business_name, [], fuzzy_matches)
+    note = 'vector search unavailable' if error else 'name matching only'
+    result['reason'] = f"{result['reason']} ({note})"
+    return result
+
+def check_business_similarity(business_name, companies_store, filters=None, fuzzy_index=None):
+    """Check similarity with existing business names, optionally narrowed by metadata filters.
+
+    With a fuzzy_index, trigram/edit-distance candidates are merged with the
+    vector results, and the check still answers when the vector store or the
+    embedding API is unavailable (fuzzy candidates ignore metadata filters, so
+    they are only used for unfiltered checks).
+    """
+    if not business_name.strip():
+        return {
+            'status': 'ERROR',
+            'reason': 'Invalid input or database unavailable',
+            'matches': []
+        }
+    
+    fuzzy_matches = None
+    if fuzzy_index is not None and not filters:
+        with span("fuzzy_search"):
+            fuzzy_matches = fuzzy_index.search(business_name)
+    
+    if not companies_store:
+        if fuzzy_matches is not None:
+            return _fuzzy_only_result(business_name, fuzzy_matches)
         return {
-            'status': status,
-            'reason': reason,
-            'matches': matches if status != 'AVAILABLE' else []
+            'status': 'ERROR',
+            'reason': 'Invalid input or database unavailable',
+            'matches': []
         }
+    
+    try:
+        results_with_scores = _timed_similarity_search(
+            companies_store, business_name, "similarity", filter=build_company_filter(filters)
+        )
+        return _similarity_result_from_results(business_name, results_with_scores, fuzzy_matches)
         
     except Exception as e:
+        if fuzzy_matches is not None:
+            return _fuzzy_only_result(business_name, fuzzy_matches, error=e)
         return {
             'status': 'ERROR',
             'reason': f'Database error: {str(e)}',
             'matches': []
         }
 
-def extract_business_name_from_query(query, llm):
+def extract_business_name_from_query(query, llm, min_confidence=DEFAULT_MIN_CONFIDENCE, llm_cache=None):
     """Extract business name from conversational query"""
+    # Common phrasings are answered by the rule-based extractor; the LLM only
+    # sees queries the rules are unsure about
+    with span("extraction_rules"):
+        extraction = extract_business_name_rules(query)
+    if extraction['confidence'] >= min_confidence or llm is None:
+        record_extraction_path('rules')
+        return extraction['name']
+    
+    from langchain_core.prompts import ChatPromptTemplate
+    
     extraction_prompt = ChatPromptTemplate.from_messages([
         ("system", """You are a business name extraction expert. Extract ONLY the business name from user queries.
 
@@ -163,9 +278,11 @@ Business Name:"""),
     ])
     
     try:
-        chain = extraction_prompt | llm
-        response = chain.invoke({"query": query})
+        chain = extraction_prompt | with_llm_cache(llm, llm_cache, EXTRACTION_PROMPT_VERSION)
+        with span("extraction_llm"):
+            response = chain.invoke({"query": ' '.join(query.split())})
         extracted = response.content.strip()
+        record_extraction_path('llm')
         
         if extracted == "NONE" or not extracted:
             return None
@@ -174,86 +291,190 @@ Business Name:"""),
         extracted = re.sub(r'^["\']|["\']$', '', extracted)
         return extracted.strip()
     except:
+        record_extraction_path('llm_error')
         return None
 
-def generate_alternatives(business_name, remove_special_chars=False):
-    """Generate alternative business names"""
+# Alternative name templates, in order of preference
+LATIN_ALTERNATIVE_TEMPLATES = [
+    "{} Plus", "{} Pro", "{} Tunisia", "New {}", "{} Solutions",
+    "{} Group", "{} Services", "{} Consulting", "{} Partners", "{} Digital",
+    "{} International", "{} Tunisie", "Groupe {}", "Smart {}", "{} Expert",
+]
+ARABIC_ALTERNATIVE_TEMPLATES = [
+    "{} الجديدة", "{} بلس", "{} تونس", "{} المتطورة", "مؤسسة {}",
+    "شركة {}", "مجموعة {}", "{} الدولية", "{} للخدمات", "{} الذكية",
+    "{} للاستشارات", "{} الرقمية", "{} المتميزة", "دار {}", "{} برو",
+]
+
+# Fallback suggestions when nothing of the requested name is usable
+GENERIC_ALTERNATIVES = ["TechSolutions", "SmartBusiness", "ProServices"]
+
+def generate_alternative_candidates(business_name, remove_special_chars=False):
+    """Full, unchecked pool of alternative names, in template order"""
     if not business_name:
         return []
     
-    alternatives = []
-    
     # If removing special characters, clean the name first
     if remove_special_chars:
         # Remove special characters but keep basic punctuation
-        cleaned_name = re.sub(r'[^a-zA-Z0-9\u0600-\u06FF\s.\-\'&àáâãäåæçèéêëìíîïðñòóôõöøùúûüýþÿÀÁÂÃÄÅÆÇÈÉÊËÌÍÎÏÐÑÒÓÔÕÖØÙÚÛÜÝÞŸ]', '', business_name)
+        cleaned_name = SPECIAL_CHARS_PATTERN.sub('', ' '.join(business_name.split()))
         base_name = cleaned_name.strip()
     else:
         base_name = business_name
     
     if not base_name:
         # If no valid base name, provide generic alternatives
-        return ["TechSolutions", "SmartBusiness", "ProServices"]
+        return list(GENERIC_ALTERNATIVES)
     
     if any(char in base_name for char in 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'):
         # English/French name
-        alternatives = [
-            f"{base_name} Plus",
-            f"{base_name} Pro", 
-            f"{base_name} Tunisia",
-            f"New {base_name}",
-            f"{base_name} Solutions"
-        ]
+        templates = LATIN_ALTERNATIVE_TEMPLATES
     else:
         # Arabic name
-        alternatives = [
-            f"{base_name} الجديدة",
-            f"{base_name} بلس",
-            f"{base_name} تونس", 
-            f"{base_name} المتطورة",
-            f"مؤسسة {base_name}"
-        ]
+        templates = ARABIC_ALTERNATIVE_TEMPLATES
     
-    return alternatives[:3]
+    return [template.format(base_name) for template in templates]
 
-# ============================================================================
-# ANALYSIS FUNCTIONS
-# ============================================================================
+def generate_alternatives(business_name, remove_special_chars=False):
+    """Generate alternative business names"""
+    return generate_alternative_candidates(business_name, remove_special_chars)[:3]
 
-def analyze_business_name(business_name, companies_store, hate_store, llm):
-    """Comprehensive business name analysis with special character detection"""
-    if not business_name or not business_name.strip():
-        return {
-            'valid': False,
-            'hate_words': [],
-            'similarity_result': {'status': 'ERROR', 'reason': 'Empty name', 'matches': []},
-            'alternatives': [],
-            'special_chars': [],
-            'has_special_chars': False
-        }
+def _without_terms(business_name, hate_matches):
+    """The name without the words carrying a matched prohibited term"""
+    terms = [term for match in hate_matches for term, _ in term_variants(match['word']) if term]
     
-    # Check for special characters FIRST (highest priority)
-    has_special_chars, special_chars_list = check_special_characters(business_name)
-    if has_special_chars:
-        return {
-            'valid': False,
-            'hate_words': [],
-            'similarity_result': {'status': 'BLOCKED', 'reason': 'Special characters not allowed', 'matches': []},
-            'alternatives': generate_alternatives(business_name, remove_special_chars=True),
-            'special_chars': special_chars_list,
-            'has_special_chars': True
-        }
+    def prohibited(word):
+        return any(
+            term == compact or (len(term) >= MIN_SUBSTRING_LENGTH and term in compact)
+            for compact, _ in term_variants(word) for term in terms
+        )
     
-    # Check for hate words
-    hate_matches = check_hate_words_similarity(business_name, hate_store)
+    return ' '.join(word for word in business_name.split() if not prohibited(word))
+
+def _alternative_base(business_name, hate_matches=()):
+    """Name the alternatives are built from: the prohibited words removed, generic if nothing is left"""
+    if not hate_matches:
+        return business_name, False
+    base_name = _without_terms(business_name, hate_matches)
+    return base_name, not base_name
+
+def _alternative_pool(business_name, remove_special_chars=False, hate_matches=()):
+    """Distinct alternative candidates for a name, excluding the name itself"""
+    base_name, generic = _alternative_base(business_name, hate_matches)
+    if generic:
+        return list(GENERIC_ALTERNATIVES)
+    return [
+        candidate for candidate in dict.fromkeys(
+            generate_alternative_candidates(base_name, remove_special_chars)
+        )
+        if candidate.casefold() != business_name.casefold()
+    ]
+
+def _rank_available_alternatives(candidates, results, limit=3):
+    """Candidates that passed every check, most distinct from the registry first"""
+    available = [
+        (candidate, result['similarity_result'].get('nearest_score'))
+        for candidate, result in zip(candidates, results)
+        if result['valid'] and not result['has_special_chars']
+        and result['similarity_result']['status'] == 'AVAILABLE'
+    ]
+    # No registered neighbour at all ranks as far away as the score scale allows
+    available.sort(key=lambda item: -(item[1] if item[1] is not None else 2.0))
+    return [candidate for candidate, _ in available[:limit]]
+
+def suggest_available_alternatives(business_name, companies_store, hate_store, llm, name_index=None,
+                                   fuzzy_index=None, hate_matcher=None, remove_special_chars=False, limit=3,
+                                   hate_matches=()):
+    """Alternatives that pass every check, most distinct from the registry first.
+
+    The whole candidate pool is checked in one analyze_business_names() pass
+    (exact index, hate terms, one batched embedding call, one query per store).
+    Only candidates without hate matches whose similarity status is AVAILABLE
+    are kept, ranked by the distance to their nearest registered name. For a
+    name with hate_matches, candidates are built without the prohibited words,
+    and the generic alternatives fill in when too few of them pass.
+    """
+    pools = {0: _alternative_pool(business_name, remove_special_chars, hate_matches)}
+    fallbacks = {0: list(GENERIC_ALTERNATIVES) if hate_matches else []}
+    return _screen_pools(
+        pools, fallbacks, companies_store, hate_store, llm, name_index, fuzzy_index, hate_matcher, limit
+    )[0]
+
+def _screen_pools(pools, fallbacks, companies_store, hate_store, llm, name_index=None,
+                  fuzzy_index=None, hate_matcher=None, limit=3):
+    """Ranked available alternatives of every pool, topped up from its fallback pool, checked in one batch"""
+    candidates = list(dict.fromkeys(
+        candidate for i in pools for candidate in pools[i] + fallbacks[i]
+    ))
+    if not candidates:
+        return {i: [] for i in pools}
     
-    # Check business name similarity
-    similarity_result = check_business_similarity(business_name, companies_store)
+    checked = dict(zip(candidates, analyze_business_names(
+        candidates, companies_store, hate_store, llm, name_index,
+        fuzzy_index=fuzzy_index, hate_matcher=hate_matcher
+    )))
+    screened = {}
+    for i, pool in pools.items():
+        alternatives = _rank_available_alternatives(pool, [checked[c] for c in pool], limit)
+        if len(alternatives) < limit and fallbacks[i]:
+            fallback = [c for c in fallbacks[i] if c not in alternatives]
+            alternatives += _rank_available_alternatives(
+                fallback, [checked[c] for c in fallback], limit - len(alternatives)
+            )
+        screened[i] = alternatives
+    return screened
+
+def _screen_alternatives(names, results, companies_store, hate_store, llm, name_index=None,
+                         fuzzy_index=None, hate_matcher=None, limit=3):
+    """Replace template alternatives with pre-screened ones, checking every name's pool in one batch"""
+    pools = {
+        i: _alternative_pool(names[i], result['has_special_chars'], result['hate_words'])
+        for i, result in enumerate(results) if result['alternatives']
+    }
+    fallbacks = {i: list(GENERIC_ALTERNATIVES) if results[i]['hate_words'] else [] for i in pools}
+    if not pools:
+        return
     
+    screened = _screen_pools(
+        pools, fallbacks, companies_store, hate_store, llm, name_index, fuzzy_index, hate_matcher, limit
+    )
+    for i, alternatives in screened.items():
+        results[i]['alternatives'] = alternatives
+
+# ============================================================================
+# ANALYSIS FUNCTIONS
+# ============================================================================
+
+def _empty_name_result():
+    """Analysis result for an empty business name"""
+    return {
+        'valid': False,
+        'hate_words': [],
+        'similarity_result': {'status': 'ERROR', 'reason': 'Empty name', 'matches': []},
+        'alternatives': [],
+        'special_chars': [],
+        'has_special_chars': False
+    }
+
+def _special_chars_result(business_name, special_chars_list):
+    """Analysis result for a name blocked by special characters"""
+    return {
+        'valid': False,
+        'hate_words': [],
+        'similarity_result': {'status': 'BLOCKED', 'reason': 'Special characters not allowed', 'matches': []},
+        'alternatives': generate_alternatives(business_name, remove_special_chars=True),
+        'special_chars': special_chars_list,
+        'has_special_chars': True
+    }
+
+def _analysis_result(business_name, hate_matches, similarity_result):
+    """Analysis result once hate word and similarity checks have run"""
     # Generate alternatives if needed
     alternatives = []
     if hate_matches or similarity_result['status'] in ['NOT AVAILABLE', 'HIGH RISK']:
-        alternatives = generate_alternatives(business_name)
+        # Alternatives of an inappropriate name are built without its prohibited words
+        base_name, generic = _alternative_base(business_name, hate_matches)
+        alternatives = list(GENERIC_ALTERNATIVES) if generic else generate_alternatives(base_name)
     
     return {
         'valid': len(hate_matches) == 0,
@@ -264,8 +485,386 @@ def analyze_business_name(business_name, companies_store, hate_store, llm):
         'has_special_chars': False
     }
 
-def display_analysis_results(business_name, analysis_result):
-    """Display comprehensive analysis results with special character handling"""
+def _submit_stage(fn, *args, executor=None, **kwargs):
+    """Run fn on the stage pool (or executor) in a copy of the caller's context, so LangSmith runs stay attached"""
+    context = contextvars.copy_context()
+    return (executor or STAGE_EXECUTOR).submit(context.run, fn, *args, **kwargs)
+
+def _run_stages(futures, timeouts, is_definitive):
+    """Wait for stage futures until all finish, a stage times out, or one is definitive.
+
+    futures maps stage name to future. Returns {stage: (result, error)}; a timed
+    out stage gets a TimeoutError, and once a stage result is definitive the
+    other stages are cancelled and left out. Stages already running cannot be
+    interrupted; their results are discarded.
+    """
+    start = time.monotonic()
+    deadlines = {
+        future: start + timeouts.get(stage, max(DEFAULT_STAGE_TIMEOUTS.values()))
+        for stage, future in futures.items()
+    }
+    stages = {future: stage for stage, future in futures.items()}
+    outcomes = {}
+    pending = set(stages)
+    
+    while pending:
+        now = time.monotonic()
+        for future in [future for future in pending if deadlines[future] <= now]:
+            future.cancel()
+            pending.discard(future)
+            outcomes[stages[future]] = (None, TimeoutError(f"{stages[future]} check timed out"))
+            record_stage_error(stages[future], outcomes[stages[future]][1])
+        if not pending:
+            break
+        
+        done, pending = wait(
+            pending, timeout=min(deadlines[future] for future in pending) - now, return_when=FIRST_COMPLETED
+        )
+        for future in done:
+            stage = stages[future]
+            try:
+                outcomes[stage] = (future.result(), None)
+            except Exception as e:
+                outcomes[stage] = (None, e)
+            
+            if outcomes[stage][1] is None and is_definitive(stage, outcomes[stage][0]):
+                for other in pending:
+                    other.cancel()
+                return outcomes
+    
+    return outcomes
+
+def _similarity_error_result(business_name, fuzzy_matches, error):
+    """Similarity result when the vector search failed: fuzzy-only if possible, else an error"""
+    if fuzzy_matches is not None:
+        return _fuzzy_only_result(business_name, fuzzy_matches, error=error)
+    return {'status': 'ERROR', 'reason': f'Database error: {str(error)}', 'matches': []}
+
+def is_cacheable_result(result):
+    """True unless a check failed, timed out or was cut short, so degraded and partial verdicts are recomputed"""
+    return (not result.get('degraded') and not result.get('partial')
+            and result['similarity_result']['status'] != 'ERROR')
+
+def analyze_business_name(business_name, companies_store, hate_store, llm, name_index=None, filters=None,
+                          fuzzy_index=None, hate_matcher=None, stage_timeouts=None, screen_alternatives=True,
+                          result_cache=None):
+    """Comprehensive business name analysis with special character detection.
+
+    The hate-word and company similarity searches run concurrently on the
+    stage pool, each with its own timeout. A definitive result (a prohibited
+    term, or an exact / near-identical registered name) cancels the other stage.
+    When alternatives are suggested, they are pre-screened so that only
+    available names are offered. With a result_cache, results are reused
+    until the registry or hate list changes.
+    """
+    if result_cache is not None:
+        return result_cache.get_or_compute(
+            business_name,
+            lambda: analyze_business_name(
+                business_name, companies_store, hate_store, llm, name_index, filters,
+                fuzzy_index, hate_matcher, stage_timeouts, screen_alternatives
+            ),
+            variant={'filters': filters, 'screen_alternatives': screen_alternatives},
+            cacheable=is_cacheable_result
+        )
+    
+    with span("analysis"):
+        result = _analyze_business_name(
+            business_name, companies_store, hate_store, llm, name_index, filters,
+            fuzzy_index, hate_matcher, stage_timeouts
+        )
+    if screen_alternatives and (companies_store or name_index is not None):
+        try:
+            with span("alternatives_screening"):
+                _screen_alternatives(
+                    [business_name], [result], companies_store, hate_store, llm, name_index,
+                    fuzzy_index=fuzzy_index, hate_matcher=hate_matcher
+                )
+        except Exception as e:
+            print(f"Error screening alternatives: {str(e)}")
+    return result
+
+def _analyze_business_name(business_name, companies_store, hate_store, llm, name_index=None, filters=None,
+                           fuzzy_index=None, hate_matcher=None, stage_timeouts=None):
+    """Run the checks of analyze_business_name, with unscreened alternatives"""
+    if not business_name or not business_name.strip():
+        return _empty_name_result()
+    
+    # Check for special characters FIRST (highest priority)
+    with span("special_characters"):
+        has_special_chars, special_chars_list = check_special_characters(business_name)
+    if has_special_chars:
+        return _special_chars_result(business_name, special_chars_list)
+    
+    # Exact registered duplicates are answered from the in-memory index
+    # (built over the whole registry, so it only applies to unfiltered checks)
+    if name_index is not None and not filters:
+        with span("exact_index"):
+            duplicate_result = exact_duplicate_result(business_name, name_index)
+        if duplicate_result:
+            return _analysis_result(business_name, [], duplicate_result)
+    
+    # Literal prohibited terms are settled locally and skip the hate vector search
+    matched_hate_terms = []
+    if hate_matcher is not None:
+        with span("hate_matcher"):
+            matched_hate_terms = hate_matcher.match(business_name)
+    
+    timeouts = {**DEFAULT_STAGE_TIMEOUTS, **(stage_timeouts or {})}
+    futures = {}
+    if hate_store and not matched_hate_terms:
+        futures['hate_words'] = _submit_stage(
+            _timed_similarity_search, hate_store, business_name.lower(), "hate"
+        )
+    
+    # Fuzzy candidates are computed here while the hate search is in flight
+    fuzzy_matches = None
+    if fuzzy_index is not None and not filters:
+        with span("fuzzy_search"):
+            fuzzy_matches = fuzzy_index.search(business_name)
+    
+    if companies_store:
+        futures['similarity'] = _submit_stage(
+            lambda: _similarity_result_from_results(
+                business_name,
+                _timed_similarity_search(
+                    companies_store, business_name, "similarity", filter=build_company_filter(filters)
+                ),
+                fuzzy_matches
+            )
+        )
+    
+    # A registered duplicate settles the name; a prohibited term does not cancel the
+    # similarity check, so the result always carries the real similarity verdict
+    def is_definitive(stage, result):
+        return stage == 'similarity' and result['status'] == 'NOT AVAILABLE'
+    
+    outcomes = _run_stages(futures, timeouts, is_definitive)
+    
+    hate_matches = matched_hate_terms
+    degraded = False
+    # A hate stage that timed out or was cancelled by a definitive similarity verdict
+    # leaves the name's hate-word status unknown: the result is partial
+    partial = 'hate_words' in futures and outcomes.get('hate_words', (None, None))[0] is None
+    results, error = outcomes.get('hate_words', (None, None))
+    if error is not None:
+        st.error(f"Hate word check error: {str(error)}")
+        degraded = True
+    elif results is not None:
+        hate_matches = _hate_matches_from_results(results)
+    
+    if 'similarity' in outcomes:
+        similarity_result, error = outcomes['similarity']
+        if error is not None:
+            similarity_result = _similarity_error_result(business_name, fuzzy_matches, error)
+            degraded = True
+    elif fuzzy_matches is not None:
+        similarity_result = _fuzzy_only_result(business_name, fuzzy_matches)
+    else:
+        similarity_result = {
+            'status': 'ERROR',
+            'reason': 'Invalid input or database unavailable',
+            'matches': []
+        }
+    
+    result = _analysis_result(business_name, hate_matches, similarity_result)
+    if degraded:
+        result['degraded'] = True
+    if partial:
+        result['partial'] = True
+    return result
+
+def extract_and_analyze_business_name(query, companies_store, hate_store, llm, name_index=None,
+                                      fuzzy_index=None, hate_matcher=None, llm_cache=None, result_cache=None):
+    """Extract the business name from a query and analyze it.
+
+    When the rules are unsure and the LLM has to extract the name, the rule
+    candidate (if any) is analyzed while the LLM call is in flight, and that
+    result is kept if the LLM agrees. An extraction that times out falls back
+    to the rule candidate. Returns (business_name, analysis_result), or
+    (None, None) when the query names no business.
+    """
+    extraction_future = _submit_stage(
+        extract_business_name_from_query, query, llm, llm_cache=llm_cache, executor=EXTRACTION_EXECUTOR
+    )
+    
+    speculative_name, speculative_result = None, None
+    extraction = extract_business_name_rules(query)
+    if llm is not None and extraction['name'] and extraction['confidence'] < DEFAULT_MIN_CONFIDENCE:
+        speculative_name = extraction['name']
+        speculative_result = analyze_business_name(
+            speculative_name, companies_store, hate_store, llm, name_index,
+            fuzzy_index=fuzzy_index, hate_matcher=hate_matcher, result_cache=result_cache
+        )
+    
+    try:
+        business_name = extraction_future.result(timeout=DEFAULT_STAGE_TIMEOUTS['extraction'])
+    except Exception as e:
+        extraction_future.cancel()
+        record_stage_error('extraction', e)
+        business_name = extraction['name']
+    if not business_name:
+        return None, None
+    if business_name == speculative_name:
+        return business_name, speculative_result
+    
+    return business_name, analyze_business_name(
+        business_name, companies_store, hate_store, llm, name_index,
+        fuzzy_index=fuzzy_index, hate_matcher=hate_matcher, result_cache=result_cache
+    )
+
+def _fallback_similarity_results(names, pending, fuzzy_batches, error=None):
+    """Similarity results when the vector path is unavailable: fuzzy-only if possible, else errors"""
+    results = []
+    for i, fuzzy_matches in zip(pending, fuzzy_batches):
+        if error is not None:
+            results.append(_similarity_error_result(names[i], fuzzy_matches, error))
+        elif fuzzy_matches is not None:
+            results.append(_fuzzy_only_result(names[i], fuzzy_matches))
+        else:
+            results.append({'status': 'ERROR', 'reason': 'Invalid input or database unavailable', 'matches': []})
+    return results
+
+def analyze_business_names(names, companies_store, hate_store, llm, name_index=None, filters=None,
+                           fuzzy_index=None, hate_matcher=None, k=5, threshold=0.8, screen_alternatives=False,
+                           result_cache=None):
+    """Analyze several business names with one batched embedding call and one query per store.
+
+    With screen_alternatives, the alternatives of every rejected name are
+    pre-screened together in one more batched pass, as analyze_business_name does.
+    With a result_cache, only the names without a current cached result are analyzed.
+    """
+    names = list(names)
+    if result_cache is not None:
+        variant = {'filters': filters, 'k': k, 'threshold': threshold, 'screen_alternatives': screen_alternatives}
+        stamp = result_cache.current_stamp()
+        results = [result_cache.get(name, stamp, variant) for name in names]
+        misses = [i for i, result in enumerate(results) if result is None]
+        if misses:
+            computed = analyze_business_names(
+                [names[i] for i in misses], companies_store, hate_store, llm, name_index, filters,
+                fuzzy_index, hate_matcher, k, threshold, screen_alternatives
+            )
+            for i, result in zip(misses, computed):
+                results[i] = result
+                if is_cacheable_result(result):
+                    result_cache.put(names[i], result, stamp, variant)
+        return results
+    
+    results = _analyze_business_names(
+        names, companies_store, hate_store, llm, name_index, filters, fuzzy_index, hate_matcher, k, threshold
+    )
+    if screen_alternatives and (companies_store or name_index is not None):
+        try:
+            _screen_alternatives(
+                names, results, companies_store, hate_store, llm, name_index,
+                fuzzy_index=fuzzy_index, hate_matcher=hate_matcher
+            )
+        except Exception as e:
+            print(f"Error screening alternatives: {str(e)}")
+    return results
+
+def _analyze_business_names(names, companies_store, hate_store, llm, name_index=None, filters=None,
+                            fuzzy_index=None, hate_matcher=None, k=5, threshold=0.8):
+    """Run the checks of analyze_business_names, with unscreened alternatives"""
+    results = [None] * len(names)
+    pending = []
+    # Empty entries (None included) are checked as "" and answered below as empty names
+    for i, name in enumerate(names):
+        if not name or not name.strip():
+            results[i] = _empty_name_result()
+        elif (special_chars := check_special_characters(name))[0]:
+            results[i] = _special_chars_result(name, special_chars[1])
+        elif name_index is not None and not filters and (
+            duplicate_result := exact_duplicate_result(name, name_index)
+        ):
+            results[i] = _analysis_result(name, [], duplicate_result)
+        else:
+            pending.append(i)
+    
+    if not pending:
+        return results
+    
+    # Names the hate term matcher settles skip the hate vector search
+    hate_settled = [hate_matcher.match(names[i]) if hate_matcher is not None else [] for i in pending]
+    hate_pending = [j for j, settled in enumerate(hate_settled) if not settled]
+    
+    # Hate words are matched on the lowercased name, companies on the name as typed
+    hate_texts = [names[pending[j]].lower() for j in hate_pending] if hate_store else []
+    company_texts = [names[i] for i in pending] if companies_store else []
+    
+    fuzzy_batches = [None] * len(pending)
+    if fuzzy_index is not None and not filters:
+        fuzzy_batches = [fuzzy_index.search(names[i]) for i in pending]
+    
+    hate_batches = [[] for _ in hate_pending]
+    similarity_results = _fallback_similarity_results(names, pending, fuzzy_batches)
+    degraded = set()
+    
+    try:
+        # One embedding request per embedding model for every distinct text both stores need
+        texts_by_embeddings = {}
+        for store, texts in ((hate_store, hate_texts), (companies_store, company_texts)):
+            if store and texts:
+                texts_by_embeddings.setdefault(id(store.embeddings), (store.embeddings, []))[1].extend(texts)
+        
+        vectors = {}
+        for key, (embeddings, texts) in texts_by_embeddings.items():
+            unique_texts = list(dict.fromkeys(texts))
+            with span("batch_embedding"):
+                unique_vectors = embed_queries(embeddings, unique_texts)
+            for text, vector in zip(unique_texts, unique_vectors):
+                vectors[(key, text)] = vector
+    except Exception as e:
+        st.error(f"Embedding error: {str(e)}")
+        similarity_results = _fallback_similarity_results(names, pending, fuzzy_batches, error=e)
+        hate_store = companies_store = None
+        degraded.update(pending)
+    
+    if hate_store and hate_texts:
+        try:
+            key = id(hate_store.embeddings)
+            with span("batch_hate_query"):
+                hate_batches = query_store_by_vectors(
+                    hate_store, [vectors[(key, text)] for text in hate_texts], k=k
+                )
+        except Exception as e:
+            st.error(f"Hate word check error: {str(e)}")
+            degraded.update(pending[j] for j in hate_pending)
+    
+    if companies_store:
+        try:
+            key = id(companies_store.embeddings)
+            with span("batch_similarity_query"):
+                company_batches = _query_companies_by_vectors(
+                    companies_store, [vectors[(key, text)] for text in company_texts],
+                    k=k, where=build_company_filter(filters)
+                )
+            similarity_results = [
+                _similarity_result_from_results(names[i], batch, fuzzy_matches)
+                for i, batch, fuzzy_matches in zip(pending, company_batches, fuzzy_batches)
+            ]
+        except Exception as e:
+            similarity_results = _fallback_similarity_results(names, pending, fuzzy_batches, error=e)
+            degraded.update(pending)
+    
+    for j, hate_batch in zip(hate_pending, hate_batches):
+        hate_settled[j] = _hate_matches_from_results(hate_batch, threshold)
+    
+    for i, hate_matches, similarity_result in zip(pending, hate_settled, similarity_results):
+        results[i] = _analysis_result(names[i], hate_matches, similarity_result)
+        if i in degraded:
+            results[i]['degraded'] = True
+    
+    return results
+
+def display_analysis_results(business_name, analysis_result, key_prefix=""):
+    """Display comprehensive analysis results with special character handling.
+
+    Returns the alternative whose button was clicked, if any; key_prefix
+    keeps the buttons of several result panels on one page distinct.
+    """
+    clicked = None
     st.markdown(f"### 🎯 Analyzing: **{business_name}**")
     
     # Special characters check (highest priority)
@@ -293,9 +892,9 @@ def display_analysis_results(business_name, analysis_result):
             col1, col2, col3 = st.columns(3)
             for i, alt in enumerate(analysis_result['alternatives']):
                 with [col1, col2, col3][i % 3]:
-                    if st.button(f"✅ {alt}", key=f"special_alt_{i}", use_container_width=True):
-                        return alt
-        return None
+                    if st.button(f"✅ {alt}", key=f"{key_prefix}special_alt_{i}", use_container_width=True):
+                        clicked = alt
+        return clicked
     
     # Hate words check
     if analysis_result['hate_words']:
@@ -309,9 +908,12 @@ def display_analysis_results(business_name, analysis_result):
             col1, col2, col3 = st.columns(3)
             for i, alt in enumerate(analysis_result['alternatives']):
                 with [col1, col2, col3][i % 3]:
-                    if st.button(f"✅ {alt}", key=f"hate_alt_{i}", use_container_width=True):
-                        return alt
-        return None
+                    if st.button(f"✅ {alt}", key=f"{key_prefix}hate_alt_{i}", use_container_width=True):
+                        clicked = alt
+        return clicked
+    
+    if analysis_result.get('partial'):
+        st.warning("⚠️ The inappropriate-content check did not complete for this name; check it again before registering.")
     
     # Business similarity check
     similarity_result = analysis_result['similarity_result']
@@ -348,8 +950,8 @@ def display_analysis_results(business_name, analysis_result):
             col1, col2, col3 = st.columns(3)
             for i, alt in enumerate(analysis_result['alternatives']):
                 with [col1, col2, col3][i % 3]:
-                    if st.button(f"✅ {alt}", key=f"sim_alt_{i}", use_container_width=True):
-                        return alt
+                    if st.button(f"✅ {alt}", key=f"{key_prefix}sim_alt_{i}", use_container_width=True):
+                        clicked = alt
     
     elif status == 'HIGH RISK':
         st.error("⚠️ **HIGH RISK - SIMILAR NAMES EXIST**")
@@ -361,8 +963,8 @@ def display_analysis_results(business_name, analysis_result):
             col1, col2, col3 = st.columns(3)
             for i, alt in enumerate(analysis_result['alternatives']):
                 with [col1, col2, col3][i % 3]:
-                    if st.button(f"✅ {alt}", key=f"risk_alt_{i}", use_container_width=True):
-                        return alt
+                    if st.button(f"✅ {alt}", key=f"{key_prefix}risk_alt_{i}", use_container_width=True):
+                        clicked = alt
     
     elif status == 'MEDIUM RISK':
         st.warning("⚠️ **MEDIUM RISK - PROCEED WITH CAUTION**")
@@ -377,4 +979,4 @@ def display_analysis_results(business_name, analysis_result):
     else:
         st.error(f"❌ **ERROR:** {similarity_result['reason']}")
     
-    return None
\ No newline at end of file
+    return clicked
\ No newline at end of file
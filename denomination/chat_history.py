@@ -0,0 +1,135 @@
+import collections
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+# ============================================================================
+# PAGED-OUT MESSAGE STORE
+# ============================================================================
+
+DEFAULT_CHAT_HISTORY_PATH = "./chroma_db/chat_history.sqlite3"
+
+class ChatHistoryStore:
+    """Chat messages paged out of the sessions' in-memory histories, in SQLite.
+
+    One store serves every session of the process; rows are keyed by session
+    ID and message sequence number. Sessions without a write for ttl_seconds
+    are dropped when the store is opened, then by a write at most every
+    prune_interval seconds.
+    """
+
+    def __init__(self, path=DEFAULT_CHAT_HISTORY_PATH, ttl_seconds=24 * 3600, prune_interval=3600):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.prune_interval = prune_interval
+        self._pruned_at = time.monotonic()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_history ("
+            "session_id TEXT, seq INTEGER, message TEXT, stored_at REAL, PRIMARY KEY (session_id, seq))"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.prune()
+
+    def put(self, session_id, seq, message):
+        """Store (or overwrite) one message of a session"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chat_history (session_id, seq, message, stored_at) VALUES (?, ?, ?, ?)",
+                (session_id, seq, json.dumps(message, ensure_ascii=False), time.time())
+            )
+        if time.monotonic() - self._pruned_at >= self.prune_interval:
+            self.prune()
+
+    def load(self, session_id, start_seq, end_seq):
+        """A session's stored messages with start_seq <= seq < end_seq, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT message FROM chat_history WHERE session_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                (session_id, start_seq, end_seq)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def prune(self):
+        """Drop the messages of sessions idle for longer than the TTL"""
+        self._pruned_at = time.monotonic()
+        if not self.ttl_seconds:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM chat_history WHERE session_id IN ("
+                "SELECT session_id FROM chat_history GROUP BY session_id HAVING MAX(stored_at) < ?)",
+                (time.time() - self.ttl_seconds,)
+            )
+
+# ============================================================================
+# SESSION HISTORY
+# ============================================================================
+
+class ChatHistory:
+    """One session's chat messages: the newest in a ring buffer, older ones paged out to a ChatHistoryStore.
+
+    append() numbers each message with a "seq"; once the buffer holds
+    capacity messages, the oldest is written to the store as the next one
+    comes in. window() returns the newest messages for display, loading
+    paged-out ones back while they are displayed; release() writes those
+    back (with any changes, such as alternatives checked in their result
+    panel) and lets them go. Messages must be JSON-serializable.
+    """
+
+    def __init__(self, store, session_id=None, capacity=40):
+        self.store = store
+        self.session_id = session_id or uuid.uuid4().hex
+        self._recent = collections.deque(maxlen=capacity)
+        self._loaded = {}
+        self._next_seq = 0
+
+    def __len__(self):
+        return self._next_seq
+
+    def append(self, message):
+        """Add a message; returns the stored dict, with its seq"""
+        if len(self._recent) == self._recent.maxlen:
+            oldest = self._recent[0]
+            self.store.put(self.session_id, oldest["seq"], oldest)
+        message = {**message, "seq": self._next_seq}
+        self._next_seq += 1
+        self._recent.append(message)
+        return message
+
+    def message(self, seq):
+        """The message with this seq if it is in memory (recent or loaded back), else None"""
+        if self._recent:
+            index = seq - self._recent[0]["seq"]
+            if 0 <= index < len(self._recent):
+                return self._recent[index]
+        return self._loaded.get(seq)
+
+    def window(self, count):
+        """The newest count messages, oldest first"""
+        if not self._recent:
+            return []
+        first = self._recent[0]["seq"]
+        start = max(0, self._next_seq - count)
+        if start >= first:
+            return list(self._recent)[start - first:]
+
+        if any(seq not in self._loaded for seq in range(start, first)):
+            for message in self.store.load(self.session_id, start, first):
+                self._loaded.setdefault(message["seq"], message)
+        earlier = [self._loaded[seq] for seq in range(start, first) if seq in self._loaded]
+        return earlier + list(self._recent)
+
+    def release(self):
+        """Write the messages loaded back by window() to the store and drop them from memory"""
+        for seq, message in self._loaded.items():
+            self.store.put(self.session_id, seq, message)
+        self._loaded.clear()
@@ -0,0 +1,187 @@
+"""Client/server mode for the Chroma vector stores.
+
+By default each process opens the embedded stores under ./chroma_db. With
+CHROMA_SERVER_URL set (e.g. http://127.0.0.1:8000), the stores live in one
+local Chroma server instead: every app worker, the service and the ingestion
+scripts reach it through one pooled HTTP client per process, so replicas
+share a single copy of the collections and a single writer.
+
+Usage (from the denomination/ directory):
+    python chroma_server.py serve --port 8000
+    CHROMA_SERVER_URL=http://127.0.0.1:8000 python chroma_server.py import
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+DEFAULT_CHROMA_SERVER_PATH = "./chroma_db/server"
+
+# Embedded store directories, imported into the server by `import`
+EMBEDDED_DIRECTORIES = ("./chroma_db/companies", "./chroma_db/hate_words")
+
+# Retries of a request whose connection is refused, e.g. while the server restarts
+# (httpx backs off 0.5s, 1s, 2s... between them: about 15s in all)
+CONNECT_RETRIES = 6
+
+def get_chroma_server_url(config=None):
+    """Configured server URL: config (e.g. st.secrets), then CHROMA_SERVER_URL env var; None for embedded stores"""
+    url = (config or {}).get("CHROMA_SERVER_URL") or os.getenv("CHROMA_SERVER_URL")
+    return url.strip().rstrip("/") if url and url.strip() else None
+
+# ============================================================================
+# POOLED CLIENT
+# ============================================================================
+
+_clients = {}
+_clients_lock = threading.Lock()
+_health_session = None
+
+def _connect(url, max_connections=None, retries=CONNECT_RETRIES):
+    import chromadb
+    import httpx
+    from chromadb.config import Settings
+
+    parsed = urlparse(url if "://" in url else f"http://{url}")
+    ssl = parsed.scheme == "https"
+    settings = Settings(anonymized_telemetry=False)
+    if max_connections:
+        settings.chroma_http_max_connections = max_connections
+        settings.chroma_http_max_keepalive_connections = max_connections
+    client = chromadb.HttpClient(
+        host=parsed.hostname or "localhost", port=parsed.port or (443 if ssl else 8000), ssl=ssl, settings=settings
+    )
+
+    # The client keeps its connections alive in one httpx pool; give that pool a transport that
+    # retries refused connections, so requests made while the server restarts reconnect to it
+    server = getattr(client, "_server", None)
+    session = getattr(server, "_session", None)
+    if isinstance(session, httpx.Client) and hasattr(server, "http_limits"):
+        verify = settings.chroma_server_ssl_verify
+        server._session = httpx.Client(
+            timeout=None,
+            headers=session.headers,
+            transport=httpx.HTTPTransport(
+                limits=server.http_limits, retries=retries, verify=True if verify is None else verify
+            )
+        )
+        session.close()
+    return client
+
+def wait_for_server(client, wait_seconds=30):
+    """Heartbeat the server until it answers, backing off between attempts; raises ConnectionError after wait_seconds"""
+    deadline = time.monotonic() + wait_seconds
+    delay = 0.25
+    while True:
+        try:
+            return client.heartbeat()
+        except Exception as e:
+            if time.monotonic() + delay > deadline:
+                raise ConnectionError(f"Chroma server is not answering: {str(e)}") from e
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
+
+def get_server_client(url, max_connections=None, wait_seconds=30):
+    """The process-wide client for a Chroma server, created and health-checked on first use.
+
+    All stores and threads of the process share it, and with it one pool of
+    keep-alive connections (max_connections, else Chroma's
+    CHROMA_HTTP_MAX_CONNECTIONS setting). A server that went away is
+    reconnected to on the next request; there is nothing to reopen.
+    """
+    with _clients_lock:
+        client = _clients.get(url)
+        if client is None:
+            client = _connect(url, max_connections)
+            wait_for_server(client, wait_seconds)
+            _clients[url] = client
+        return client
+
+def server_health(url, timeout=2.0):
+    """{"status": "ok", "latency_ms": ...} if the server answers a heartbeat, else {"status": "unreachable", "error": ...}.
+
+    Sent outside the pooled client, whose connect retries would hold the
+    check for seconds: a server that is down is reported within the timeout.
+    """
+    global _health_session
+    import httpx
+
+    if _health_session is None:
+        _health_session = httpx.Client()
+    start = time.perf_counter()
+    try:
+        response = _health_session.get(
+            f"{url if '://' in url else f'http://{url}'}/api/v2/heartbeat", timeout=timeout
+        )
+        response.raise_for_status()
+    except Exception as e:
+        return {"status": "unreachable", "error": str(e)}
+    return {"status": "ok", "latency_ms": (time.perf_counter() - start) * 1000}
+
+# ============================================================================
+# IMPORT
+# ============================================================================
+
+def import_embedded_stores(client, directories=EMBEDDED_DIRECTORIES, batch_size=1000):
+    """Copy every collection of the embedded stores into the server, vectors included.
+
+    Upserts by ID, so an interrupted import is simply run again. Returns
+    {collection name: records copied}.
+    """
+    import chromadb
+
+    copied = {}
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        source_client = chromadb.PersistentClient(path=directory)
+        for collection in source_client.list_collections():
+            source = source_client.get_collection(collection.name, embedding_function=None)
+            target = client.get_or_create_collection(
+                source.name, metadata=source.metadata or None, embedding_function=None
+            )
+            offset = 0
+            while True:
+                batch = source.get(
+                    include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset
+                )
+                if not batch["ids"]:
+                    break
+                target.upsert(
+                    ids=batch["ids"],
+                    embeddings=batch["embeddings"],
+                    documents=batch["documents"],
+                    metadatas=batch["metadatas"]
+                )
+                offset += len(batch["ids"])
+            copied[source.name] = offset
+    return copied
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Run the Chroma server the app workers share")
+    serve.add_argument("--path", default=DEFAULT_CHROMA_SERVER_PATH, help="Server persist directory")
+    serve.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    serve.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    copy = commands.add_parser("import", help="Copy the embedded stores into the server at CHROMA_SERVER_URL")
+    copy.add_argument("--batch-size", type=int, default=1000, help="Records copied per request")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        os.makedirs(args.path, exist_ok=True)
+        os.execvp("chroma", ["chroma", "run", "--path", args.path, "--host", args.host, "--port", str(args.port)])
+
+    url = get_chroma_server_url()
+    if not url:
+        sys.exit("Set CHROMA_SERVER_URL to the server to import into")
+    try:
+        start = time.perf_counter()
+        copied = import_embedded_stores(get_server_client(url), batch_size=args.batch_size)
+    except ConnectionError as e:
+        sys.exit(str(e))
+    for name, count in copied.items():
+        print(f"  {name}: {count:,} records")
+    print(f"Imported {len(copied)} collections into {url} in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from langchain_core.embeddings import Embeddings
+
+# ============================================================================
+# EMBEDDING CACHE
+# ============================================================================
+
+DEFAULT_CACHE_PATH = "./chroma_db/embedding_cache.sqlite3"
+
+# Part of every key; bumped when the keying changes so older entries are never read
+CACHE_KEY_VERSION = 2
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper with an in-memory LRU backed by an on-disk SQLite store.
+
+    Query embeddings are keyed on the exact text plus model name, so a hit
+    returns the vector a cold call would. Document embeddings (ingestion)
+    pass straight through.
+    """
+
+    def __init__(self, embeddings, model_name, path=DEFAULT_CACHE_PATH, max_memory_entries=10000):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, model TEXT, vector BLOB)"
+            )
+            self._conn.commit()
+
+    def _key(self, text):
+        """Cache key for a text under this model"""
+        return hashlib.sha256(f"{CACHE_KEY_VERSION}\x00{self.model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key, vector):
+        """Insert into the in-memory LRU, evicting the least recently used entry"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def embed_queries(self, texts):
+        """Embed several query texts, calling the wrapped model once for all misses"""
+        texts = list(texts)
+        keys = [self._key(text) for text in texts]
+        found = {}
+
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+
+            missing = [key for key in dict.fromkeys(keys) if key not in found]
+            if missing and self._conn:
+                placeholders = ",".join("?" * len(missing))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", missing
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array('f', blob).tolist()
+                    found[key] = vector
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+
+        to_embed = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                to_embed.setdefault(key, text)
+
+        if to_embed:
+            vectors = self.embeddings.embed_documents(list(to_embed.values()))
+            with self._lock:
+                for key, vector in zip(to_embed, vectors):
+                    found[key] = vector
+                    self._remember(key, vector)
+                if self._conn:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)",
+                        [(key, self.model_name, array('f', found[key]).tobytes()) for key in to_embed]
+                    )
+                    self._conn.commit()
+
+        with self._lock:
+            self.misses += len(to_embed)
+            self.hits += len(keys) - len(to_embed)
+
+        return [found[key] for key in keys]
+
+    def embed_query(self, text):
+        """Embed a single query text through the cache"""
+        return self.embed_queries([text])[0]
+
+    def embed_documents(self, texts):
+        """Embed documents for ingestion, bypassing the cache"""
+        return self.embeddings.embed_documents(texts)
+
+    def stats(self):
+        """Hit/miss counters for the cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "memory_entries": len(self._memory)
+            }
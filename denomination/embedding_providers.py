@@ -0,0 +1,122 @@
+import os
+import unicodedata
+import zlib
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# ============================================================================
+# LOCAL EMBEDDINGS
+# ============================================================================
+
+class HashingEmbeddings(Embeddings):
+    """Local CPU embeddings: signed, hashed character n-gram counts, L2-normalized.
+
+    No network, no model download and no API key; similar spellings share most
+    n-grams and therefore land close together, which is what name matching needs.
+    """
+
+    def __init__(self, dimensions=512, ngram_range=(2, 4)):
+        self.dimensions = dimensions
+        self.ngram_range = ngram_range
+        self.model_name = f"local-hashing-{dimensions}"
+
+    def _ngram_hashes(self, text):
+        """CRC32 hashes of the boundary-padded character n-grams of text"""
+        text = ' '.join(unicodedata.normalize('NFKC', text).casefold().split())
+        padded = f" {text} "
+        low, high = self.ngram_range
+        return np.array(
+            [zlib.crc32(padded[i:i + n].encode('utf-8'))
+             for n in range(low, high + 1)
+             for i in range(len(padded) - n + 1)],
+            dtype=np.uint32
+        )
+
+    def _embed(self, text):
+        """Embed one text as a unit-length vector"""
+        hashes = self._ngram_hashes(text)
+        if not len(hashes):
+            return [0.0] * self.dimensions
+        signs = np.where(hashes & np.uint32(0x80000000), -1.0, 1.0)
+        vector = np.bincount(hashes % self.dimensions, weights=signs, minlength=self.dimensions)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        """Embed documents locally"""
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        """Embed a query locally"""
+        return self._embed(text)
+
+# ============================================================================
+# PROVIDER REGISTRY
+# ============================================================================
+
+DEFAULT_EMBEDDING_BACKEND = "openai"
+
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+
+def get_embedding_base_url():
+    """OPENAI_EMBEDDING_BASE_URL, pointing the openai backend at another OpenAI-compatible server; None for OpenAI"""
+    base_url = os.getenv("OPENAI_EMBEDDING_BASE_URL")
+    return base_url.strip().rstrip("/") if base_url and base_url.strip() else None
+
+def _base_url_tag(base_url):
+    """Short, collection-name-safe tag of a base URL"""
+    return f"{zlib.crc32(base_url.encode('utf-8')):08x}"
+
+def _create_openai_embeddings(openai_key=None):
+    """Remote OpenAI embeddings (text-embedding-3-small)"""
+    from langchain_openai import OpenAIEmbeddings
+    
+    # OPENAI_EMBEDDING_BASE_URL points the client at an OpenAI-compatible server
+    # (e.g. benchmarks/stub_embedding_server.py), which gets plain text input.
+    # Its vectors are not OpenAI's: the server is part of the model name the cache keys on
+    base_url = get_embedding_base_url()
+    if base_url:
+        embeddings = OpenAIEmbeddings(
+            api_key=openai_key or "stub", model=OPENAI_EMBEDDING_MODEL,
+            base_url=base_url, check_embedding_ctx_length=False
+        )
+        return embeddings, f"{OPENAI_EMBEDDING_MODEL}@{base_url}"
+    
+    return OpenAIEmbeddings(api_key=openai_key, model=OPENAI_EMBEDDING_MODEL), OPENAI_EMBEDDING_MODEL
+
+def _create_local_embeddings(openai_key=None):
+    """Local hashed character n-gram embeddings"""
+    embeddings = HashingEmbeddings()
+    return embeddings, embeddings.model_name
+
+# backend name -> (factory, remote); remote backends are worth caching
+EMBEDDING_BACKENDS = {
+    "openai": (_create_openai_embeddings, True),
+    "local": (_create_local_embeddings, False),
+}
+
+def get_embedding_backend(config=None):
+    """Configured backend name: config (e.g. st.secrets), then EMBEDDING_BACKEND env var, then the default"""
+    backend = (config or {}).get("EMBEDDING_BACKEND") or os.getenv("EMBEDDING_BACKEND") or DEFAULT_EMBEDDING_BACKEND
+    backend = backend.strip().lower()
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Choose from: {', '.join(EMBEDDING_BACKENDS)}")
+    return backend
+
+def create_embeddings(backend=DEFAULT_EMBEDDING_BACKEND, openai_key=None):
+    """Create (embeddings, model_name, remote) for a backend"""
+    factory, remote = EMBEDDING_BACKENDS[backend]
+    embeddings, model_name = factory(openai_key)
+    return embeddings, model_name, remote
+
+def backend_requires_openai_key(backend):
+    """True if the backend calls the OpenAI API"""
+    return backend == "openai"
+
+def collection_name_for(base_name, backend=DEFAULT_EMBEDDING_BACKEND):
+    """Collection name for a backend; vectors from different backends (or embedding servers) never share a collection"""
+    if backend == "openai" and get_embedding_base_url():
+        return f"{base_name}_{backend}_{_base_url_tag(get_embedding_base_url())}"
+    if backend == DEFAULT_EMBEDDING_BACKEND:
+        return base_name
+    return f"{base_name}_{backend}"
@@ -0,0 +1,349 @@
+import re
+from array import array
+import numpy as np
+from name_index import normalize_name
+
+# ============================================================================
+# FUZZY KEYS
+# ============================================================================
+
+# Spaces and punctuation are dropped so "Tech Solutions" and "TechSolutions" share a key
+NON_ALNUM_PATTERN = re.compile(r'[\W_]+')
+
+# Myers' bit-parallel edit distance handles queries of up to 64 characters
+MAX_QUERY_LENGTH = 64
+
+def fuzzy_key(name):
+    """Normalized name without spaces or punctuation"""
+    return NON_ALNUM_PATTERN.sub('', normalize_name(name))
+
+# Boundary markers just above the Unicode range, so trigrams pack into 63 bits
+BOUNDARY_START = 0x110000
+BOUNDARY_END = 0x110001
+
+def trigram_values(keys):
+    """Packed boundary-padded trigrams of many keys as (uint64 values, key positions)"""
+    lengths = np.fromiter((len(key) for key in keys), dtype=np.int64, count=len(keys))
+    codes = np.frombuffer(''.join(keys).encode('utf-32-le'), dtype=np.uint32)
+
+    padded_lengths = lengths + 2
+    owners = np.repeat(np.arange(len(keys)), padded_lengths)
+    starts = np.concatenate(([0], np.cumsum(padded_lengths)[:-1]))
+    padded = np.empty(int(padded_lengths.sum()), dtype=np.uint64)
+    is_start = np.zeros(len(padded), dtype=bool)
+    is_start[starts] = True
+    is_end = np.zeros(len(padded), dtype=bool)
+    is_end[starts + padded_lengths - 1] = True
+    padded[is_start] = BOUNDARY_START
+    padded[is_end] = BOUNDARY_END
+    padded[~(is_start | is_end)] = codes
+
+    values = (padded[:-2] << np.uint64(42)) | (padded[1:-1] << np.uint64(21)) | padded[2:]
+    within_key = owners[:-2] == owners[2:]
+    return values[within_key], owners[:-2][within_key]
+
+def gram_hashes(values):
+    """32-bit multiplicative hashes of packed trigrams (collisions only widen the candidate set)"""
+    return (values * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)
+
+def ratio_to_score(ratio):
+    """Map an edit-distance ratio onto the vector distance scale (0 = identical, 2 = unrelated)"""
+    return 2 * (1 - ratio)
+
+# ============================================================================
+# EDIT DISTANCE
+# ============================================================================
+
+def edit_distances(query_codes, candidate_codes, candidate_lengths):
+    """Levenshtein distance from one query to many candidates at once.
+
+    Runs Myers' bit-parallel algorithm with one uint64 bit-vector per candidate,
+    so each candidate column costs a handful of NumPy operations across all
+    candidates instead of a Python-level dynamic programming table.
+    """
+    m = len(query_codes)
+    count, width = candidate_codes.shape
+    if m == 0:
+        return candidate_lengths.astype(np.int64)
+
+    alphabet, positions = np.unique(query_codes, return_inverse=True)
+    peq = np.zeros(len(alphabet), dtype=np.uint64)
+    for i, position in enumerate(positions):
+        peq[position] |= np.uint64(1 << i)
+
+    one = np.uint64(1)
+    high_bit = np.uint64(1 << (m - 1))
+    pv = np.full(count, np.uint64((1 << m) - 1))
+    mv = np.zeros(count, dtype=np.uint64)
+    scores = np.full(count, m, dtype=np.int64)
+
+    for j in range(width):
+        column = candidate_codes[:, j]
+        slots = np.minimum(np.searchsorted(alphabet, column), len(alphabet) - 1)
+        eq = np.where(alphabet[slots] == column, peq[slots], np.uint64(0))
+
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+
+        active = j < candidate_lengths
+        scores += active & ((ph & high_bit) != 0)
+        scores -= active & ((mh & high_bit) != 0)
+
+        ph = (ph << one) | one
+        mh = mh << one
+        pv = np.where(active, mh | ~(xv | ph), pv)
+        mv = np.where(active, ph & xv, mv)
+
+    return scores
+
+# ============================================================================
+# FUZZY NAME INDEX
+# ============================================================================
+
+class FuzzyNameIndex:
+    """Trigram inverted index over registered names with an edit-distance re-ranker.
+
+    Keys are stored as one flat uint32 code-point array with offsets, postings
+    as a CSR pair over sorted trigram hashes, and registry IDs and display names
+    as UTF-8 blobs, so 1M companies fit in a few hundred MB without per-name
+    Python objects.
+    """
+
+    def __init__(self):
+        self._doc_count = 0
+        self._id_offsets = np.zeros(1, dtype=np.int64)
+        self._id_blob = b''
+        self._entry_docs = np.zeros(0, dtype=np.int32)
+        self._entry_arabic = np.zeros(0, dtype=bool)
+        self._key_offsets = np.zeros(1, dtype=np.int64)
+        self._key_codes = np.zeros(0, dtype=np.uint32)
+        self._name_offsets = np.zeros(1, dtype=np.int64)
+        self._name_blob = b''
+        self._doc_entry_offsets = np.zeros(1, dtype=np.int64)
+        self._gram_values = np.zeros(0, dtype=np.uint64)
+        self._posting_offsets = np.zeros(1, dtype=np.int64)
+        self._postings = np.zeros(0, dtype=np.uint32)
+
+    @classmethod
+    def build(cls, records, chunk_size=100000):
+        """Build the index from company records with id / nom_ar / nom_fr"""
+        index = cls()
+        entry_docs = array('i')
+        entry_arabic = array('b')
+        name_lengths = array('q')
+        name_parts = []
+        doc_entry_counts = array('q')
+        id_lengths = array('q')
+        id_parts = []
+        key_chunks = []
+        key_length_chunks = []
+        pair_chunks = []
+        pending_keys = []
+
+        def flush():
+            """Vectorize the trigrams of the pending keys into packed (gram, entry) pairs"""
+            first_entry = len(entry_docs) - len(pending_keys)
+            values, owners = trigram_values(pending_keys)
+            entries = owners.astype(np.uint64) + np.uint64(first_entry)
+            pairs = np.sort((gram_hashes(values) << np.uint64(32)) | entries)
+            # Keep each (trigram, entry) pair once; entries never span chunks
+            pair_chunks.append(pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))])
+            key_chunks.append(np.frombuffer(''.join(pending_keys).encode('utf-32-le'), dtype=np.uint32))
+            key_length_chunks.append(np.fromiter((len(key) for key in pending_keys), dtype=np.int64))
+            pending_keys.clear()
+
+        for record in records:
+            entries_before = len(entry_docs)
+            for name, arabic in ((record.get('nom_ar'), True), (record.get('nom_fr'), False)):
+                key = fuzzy_key(name)[:MAX_QUERY_LENGTH] if name else ''
+                if not key:
+                    continue
+                encoded_name = name.encode('utf-8')
+                entry_docs.append(len(id_parts))
+                entry_arabic.append(arabic)
+                name_lengths.append(len(encoded_name))
+                name_parts.append(encoded_name)
+                pending_keys.append(key)
+            if len(entry_docs) > entries_before:
+                encoded_id = str(record['id']).encode('utf-8')
+                id_lengths.append(len(encoded_id))
+                id_parts.append(encoded_id)
+                doc_entry_counts.append(len(entry_docs) - entries_before)
+            if len(pending_keys) >= chunk_size:
+                flush()
+        if pending_keys:
+            flush()
+
+        if not id_parts:
+            return index
+
+        name_blob = b''.join(name_parts)
+        index._doc_count = len(id_parts)
+        index._id_offsets = np.concatenate(([0], np.cumsum(np.frombuffer(id_lengths, dtype=np.int64))))
+        index._id_blob = b''.join(id_parts)
+        del id_parts[:], name_parts[:]
+
+        index._entry_docs = np.frombuffer(entry_docs, dtype=np.int32).copy()
+        index._entry_arabic = np.frombuffer(entry_arabic, dtype=np.int8).astype(bool)
+        index._key_codes = np.concatenate(key_chunks)
+        index._key_offsets = np.concatenate(([0], np.cumsum(np.concatenate(key_length_chunks))))
+        index._name_offsets = np.concatenate(([0], np.cumsum(np.frombuffer(name_lengths, dtype=np.int64))))
+        index._name_blob = name_blob
+        index._doc_entry_offsets = np.concatenate(([0], np.cumsum(np.frombuffer(doc_entry_counts, dtype=np.int64))))
+
+        # CSR postings: one in-place sort of packed (gram, entry) pairs groups
+        # entries by trigram; chunks are copied and released one at a time
+        pairs = np.empty(sum(len(chunk) for chunk in pair_chunks), dtype=np.uint64)
+        position = 0
+        while pair_chunks:
+            chunk = pair_chunks.pop(0)
+            pairs[position:position + len(chunk)] = chunk
+            position += len(chunk)
+        pairs.sort()
+        index._postings = pairs.astype(np.uint32)  # Low 32 bits: entry row
+        pairs >>= np.uint64(32)
+        starts = np.flatnonzero(np.concatenate(([True], pairs[1:] != pairs[:-1])))
+        index._gram_values = pairs[starts]
+        index._posting_offsets = np.append(starts, len(pairs)).astype(np.int64)
+        del pairs
+        return index
+
+    def __len__(self):
+        return self._doc_count
+
+    def memory_bytes(self):
+        """Approximate memory held by the index arrays"""
+        arrays = (
+            self._id_offsets, self._entry_docs, self._entry_arabic, self._key_offsets, self._key_codes,
+            self._name_offsets, self._doc_entry_offsets, self._gram_values, self._posting_offsets, self._postings
+        )
+        return sum(a.nbytes for a in arrays) + len(self._id_blob) + len(self._name_blob)
+
+    def _doc_id(self, doc):
+        """Registry ID of a company"""
+        return self._id_blob[self._id_offsets[doc]:self._id_offsets[doc + 1]].decode('utf-8')
+
+    def _entry_name(self, entry):
+        """Original (display) name of an index entry"""
+        start, end = self._name_offsets[entry], self._name_offsets[entry + 1]
+        return self._name_blob[start:end].decode('utf-8')
+
+    def _doc_names(self, doc):
+        """(arabic, french) display names of a company"""
+        arabic = french = ''
+        for entry in range(self._doc_entry_offsets[doc], self._doc_entry_offsets[doc + 1]):
+            if self._entry_arabic[entry]:
+                arabic = self._entry_name(entry)
+            else:
+                french = self._entry_name(entry)
+        return arabic, french
+
+    def _candidates(self, key, max_candidates, max_postings):
+        """Entries sharing the most trigrams with key, scanning the rarest trigrams first"""
+        values, _ = trigram_values([key])
+        values = np.unique(gram_hashes(values))
+        slots = np.minimum(np.searchsorted(self._gram_values, values), len(self._gram_values) - 1)
+        slots = slots[self._gram_values[slots] == values]
+        if not len(slots):
+            return np.zeros(0, dtype=np.int64)
+
+        starts = self._posting_offsets[slots]
+        ends = self._posting_offsets[slots + 1]
+        selected = []
+        scanned = 0
+        for position in np.argsort(ends - starts):
+            length = ends[position] - starts[position]
+            if selected and scanned + length > max_postings:
+                break
+            selected.append(self._postings[starts[position]:ends[position]])
+            scanned += length
+
+        entries, shared = np.unique(np.concatenate(selected), return_counts=True)
+        if len(entries) > max_candidates:
+            keep = np.argpartition(-shared, max_candidates - 1)[:max_candidates]
+            entries = entries[keep]
+        return entries.astype(np.int64)
+
+    def search(self, name, k=5, max_candidates=256, max_postings=100000):
+        """Top-k registered companies by edit-distance ratio to name.
+
+        Returns match dicts with id, arabic, french, ratio and score, where score
+        is on the same 0-2 distance scale as the vector search.
+        """
+        key = fuzzy_key(name)[:MAX_QUERY_LENGTH]
+        if not key or not self._doc_count:
+            return []
+
+        entries = self._candidates(key, max_candidates, max_postings)
+        if not len(entries):
+            return []
+
+        starts = self._key_offsets[entries]
+        lengths = self._key_offsets[entries + 1] - starts
+        width = int(lengths.max())
+        positions = starts[:, None] + np.arange(width)
+        in_range = np.arange(width) < lengths[:, None]
+        codes = np.where(in_range, self._key_codes[np.minimum(positions, len(self._key_codes) - 1)], 0)
+
+        query_codes = np.frombuffer(key.encode('utf-32-le'), dtype=np.uint32)
+        distances = edit_distances(query_codes, codes, lengths)
+        ratios = 1 - distances / np.maximum(lengths, len(key))
+
+        best = {}
+        for position in np.argsort(-ratios):
+            doc = int(self._entry_docs[entries[position]])
+            if doc not in best:
+                best[doc] = float(ratios[position])
+                if len(best) == k:
+                    break
+
+        matches = []
+        for doc, ratio in best.items():
+            arabic, french = self._doc_names(doc)
+            matches.append({
+                'id': self._doc_id(doc),
+                'arabic': arabic,
+                'french': french,
+                'ratio': ratio,
+                'score': ratio_to_score(ratio)
+            })
+        return matches
+
+class OverlayFuzzyIndex:
+    """A FuzzyNameIndex with later registry changes applied on top of it.
+
+    Searches merge the base index's matches, minus changed or removed
+    companies, with those of a small overlay index over the changed
+    companies' current names.
+    """
+
+    # Extra base matches requested to make up for filtered-out changed companies
+    MAX_EXTRA_MATCHES = 64
+
+    def __init__(self, base, overlay, changed_ids):
+        self.base = base
+        self.overlay = overlay
+        self.changed_ids = changed_ids
+
+    def __len__(self):
+        return len(self.base) + len(self.overlay)
+
+    def memory_bytes(self):
+        """Approximate memory held by the base and overlay indexes"""
+        return self.base.memory_bytes() + self.overlay.memory_bytes()
+
+    def search(self, name, k=5, **kwargs):
+        """Top-k registered companies by edit-distance ratio to name (see FuzzyNameIndex.search)"""
+        extra = min(len(self.changed_ids), self.MAX_EXTRA_MATCHES)
+        matches = [
+            match for match in self.base.search(name, k=k + extra, **kwargs)
+            if match['id'] not in self.changed_ids
+        ]
+        matches.extend(self.overlay.search(name, k=k, **kwargs))
+        return sorted(matches, key=lambda match: match['score'])[:k]
+
+def build_fuzzy_name_index(records):
+    """Build a FuzzyNameIndex from company records with id / nom_ar / nom_fr"""
+    return FuzzyNameIndex.build(records)
@@ -0,0 +1,233 @@
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import deque
+from name_index import ARABIC_DIACRITICS_PATTERN, ARABIC_LETTER_FOLDING
+
+# ============================================================================
+# TERM NORMALIZATION
+# ============================================================================
+
+# Common leetspeak substitutions folded back to letters (only inside words, see fold_leet)
+LEET_TABLE = str.maketrans({
+    '0': 'o',
+    '1': 'i',
+    '3': 'e',
+    '4': 'a',
+    '5': 's',
+    '7': 't',
+    '@': 'a',
+    '$': 's',
+    '!': 'i',
+})
+
+# Ta marbuta folded to ha, on top of the alef / alef maksura folding of name_index
+ARABIC_TERM_FOLDING = {**ARABIC_LETTER_FOLDING, **str.maketrans({'ة': 'ه'})}
+
+# Digits between letters ("b4dword") and leet symbols next to a letter ("@ss");
+# standalone numbers ("1488", "2000") are left as written
+LEET_RUN_PATTERN = re.compile(r'(?<=[^\W\d_])[0-9@$!]+(?=[^\W\d_])|(?<=[^\W\d_])[@$!]+|[@$!]+(?=[^\W\d_])')
+
+# Anything that is not a letter or digit separates words
+WORD_SEPARATOR_PATTERN = re.compile(r'[\W_]+')
+
+# Terms shorter than this only match whole words, so short terms do not fire
+# inside longer, innocent words
+MIN_SUBSTRING_LENGTH = 4
+
+def fold_leet(text):
+    """Fold leetspeak inside words back to letters"""
+    return LEET_RUN_PATTERN.sub(lambda match: match.group().translate(LEET_TABLE), text)
+
+def normalize_term(text, leet=False):
+    """Fold case, Latin diacritics and Arabic spelling variants, and leetspeak if leet"""
+    text = unicodedata.normalize('NFKC', text).casefold()
+    if leet:
+        text = fold_leet(text)
+    text = ''.join(
+        char for char in unicodedata.normalize('NFD', text) if not unicodedata.combining(char)
+    )
+    text = ARABIC_DIACRITICS_PATTERN.sub('', text).translate(ARABIC_TERM_FOLDING)
+    return unicodedata.normalize('NFC', text)
+
+def term_forms(text, leet=False):
+    """(compact, spaced) forms of a text: letters and digits only, and words padded with spaces"""
+    words = WORD_SEPARATOR_PATTERN.split(normalize_term(text, leet))
+    words = [word for word in words if word]
+    return ''.join(words), f" {' '.join(words)} "
+
+def term_variants(text):
+    """Distinct (compact, spaced) forms of a text as written and with leetspeak folded"""
+    return list(dict.fromkeys((term_forms(text), term_forms(text, leet=True))))
+
+# ============================================================================
+# AHO-CORASICK AUTOMATON
+# ============================================================================
+
+class AhoCorasick:
+    """Multi-pattern substring matcher; one pass over the text finds every pattern"""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for pattern_id, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(pattern_id)
+
+        # Breadth-first failure links; outputs are merged along them
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find(self, text):
+        """IDs of the patterns occurring in text, each reported once"""
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+    def __len__(self):
+        return len(self._goto)
+
+# ============================================================================
+# HATE TERM MATCHER
+# ============================================================================
+
+class HateTermMatcher:
+    """Compiled prohibited-term matcher over the hate words collection.
+
+    Terms are normalized once, as written and with leetspeak folded, and
+    compiled into one Aho-Corasick automaton; a name is normalized both ways
+    and each form scanned in a single pass. Long terms
+    match anywhere in the name with spaces and punctuation removed, short terms
+    only as whole words. The term list is re-read from the collection at most
+    every refresh_interval seconds, on a background thread while matches keep
+    using the last compiled list, and the automaton is rebuilt only when it
+    changed, so edits to the collection apply without restarting the app.
+    """
+
+    def __init__(self, hate_store=None, terms=None, refresh_interval=60.0):
+        self.hate_store = hate_store
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._fingerprint = None
+        self._checked_at = 0.0
+        self._refreshing = False
+        self._compiled = (None, [], [])
+
+        if terms is not None:
+            self.load_terms(terms)
+        elif hate_store is not None:
+            self.refresh(force=True)
+
+    def load_terms(self, terms):
+        """Compile (word, type) pairs into a new automaton and swap it in"""
+        patterns = []
+        pattern_terms = []
+        entries = []
+        for word, term_type in terms:
+            variants = [forms for forms in term_variants(word) if forms[0]]
+            if not variants:
+                continue
+            for compact, spaced in variants:
+                patterns.append(compact if len(compact) >= MIN_SUBSTRING_LENGTH else spaced)
+                pattern_terms.append(len(entries))
+            entries.append((word.strip(), term_type or 'unknown'))
+
+        # One assignment, so a concurrent match never pairs an automaton with another term list
+        self._compiled = (AhoCorasick(patterns), pattern_terms, entries)
+
+    def refresh(self, force=False):
+        """Reload terms from the hate collection if it changed; True if the automaton was rebuilt"""
+        if self.hate_store is None:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._checked_at < self.refresh_interval:
+                return False
+            self._checked_at = now
+
+            data = self.hate_store._collection.get(include=["documents", "metadatas"])
+            terms = sorted(
+                (doc, (metadata or {}).get('type', 'unknown'))
+                for doc, metadata in zip(data["documents"], data["metadatas"])
+                if doc
+            )
+            fingerprint = hashlib.sha256(repr(terms).encode('utf-8')).hexdigest()
+            if fingerprint == self._fingerprint:
+                return False
+
+            self.load_terms(terms)
+            self._fingerprint = fingerprint
+            return True
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            # Keep serving the last compiled term list
+            print(f"Error reloading hate terms: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _start_refresh_if_due(self):
+        """Start a background reload if one is due and none is running"""
+        if self.hate_store is None or time.monotonic() - self._checked_at < self.refresh_interval:
+            return
+        # Non-blocking: a reload in progress holds the lock, and matches never wait on it
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        finally:
+            self._lock.release()
+        threading.Thread(target=self._background_refresh, name="hate-terms-refresh", daemon=True).start()
+
+    def match(self, text):
+        """Hate match dicts for every prohibited term found in text"""
+        # A due reload runs off the request path
+        self._start_refresh_if_due()
+
+        automaton, pattern_terms, terms = self._compiled
+        if automaton is None or not text:
+            return []
+
+        found = set()
+        for compact, spaced in term_variants(text):
+            found |= automaton.find(compact) | automaton.find(spaced)
+        return [
+            {'word': terms[term_id][0], 'similarity': 1.0, 'type': terms[term_id][1]}
+            for term_id in sorted({pattern_terms[pattern_id] for pattern_id in found})
+        ]
+
+    def __len__(self):
+        return len(self._compiled[2])
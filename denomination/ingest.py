@@ -0,0 +1,246 @@
+"""Stream a full RNE registry export into the tunisia_companies collection.
+
+Reads a CSV or Parquet export in chunks, skips registry IDs already stored,
+embeds the remaining rows with bounded concurrency and upserts them with
+structured metadata. A checkpoint is written after every chunk, so a crashed
+run resumes where it stopped instead of starting over.
+
+Usage (from the denomination/ directory):
+    python ingest.py registry.csv --chunk-size 5000 --concurrency 4
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from embedding_providers import EMBEDDING_BACKENDS, get_embedding_backend
+from metrics import RETRIES
+from result_cache import bump_registry_version
+from utils import company_metadata, format_company_document, initialize_vector_stores, setup_chroma_directories
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# ============================================================================
+# REGISTRY READERS
+# ============================================================================
+
+# Registry export headers mapped to company record fields
+COLUMN_ALIASES = {
+    "id": "id",
+    "identifiant": "id",
+    "nom_ar": "nom_ar",
+    "nom_fr": "nom_fr",
+    "forme_juridique": "forme_juridique",
+    "statut": "statut",
+}
+
+def _record_from_row(row):
+    """Map a raw registry row to a company record, or None if it has no ID or name"""
+    record = {}
+    for column, value in row.items():
+        field = COLUMN_ALIASES.get(str(column).strip().lower())
+        if field and value is not None:
+            record[field] = str(value).strip()
+    if not record.get("id") or not (record.get("nom_ar") or record.get("nom_fr")):
+        return None
+    return record
+
+def iter_registry_rows(path):
+    """Stream raw rows from a CSV or Parquet registry export"""
+    if path.lower().endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Reading Parquet exports requires pyarrow (pip install pyarrow)")
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=10000):
+            yield from batch.to_pylist()
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from csv.DictReader(f)
+
+def iter_registry_chunks(path, chunk_size, skip_rows=0):
+    """Yield (rows_read, records) chunks from a registry export, skipping the first skip_rows rows"""
+    chunk = []
+    rows_read = 0
+    for row in iter_registry_rows(path):
+        rows_read += 1
+        if rows_read <= skip_rows:
+            continue
+        record = _record_from_row(row)
+        if record:
+            chunk.append(record)
+        if rows_read % chunk_size == 0:
+            yield rows_read, chunk
+            chunk = []
+    if rows_read > skip_rows:
+        yield rows_read, chunk
+
+# ============================================================================
+# CHECKPOINTS
+# ============================================================================
+
+def _source_fingerprint(path):
+    """Identify a registry export so a checkpoint is never applied to a different file"""
+    stat = os.stat(path)
+    return {"source": os.path.abspath(path), "size": stat.st_size, "mtime": int(stat.st_mtime)}
+
+def load_checkpoint(checkpoint_path, source_path):
+    """Load a checkpoint for this export, or a fresh one"""
+    fingerprint = _source_fingerprint(source_path)
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if {key: checkpoint.get(key) for key in fingerprint} != fingerprint:
+            raise RuntimeError(
+                f"Checkpoint {checkpoint_path} belongs to a different export; use --restart to ignore it"
+            )
+        return checkpoint
+    return {**fingerprint, "rows_done": 0, "written": 0, "skipped": 0}
+
+def save_checkpoint(checkpoint_path, checkpoint):
+    """Atomically write the checkpoint"""
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, checkpoint_path)
+
+# ============================================================================
+# INGESTION
+# ============================================================================
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, if the platform reports it"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _embed_with_retry(embeddings, texts, retries=3):
+    """Embed a batch of documents, retrying transient API failures with backoff"""
+    for attempt in range(retries):
+        try:
+            return embeddings.embed_documents(texts)
+        except Exception:
+            if attempt == retries - 1:
+                raise
+            RETRIES.inc(operation="ingest_embedding")
+            time.sleep(2 ** attempt)
+
+def _dedupe_chunk(companies_store, records):
+    """Drop records whose registry ID repeats within the chunk or is already stored"""
+    unique = {}
+    for record in records:
+        unique.setdefault(record["id"], record)
+    if not unique:
+        return []
+
+    existing = set(companies_store._collection.get(ids=list(unique), include=[])["ids"])
+    return [record for doc_id, record in unique.items() if doc_id not in existing]
+
+def write_company_records(companies_store, records, executor, embed_batch_size=256, bump_version=True):
+    """Embed records in concurrent batches and upsert them with their embeddings.
+
+    Callers that bump the registry version themselves (registry_sync.py)
+    pass bump_version=False.
+    """
+    if not records:
+        return 0
+
+    documents = [format_company_document(record) for record in records]
+    batches = [documents[i:i + embed_batch_size] for i in range(0, len(documents), embed_batch_size)]
+    embeddings = companies_store.embeddings
+
+    vectors = []
+    for batch_vectors in executor.map(lambda texts: _embed_with_retry(embeddings, texts), batches):
+        vectors.extend(batch_vectors)
+
+    companies_store._collection.upsert(
+        ids=[record["id"] for record in records],
+        embeddings=vectors,
+        documents=documents,
+        metadatas=[company_metadata(record) for record in records]
+    )
+    if bump_version:
+        bump_registry_version(companies_store)
+    return len(records)
+
+def ingest_registry(path, companies_store, checkpoint_path=None, chunk_size=5000,
+                    concurrency=4, embed_batch_size=256, restart=False):
+    """Stream a registry export into the companies store, resuming from a checkpoint"""
+    checkpoint_path = checkpoint_path or f"{path}.checkpoint.json"
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    checkpoint = load_checkpoint(checkpoint_path, path)
+
+    if checkpoint["rows_done"]:
+        print(f"Resuming after row {checkpoint['rows_done']:,}")
+
+    start = time.perf_counter()
+    rows_this_run = 0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for rows_read, records in iter_registry_chunks(path, chunk_size, skip_rows=checkpoint["rows_done"]):
+            new_records = _dedupe_chunk(companies_store, records)
+            written = write_company_records(companies_store, new_records, executor, embed_batch_size)
+
+            rows_this_run += rows_read - checkpoint["rows_done"]
+            checkpoint["rows_done"] = rows_read
+            checkpoint["written"] += written
+            checkpoint["skipped"] += len(records) - written
+            save_checkpoint(checkpoint_path, checkpoint)
+
+            elapsed = time.perf_counter() - start
+            peak = peak_rss_mb()
+            print(
+                f"rows {rows_read:,} | written {checkpoint['written']:,} | skipped {checkpoint['skipped']:,} | "
+                f"{rows_this_run / elapsed if elapsed else 0:,.0f} rows/s"
+                + (f" | peak RSS {peak:,.0f} MB" if peak is not None else "")
+            )
+
+    elapsed = time.perf_counter() - start
+    checkpoint["rows_per_second"] = rows_this_run / elapsed if elapsed else 0
+    checkpoint["peak_rss_mb"] = peak_rss_mb()
+    return checkpoint
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="Registry export (.csv or .parquet)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Rows read and checkpointed per chunk")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent embedding requests")
+    parser.add_argument("--embed-batch-size", type=int, default=256, help="Documents per embedding request")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <path>.checkpoint.json)")
+    parser.add_argument("--restart", action="store_true", help="Ignore any existing checkpoint")
+    parser.add_argument(
+        "--embedding-backend", choices=list(EMBEDDING_BACKENDS),
+        help="Embedding backend (default: EMBEDDING_BACKEND env var, else openai)"
+    )
+    args = parser.parse_args()
+
+    setup_chroma_directories()
+    backend = args.embedding_backend or get_embedding_backend()
+    companies_store, _ = initialize_vector_stores(os.getenv("OPENAI_API_KEY"), backend)
+    if not companies_store:
+        sys.exit("Could not open the companies vector store")
+
+    summary = ingest_registry(
+        args.path,
+        companies_store,
+        checkpoint_path=args.checkpoint,
+        chunk_size=args.chunk_size,
+        concurrency=args.concurrency,
+        embed_batch_size=args.embed_batch_size,
+        restart=args.restart
+    )
+    peak = summary["peak_rss_mb"]
+    print(
+        f"Done: {summary['written']:,} written, {summary['skipped']:,} skipped, "
+        f"{summary['rows_per_second']:,.0f} rows/s"
+        + (f", peak RSS {peak:,.0f} MB" if peak is not None else "")
+    )
@@ -0,0 +1,183 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, Generation
+
+# ============================================================================
+# LLM RESPONSE CACHE
+# ============================================================================
+
+DEFAULT_LLM_CACHE_PATH = "./chroma_db/llm_cache.sqlite3"
+
+# The only classes a cached response may deserialize to
+CACHED_RESPONSE_CLASSES = [ChatGeneration, Generation, AIMessage]
+
+def normalize_prompt(prompt):
+    """Normalize a serialized prompt so whitespace variants of a query share one entry"""
+    return ' '.join(unicodedata.normalize('NFKC', prompt).split())
+
+class SQLiteLLMCache(BaseCache):
+    """LangChain response cache in SQLite with a TTL and size-bounded LRU eviction.
+
+    Entries are keyed on the prompt template version, the model string (model
+    name, temperature and other call parameters, as LangChain serializes them)
+    and the normalized prompt. Cached responses carry response_metadata
+    {"cached": True}, so they can be told apart in LangSmith traces.
+    """
+
+    def __init__(self, path=DEFAULT_LLM_CACHE_PATH, ttl_seconds=7 * 24 * 3600, max_entries=10000,
+                 version="", _shared=None):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.version = version
+
+        if _shared is not None:
+            self._conn, self._lock, self._counters = _shared
+            return
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, version TEXT, llm_string TEXT, response TEXT, "
+            "created_at REAL, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0}
+
+    def versioned(self, version):
+        """View of this cache for one prompt template version, sharing the same store"""
+        return SQLiteLLMCache(
+            self.path, self.ttl_seconds, self.max_entries, version=str(version),
+            _shared=(self._conn, self._lock, self._counters)
+        )
+
+    def _key(self, prompt, llm_string):
+        """Cache key for a prompt under this version and model string"""
+        return hashlib.sha256(
+            f"{self.version}\x00{llm_string}\x00{normalize_prompt(prompt)}".encode("utf-8")
+        ).hexdigest()
+
+    def contains(self, prompt, llm_string, count_miss=False):
+        """True if a live entry exists for the prompt; hits are left for lookup() to count"""
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute("SELECT created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            found = row is not None and not (self.ttl_seconds and time.time() - row[0] > self.ttl_seconds)
+            if count_miss and not found:
+                self._counters["misses"] += 1
+        return found
+
+    def lookup(self, prompt, llm_string):
+        """Cached generations for the prompt, or None on a miss or expired entry"""
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self._counters["hits"] += 1
+
+        generations = loads(row[0], allowed_objects=CACHED_RESPONSE_CLASSES)
+        for generation in generations:
+            generation.generation_info = {**(generation.generation_info or {}), "cached": True}
+            message = getattr(generation, "message", None)
+            if message is not None:
+                message.response_metadata = {
+                    **message.response_metadata,
+                    "cached": True,
+                    "cache_age_seconds": round(now - row[1], 1)
+                }
+        return generations
+
+    def update(self, prompt, llm_string, return_val):
+        """Store generations and evict the least recently used entries beyond max_entries"""
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, version, llm_string, response, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, self.version, llm_string, dumps(return_val), now, now)
+            )
+            if self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+            self._conn.commit()
+
+    def clear(self, **kwargs):
+        """Drop every cached response"""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self):
+        """Hit/miss counters and entry count for the cache"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            total = self._counters["hits"] + self._counters["misses"]
+            return {
+                "hits": self._counters["hits"],
+                "misses": self._counters["misses"],
+                "hit_rate": self._counters["hits"] / total if total else 0.0,
+                "entries": entries
+            }
+
+def stream_cached_chain(chain, inputs, config=None):
+    """Stream the answer text of a prompt | llm chain, going through the LLM cache.
+
+    LangChain's chat model stream() bypasses the cache, so a cached answer is
+    replayed through invoke() (and traced as a cache hit), and a streamed answer
+    is written back to the cache once it is complete.
+    """
+    prompt_template, llm = chain.first, chain.last
+    cache = getattr(llm, "cache", None)
+    if not isinstance(cache, SQLiteLLMCache):
+        for chunk in chain.stream(inputs, config=config):
+            yield chunk.content
+        return
+
+    prompt = dumps(prompt_template.invoke(inputs).to_messages())
+    llm_string = llm._get_llm_string()
+    if cache.contains(prompt, llm_string, count_miss=True):
+        yield chain.invoke(inputs, config=config).content
+        return
+
+    message = None
+    for chunk in chain.stream(inputs, config=config):
+        message = chunk if message is None else message + chunk
+        yield chunk.content
+    if message is not None:
+        cache.update(prompt, llm_string, [ChatGeneration(
+            message=AIMessage(content=message.content, response_metadata=message.response_metadata)
+        )])
+
+def with_llm_cache(llm, llm_cache, prompt_version):
+    """Copy of llm that reads and writes llm_cache under a prompt template version"""
+    if llm is None or llm_cache is None:
+        return llm
+    return llm.model_copy(update={"cache": llm_cache.versioned(prompt_version)})
@@ -0,0 +1,280 @@
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ============================================================================
+# METRIC TYPES
+# ============================================================================
+
+# Latency buckets in seconds, from local lookups to slow API calls
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(labels):
+    """Prometheus label set, e.g. {stage="hate_query"}"""
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+class Counter:
+    """Monotonic counter with optional labels"""
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple((name, labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        """(sample name, labels, value) tuples"""
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple((name, labels[name]) for name in self.labelnames)
+        with self._lock:
+            state = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        """(sample name, labels, value) tuples: _bucket per le, _sum and _count"""
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    samples.append((f"{self.name}_bucket", key + (("le", repr(bound)),), bucket_count))
+                samples.append((f"{self.name}_bucket", key + (("le", "+Inf"),), count))
+                samples.append((f"{self.name}_sum", key, total))
+                samples.append((f"{self.name}_count", key, count))
+        return samples
+
+# ============================================================================
+# REGISTRY
+# ============================================================================
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text exposition format.
+
+    Besides counters and histograms, collectors can be registered: callables
+    run at scrape time that return (name, kind, documentation, samples), used
+    to export counters kept elsewhere (cache hit/miss stats, batch counters).
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, key, collector):
+        """Register (or replace) a scrape-time collector under key"""
+        with self._lock:
+            self._collectors[key] = collector
+
+    def render(self):
+        """All metrics in the Prometheus text format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors.values())
+
+        families = {}
+        for metric in metrics:
+            families[metric.name] = [metric.kind, metric.documentation, metric.samples()]
+        for collector in collectors:
+            try:
+                for name, kind, documentation, samples in collector():
+                    families.setdefault(name, [kind, documentation, []])[2].extend(samples)
+            except Exception as e:
+                print(f"Error collecting metrics: {str(e)}")
+
+        lines = []
+        for name, (kind, documentation, samples) in families.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "denomination_stage_duration_seconds", "Duration of validation pipeline stages", ["stage"]
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "denomination_stage_errors_total", "Validation stages that failed or timed out", ["stage", "kind"]
+)
+RETRIES = REGISTRY.counter(
+    "denomination_retries_total", "Retried calls to external services", ["operation"]
+)
+
+def register_cache(name, cache):
+    """Export a cache's stats() hits and misses as counters labelled cache=name"""
+    def collect():
+        stats = cache.stats()
+        labels = (("cache", name),)
+        return [
+            ("denomination_cache_hits_total", "counter", "Cache hits",
+             [("denomination_cache_hits_total", labels, stats["hits"])]),
+            ("denomination_cache_misses_total", "counter", "Cache misses",
+             [("denomination_cache_misses_total", labels, stats["misses"])]),
+        ]
+    REGISTRY.register_collector(f"cache:{name}", collect)
+
+def register_counts(name, documentation, label, counts):
+    """Export a counts() -> {value: count} dict as a counter with one label"""
+    def collect():
+        return [(name, "counter", documentation, [
+            (name, ((label, key),), value) for key, value in sorted(counts().items())
+        ])]
+    REGISTRY.register_collector(name, collect)
+
+# SDK loggers that announce their automatic retries, and the operation they are counted under
+SDK_RETRY_LOGGERS = {"openai._base_client": "openai", "groq._base_client": "groq"}
+
+class _RetryLogHandler(logging.Handler):
+    """Counts "Retrying request ..." log records of an API client"""
+
+    def __init__(self, operation):
+        super().__init__(logging.INFO)
+        self.operation = operation
+
+    def emit(self, record):
+        if record.getMessage().startswith("Retrying request"):
+            RETRIES.inc(operation=self.operation)
+
+def count_sdk_retries():
+    """Count the OpenAI and Groq clients' built-in retries, which are otherwise only logged"""
+    for name, operation in SDK_RETRY_LOGGERS.items():
+        logger = logging.getLogger(name)
+        if any(isinstance(handler, _RetryLogHandler) for handler in logger.handlers):
+            continue
+        logger.addHandler(_RetryLogHandler(operation))
+        if logger.getEffectiveLevel() > logging.INFO:
+            logger.setLevel(logging.INFO)
+
+def render_metrics():
+    """Current metrics in the Prometheus text format"""
+    return REGISTRY.render()
+
+# ============================================================================
+# SPANS
+# ============================================================================
+
+_current_spans = contextvars.ContextVar("denomination_spans", default=None)
+
+@contextmanager
+def collect_spans():
+    """Collect the spans recorded in this context (and stage threads started from it) into a list"""
+    spans = []
+    token = _current_spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _current_spans.reset(token)
+
+@contextmanager
+def span(stage):
+    """Time a stage into the stage histogram and the current span collection, counting errors"""
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = e
+        STAGE_ERRORS.inc(stage=stage, kind="timeout" if isinstance(e, TimeoutError) else "exception")
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_SECONDS.observe(duration, stage=stage)
+        spans = _current_spans.get()
+        if spans is not None:
+            record = {"stage": stage, "ms": round(duration * 1000, 2)}
+            if error is not None:
+                record["error"] = type(error).__name__
+            spans.append(record)
+
+def record_stage_error(stage, error):
+    """Count a stage failure caught outside a span (e.g. a timed-out future)"""
+    STAGE_ERRORS.inc(stage=stage, kind="timeout" if isinstance(error, TimeoutError) else "exception")
+    spans = _current_spans.get()
+    if spans is not None:
+        spans.append({"stage": stage, "error": type(error).__name__})
+
+def span_summary(spans):
+    """Total milliseconds per stage, for run metadata"""
+    totals = {}
+    for record in spans:
+        if "ms" in record:
+            totals[record["stage"]] = round(totals.get(record["stage"], 0.0) + record["ms"], 2)
+    return totals
+
+# ============================================================================
+# METRICS ENDPOINT
+# ============================================================================
+
+class MetricsServer(ThreadingHTTPServer):
+    """Threaded HTTP server for scrapes"""
+    daemon_threads = True
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves GET /metrics"""
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_metrics_server(port, host="127.0.0.1"):
+    """Serve /metrics on a daemon thread; returns the server"""
+    server = MetricsServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
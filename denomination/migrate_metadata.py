@@ -0,0 +1,27 @@
+"""Migrate an existing companies collection to structured company metadata.
+
+Legacy documents only carry {"type": "company", "id": <position>} and keep the
+registry ID and names inside page_content. This rewrites their metadata with the
+id / nom_ar / nom_fr fields parsed once from page_content. Embeddings are left
+untouched, so no embedding calls are made.
+
+Usage (from the denomination/ directory):
+    python migrate_metadata.py --persist-directory ./chroma_db/companies
+"""
+import argparse
+from langchain_chroma import Chroma
+from utils import migrate_company_metadata
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--persist-directory", default="./chroma_db/companies", help="Chroma persist directory")
+    parser.add_argument("--collection", default="tunisia_companies", help="Companies collection name")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents updated per batch")
+    args = parser.parse_args()
+
+    companies_store = Chroma(
+        collection_name=args.collection,
+        persist_directory=args.persist_directory
+    )
+    migrated = migrate_company_metadata(companies_store, batch_size=args.batch_size)
+    print(f"Migrated {migrated:,} of {companies_store._collection.count():,} company documents")
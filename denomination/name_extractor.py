@@ -0,0 +1,212 @@
+import re
+import threading
+from collections import Counter
+
+# ============================================================================
+# EXTRACTION RULES
+# ============================================================================
+
+# Minimum confidence for a rule-based extraction to skip the LLM
+DEFAULT_MIN_CONFIDENCE = 0.8
+
+# Bare inputs ("Atlas Negoce") may still be free text; they are analyzed
+# speculatively while the LLM confirms
+BARE_CONFIDENCE = 0.7
+
+# Longest name (in words) a rule may return; longer captures are probably sentences
+MAX_NAME_WORDS = 8
+
+# Optional "the name" / "le nom" / "اسم" lead-in before the captured name
+_NAME_PREFIX = r"(?:(?:the\s+)?(?:business\s+|company\s+)?name\s+|(?:le\s+)?nom\s+(?:de\s+société\s+)?|(?:ال)?اسم\s+)?"
+
+# Capture group for a quoted name
+QUOTED_NAME_PATTERN = re.compile(r"""(?:^|\s)["«“‘']\s*([^"«»“”‘’']{1,80}?)\s*["»”’'](?=[\s?.!,؟]|$)""")
+
+# (rule, compiled pattern, confidence); the name is the "name" group
+EXTRACTION_RULES = [
+    # English
+    ("en_is_available", re.compile(
+        r"^(?:is|are)\s+" + _NAME_PREFIX
+        + r"(?P<name>.+?)\s+(?:still\s+)?(?:available|free|taken|registered|used)\s*\??$", re.I), 0.9),
+    ("en_check", re.compile(
+        r"^(?:please\s+)?(?:can\s+you\s+)?(?:check|verify|validate|test|search)\s+(?:for\s+)?(?:if\s+|whether\s+)?"
+        + _NAME_PREFIX + r"(?P<name>.+?)(?:\s+is\s+(?:still\s+)?(?:available|free|taken))?\s*[?.!]?$", re.I), 0.85),
+    ("en_name_my_company", re.compile(
+        r"^(?:i\s+(?:want|would\s+like|plan)\s+to|i'd\s+like\s+to|can\s+i)\s+(?:name|call)\s+my\s+"
+        r"(?:company|business|firm|startup|shop)\s+(?P<name>.+?)\s*[?.!]?$", re.I), 0.85),
+    ("en_can_i_use", re.compile(
+        r"^can\s+i\s+(?:use|register)\s+" + _NAME_PREFIX + r"(?P<name>.+?)\s*\??$", re.I), 0.85),
+    ("en_available", re.compile(
+        r"^(?P<name>.+?)\s+(?:is\s+)?(?:still\s+)?available\s*\??$", re.I), 0.85),
+    # French
+    ("fr_est_disponible", re.compile(
+        r"^(?:est[- ]ce\s+que\s+)?" + _NAME_PREFIX
+        + r"(?P<name>.+?)\s+est(?:-il|-elle)?\s+(?:encore\s+|toujours\s+)?(?:disponible|libre|pris|enregistré)\s*\??$", re.I), 0.9),
+    ("fr_verifier", re.compile(
+        r"^(?:pouvez-vous\s+|peux-tu\s+)?(?:v[ée]rifi(?:er|e|ez)|tester|cherche[rz]?)\s+(?:si\s+)?"
+        + _NAME_PREFIX + r"(?P<name>.+?)(?:\s+est\s+(?:encore\s+)?disponible)?\s*[?.!]?$", re.I), 0.85),
+    ("fr_appeler_ma_societe", re.compile(
+        r"^(?:je\s+(?:veux|voudrais|souhaite)\s+)(?:appeler|nommer)\s+(?:ma|mon)\s+"
+        r"(?:société|societe|entreprise|boîte|boite|commerce)\s+(?P<name>.+?)\s*[?.!]?$", re.I), 0.85),
+    ("fr_disponible", re.compile(
+        r"^(?P<name>.+?)\s+(?:est\s+)?(?:encore\s+)?disponible\s*\??$", re.I), 0.85),
+    # Arabic
+    ("ar_hal_mutah", re.compile(
+        r"^هل\s+" + _NAME_PREFIX
+        + r"(?P<name>.+?)\s+(?:لا\s+يزال\s+|ما\s+زال\s+)?(?:متاح|متوفر|مسجل|موجود|مستعمل)(?:ة)?\s*[؟?]?$"), 0.9),
+    ("ar_tahaqqaq", re.compile(
+        r"^(?:تحقق|تأكد|ابحث|افحص)\s+(?:من|عن)\s+" + _NAME_PREFIX + r"(?P<name>.+?)\s*[؟?.]?$"), 0.85),
+    ("ar_urid_tasmiya", re.compile(
+        r"^(?:أريد|اريد|نريد)\s+(?:أن\s+|ان\s+)?(?:أسمي|اسمي|تسمية)\s+(?:شركتي|شركتنا|مشروعي)\s+(?P<name>.+?)\s*[؟?.]?$"), 0.85),
+]
+
+# Leading words that make a short input a question or a request, not a name
+NON_NAME_STARTERS = frozenset({
+    "what", "how", "why", "when", "where", "which", "who", "can", "could", "should", "do", "does",
+    "help", "hello", "hi", "hey", "thanks", "thank",
+    "que", "quoi", "comment", "pourquoi", "quand", "quel", "quelle", "quels", "quelles", "bonjour",
+    "salut", "merci", "aide",
+    "ما", "ماذا", "كيف", "لماذا", "متى", "أين", "اين", "من", "مرحبا", "شكرا", "السلام",
+})
+
+# Whole inputs that confidently contain no business name
+NO_NAME_INPUTS = frozenset({
+    "hello", "hi", "hey", "thanks", "thank you", "help", "ok", "okay", "yes", "no", "tell me more",
+    "bonjour", "salut", "merci", "aide", "oui", "non", "d'accord",
+    "مرحبا", "شكرا", "السلام عليكم", "نعم", "لا",
+})
+
+# Pronouns and placeholders a rule may capture instead of a name ("is it available?")
+NAME_STOPWORDS = frozenset({
+    "it", "this", "that", "this one", "that one", "they", "them", "mine", "the name", "my name", "this name",
+    "that name", "my company", "my business",
+    "il", "elle", "ça", "ca", "cela", "celui-ci", "ce nom", "le nom", "mon nom", "ma société", "mon entreprise",
+    "هذا", "هذه", "ذلك", "هو", "هي", "الاسم", "هذا الاسم", "اسمي", "شركتي",
+})
+
+# Common nouns and function words of consultation questions ("Is registration free?",
+# "L'inscription est-elle disponible ?"); a rule capture made only of these names nothing
+COMMON_WORDS = frozenset({
+    "the", "a", "an", "my", "your", "our", "this", "that", "online", "new",
+    "registration", "register", "registry", "application", "fee", "fees", "cost", "price", "process",
+    "procedure", "service", "services", "website", "site", "portal", "office", "form", "forms",
+    "document", "documents", "appointment", "capital", "trademark", "domain", "name", "names",
+    "company", "business", "companies", "support", "help", "creation", "account", "certificate",
+    "le", "la", "les", "un", "une", "des", "du", "de", "mon", "ma", "mes", "votre", "notre", "ce", "cette",
+    "en", "ligne", "inscription", "enregistrement", "immatriculation", "frais", "tarif", "prix",
+    "procédure", "procedure", "formulaire", "dossier", "rendez-vous", "bureau", "guichet", "capital",
+    "marque", "domaine", "nom", "noms", "société", "societe", "entreprise", "compte", "certificat",
+    "التسجيل", "تسجيل", "الرسوم", "رسوم", "الخدمة", "خدمة", "الموقع", "موقع", "المكتب", "مكتب",
+    "الاستمارة", "استمارة", "الملف", "ملف", "الموعد", "موعد", "رأس", "المال", "العلامة", "التجارية",
+    "النطاق", "الاسم", "اسم", "الشركة", "شركة", "الحساب", "حساب", "الشهادة", "شهادة", "الإلكتروني",
+})
+
+# Words of requests and replies ("give me some ideas", "I need advice"); a bare input
+# containing one is a sentence, not a name, and is left to the LLM
+CONVERSATIONAL_WORDS = frozenset({
+    "i", "i'm", "me", "my", "you", "your", "we", "our", "it", "some", "any", "about", "more", "please",
+    "give", "tell", "need", "want", "show", "explain", "suggest", "ideas", "idea", "advice", "rules",
+    "je", "j'ai", "moi", "mon", "ma", "mes", "tu", "vous", "donne", "donnez", "dis", "dites", "besoin",
+    "veux", "voudrais", "conseil", "conseils", "idées", "règles", "plus",
+    "أنا", "انا", "أريد", "اريد", "أعطني", "اعطني", "أحتاج", "احتاج", "نصيحة", "أفكار", "افكار", "قواعد",
+})
+
+# Bare inputs up to this many words are taken as the name itself
+MAX_BARE_WORDS = 5
+
+def _clean_name(name):
+    """Strip surrounding quotes, punctuation and whitespace from a captured name"""
+    name = ' '.join(name.split())
+    return name.strip(" \"'«»“”‘’?؟!.,:;")
+
+def _extraction(name, confidence, rule):
+    """Extraction result dict"""
+    return {'name': name, 'confidence': confidence, 'rule': rule}
+
+def _plausible(name):
+    """A captured name short enough to be a name rather than a sentence"""
+    return bool(name) and len(name) <= 80 and len(name.split()) <= MAX_NAME_WORDS
+
+def _name_words(name):
+    """Words of a capture outside COMMON_WORDS, with French elisions (l', d') dropped"""
+    words = (re.sub(r"^[ldj][’']", "", word.casefold().strip(",:;.!")) for word in name.split())
+    return [word for word in words if word and word not in COMMON_WORDS]
+
+def _looks_like_name(name):
+    """A rule capture carrying a name token: not only common words, and for Latin
+    script at least one such word capitalised or containing a digit"""
+    if not _name_words(name):
+        return False
+    if not re.search(r"[A-Za-zÀ-ÿ]", name):
+        return True
+    return any(
+        (word[:1].isupper() or any(c.isdigit() for c in word)) and _name_words(word)
+        for word in name.split()
+    )
+
+def extract_business_name_rules(query):
+    """Rule-based name extraction.
+
+    Returns {'name', 'confidence', 'rule'}; name is None when no business name
+    was found. A low confidence means the caller should ask the LLM instead.
+    """
+    text = ' '.join((query or '').split())
+    if not text:
+        return _extraction(None, 1.0, 'empty')
+
+    lowered = text.casefold().strip(" ?!.؟")
+    if lowered in NO_NAME_INPUTS:
+        return _extraction(None, 0.9, 'greeting')
+
+    # An explicitly quoted name wins over everything else
+    quoted = QUOTED_NAME_PATTERN.findall(text)
+    if len(quoted) == 1 and _plausible(_clean_name(quoted[0])):
+        return _extraction(_clean_name(quoted[0]), 0.95, 'quoted')
+
+    for rule, pattern, confidence in EXTRACTION_RULES:
+        match = pattern.match(text)
+        if match:
+            name = _clean_name(match.group('name'))
+            if name.casefold() in NAME_STOPWORDS or (name and not _name_words(name)):
+                # "Is it available?" / "Is registration free?" name nothing by themselves; the LLM decides
+                return _extraction(None, 0.4, rule)
+            if _plausible(name) and _looks_like_name(name):
+                return _extraction(name, confidence, rule)
+            if _plausible(name):
+                # Lowercase free text ("is company creation free?") may still be a name
+                return _extraction(name, 0.5, rule)
+            return _extraction(name or None, 0.4, rule)
+
+    # Short input without a question mark, question word or sentence word is the name itself
+    words = text.split()
+    first_word = words[0].casefold().strip(",:;")
+    if (len(words) <= MAX_BARE_WORDS and not re.search(r"[?؟]", text)
+            and first_word not in NON_NAME_STARTERS):
+        if any(word.casefold().strip(",:;.!") in CONVERSATIONAL_WORDS for word in words):
+            return _extraction(None, 0.3, 'bare_sentence')
+        return _extraction(_clean_name(text), BARE_CONFIDENCE, 'bare')
+
+    return _extraction(None, 0.0, 'unmatched')
+
+# ============================================================================
+# PATH COUNTERS
+# ============================================================================
+
+_path_counts = Counter()
+_path_lock = threading.Lock()
+
+def record_extraction_path(path):
+    """Count one extraction answered by path ('rules', 'llm' or 'llm_error')"""
+    with _path_lock:
+        _path_counts[path] += 1
+
+def extraction_path_stats():
+    """Extraction counts per path plus the share answered without the LLM"""
+    with _path_lock:
+        counts = dict(_path_counts)
+    total = sum(counts.values())
+    return {
+        'counts': counts,
+        'total': total,
+        'rules_rate': counts.get('rules', 0) / total if total else 0.0
+    }
@@ -0,0 +1,218 @@
+import hashlib
+import re
+import sys
+import unicodedata
+from array import array
+
+# ============================================================================
+# NAME NORMALIZATION
+# ============================================================================
+
+# Arabic tashkeel (harakat, tanween, shadda, sukun), superscript alef and tatweel
+ARABIC_DIACRITICS_PATTERN = re.compile('[\u064B-\u065F\u0670\u0640]')
+
+# Alef variants and alef maksura folded to their base letters
+ARABIC_LETTER_FOLDING = str.maketrans({
+    'أ': 'ا',
+    'إ': 'ا',
+    'آ': 'ا',
+    'ٱ': 'ا',
+    'ى': 'ي',
+})
+
+def normalize_name(name):
+    """Normalize a business name for exact-duplicate comparison"""
+    text = unicodedata.normalize('NFKC', name).casefold()
+    text = ARABIC_DIACRITICS_PATTERN.sub('', text).translate(ARABIC_LETTER_FOLDING)
+    return ' '.join(text.split())
+
+def name_hash(normalized):
+    """Non-zero signed 64-bit hash of a normalized name"""
+    value = int.from_bytes(
+        hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest(), 'little', signed=True
+    )
+    return value or 1
+
+# ============================================================================
+# EXACT NAME INDEX
+# ============================================================================
+
+# Joins a company's nom_ar and nom_fr in the index's display-name table
+NAME_SEPARATOR = '\x1f'
+
+class ExactNameIndex:
+    """Open-addressing hash index of normalized names over flat arrays.
+
+    Each slot holds a 64-bit name hash and a row into the interned registry ID
+    list and the parallel display-name table, so 1M names cost roughly 12 bytes
+    per slot plus one ID string and one "nom_ar\x1fnom_fr" string per company.
+    Lookups hash the name once and probe a handful of slots; a hit reports the
+    registered names without reading the vector store.
+    """
+
+    def __init__(self, capacity=1024):
+        self._ids = []
+        self._names = []
+        self._count = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        """Allocate empty slot arrays with room for capacity names at 50% load"""
+        size = 1 << max(10, (capacity * 2 - 1).bit_length())
+        self._mask = size - 1
+        self._hashes = array('q', bytes(8 * size))
+        self._rows = array('i', bytes(4 * size))
+
+    def _probe(self, value):
+        """Return the slot holding value, or the empty slot where it would go"""
+        hashes = self._hashes
+        mask = self._mask
+        slot = value & mask
+        while hashes[slot] and hashes[slot] != value:
+            slot = (slot + 1) & mask
+        return slot
+
+    def _grow(self):
+        """Double the slot arrays and re-insert every entry"""
+        old_hashes, old_rows = self._hashes, self._rows
+        self._allocate(2 * (self._mask + 1))
+        for value, row in zip(old_hashes, old_rows):
+            if value:
+                slot = self._probe(value)
+                self._hashes[slot] = value
+                self._rows[slot] = row
+
+    def add(self, doc_id, names):
+        """Index the registered names (nom_ar, nom_fr) of one company under its registry ID"""
+        names = tuple(names)
+        row = None
+        for name in names:
+            normalized = normalize_name(name) if name else ''
+            if not normalized:
+                continue
+
+            if (self._count + 1) * 2 > self._mask + 1:
+                self._grow()
+
+            value = name_hash(normalized)
+            slot = self._probe(value)
+            if self._hashes[slot]:
+                continue  # First registration of a name wins
+
+            if row is None:
+                row = len(self._ids)
+                self._ids.append(sys.intern(str(doc_id)))
+                self._names.append(NAME_SEPARATOR.join(name or '' for name in names))
+
+            self._hashes[slot] = value
+            self._rows[slot] = row
+            self._count += 1
+
+    def _row(self, name):
+        """Row of an exact (normalized) duplicate, or None"""
+        normalized = normalize_name(name)
+        if not normalized:
+            return None
+
+        slot = self._probe(name_hash(normalized))
+        if not self._hashes[slot]:
+            return None
+        return self._rows[slot]
+
+    def lookup(self, name):
+        """Return the registry ID of an exact (normalized) duplicate, or None"""
+        row = self._row(name)
+        return None if row is None else self._ids[row]
+
+    def lookup_record(self, name):
+        """Return {'id', 'nom_ar', 'nom_fr'} of an exact (normalized) duplicate, or None"""
+        row = self._row(name)
+        if row is None:
+            return None
+        nom_ar, nom_fr = self._names[row].split(NAME_SEPARATOR, 1)
+        return {'id': self._ids[row], 'nom_ar': nom_ar, 'nom_fr': nom_fr}
+
+    def __contains__(self, name):
+        return self.lookup(name) is not None
+
+    def __len__(self):
+        return self._count
+
+    def memory_bytes(self):
+        """Approximate memory held by the slot arrays, ID list and name table"""
+        return (
+            self._hashes.buffer_info()[1] * self._hashes.itemsize
+            + self._rows.buffer_info()[1] * self._rows.itemsize
+            + sys.getsizeof(self._ids)
+            + sum(sys.getsizeof(doc_id) for doc_id in self._ids)
+            + sys.getsizeof(self._names)
+            + sum(sys.getsizeof(names) for names in self._names)
+        )
+
+class OverlayNameIndex:
+    """An ExactNameIndex with later registry changes applied on top of it.
+
+    Names of changed companies are looked up in a small overlay index built
+    from their current records; base entries of changed or removed companies
+    are ignored. (A name the base attributes to a changed company hides any
+    other holder of that name until the next full rebuild.)
+    """
+
+    def __init__(self, base, overlay, changed_ids):
+        self.base = base
+        self.overlay = overlay
+        self.changed_ids = changed_ids
+
+    def lookup(self, name):
+        """Return the registry ID of an exact (normalized) duplicate, or None"""
+        doc_id = self.overlay.lookup(name)
+        if doc_id is not None:
+            return doc_id
+        doc_id = self.base.lookup(name)
+        return None if doc_id in self.changed_ids else doc_id
+
+    def lookup_record(self, name):
+        """Return {'id', 'nom_ar', 'nom_fr'} of an exact (normalized) duplicate, or None"""
+        record = self.overlay.lookup_record(name)
+        if record is not None:
+            return record
+        record = self.base.lookup_record(name)
+        return None if record is None or record['id'] in self.changed_ids else record
+
+    def __contains__(self, name):
+        return self.lookup(name) is not None
+
+    def __len__(self):
+        return len(self.base) + len(self.overlay)
+
+    def memory_bytes(self):
+        """Approximate memory held by the base and overlay indexes"""
+        return self.base.memory_bytes() + self.overlay.memory_bytes() + sys.getsizeof(self.changed_ids)
+
+def build_exact_name_index(records):
+    """Build an ExactNameIndex from company records with id / nom_ar / nom_fr"""
+    index = ExactNameIndex()
+    for record in records:
+        index.add(record['id'], (record.get('nom_ar'), record.get('nom_fr')))
+    return index
+
+def exact_duplicate_result(business_name, name_index):
+    """Similarity result for an exact registered duplicate, or None if the name is new.
+
+    The match reports the registered names held in the index.
+    """
+    record = name_index.lookup_record(business_name)
+    if record is None:
+        return None
+
+    return {
+        'status': 'NOT AVAILABLE',
+        'reason': 'Exact name already registered in database',
+        'matches': [{
+            'id': record['id'],
+            'arabic': record['nom_ar'],
+            'french': record['nom_fr'],
+            'score': 0.0,
+            'similarity': 100.0
+        }]
+    }
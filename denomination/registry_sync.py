@@ -0,0 +1,235 @@
+"""Apply a dated RNE registry export to tunisia_companies as a delta.
+
+Diffs the export against the stored companies by registry ID: only new
+companies and renamed ones are embedded, companies whose legal form or
+status changed get their metadata rewritten in place, and companies missing
+from the export are deleted. The whole sync is one registry version bump
+that logs its change set, so running apps and services patch their exact
+and fuzzy name indexes instead of rebuilding them. A sync only reads the
+registry to diff it, so an interrupted run is simply run again.
+
+Usage (from the denomination/ directory):
+    python registry_sync.py registry-2026-10-17.csv --dry-run
+"""
+import argparse
+import datetime
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from embedding_providers import EMBEDDING_BACKENDS, get_embedding_backend
+from ingest import iter_registry_chunks, peak_rss_mb, write_company_records
+from result_cache import default_registry_versions
+from utils import (
+    COMPANY_METADATA_FIELDS,
+    company_metadata,
+    company_record_from_document,
+    initialize_vector_stores,
+    setup_chroma_directories
+)
+
+# Syncs touching more companies than this bump without a change set (readers rebuild their indexes)
+MAX_LOGGED_CHANGES = 50000
+
+# Change sets kept for readers that are behind
+KEEP_CHANGE_SETS = 20
+
+# Share of the stored companies a sync may remove before it refuses (a truncated export looks like mass removals)
+MAX_REMOVED_SHARE = 0.05
+
+COMPANY_NAME_FIELDS = ("nom_ar", "nom_fr")
+
+def export_date(path):
+    """The YYYY-MM-DD date in an export's file name, else the date it was last modified"""
+    match = re.search(r"\d{4}-\d{2}-\d{2}", os.path.basename(path))
+    if match:
+        return match.group(0)
+    return datetime.date.fromtimestamp(os.stat(path).st_mtime).isoformat()
+
+# ============================================================================
+# DIFF
+# ============================================================================
+
+def _fields(record, fields):
+    return tuple((record.get(field) or "").strip() for field in fields)
+
+def diff_chunk(companies_store, records):
+    """Split a chunk of export records into (new, renamed, updated) against the stored companies"""
+    unique = {}
+    for record in records:
+        unique.setdefault(record["id"], record)
+    if not unique:
+        return [], [], []
+
+    stored = companies_store._collection.get(ids=list(unique), include=["documents", "metadatas"])
+    stored_records = {
+        chroma_id: (company_record_from_document(document, metadata, fallback_id=chroma_id), metadata or {})
+        for chroma_id, document, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+    }
+
+    new, renamed, updated = [], [], []
+    for doc_id, record in unique.items():
+        if doc_id not in stored_records:
+            new.append(record)
+            continue
+        stored_record, metadata = stored_records[doc_id]
+        if _fields(record, COMPANY_NAME_FIELDS) != _fields(stored_record, COMPANY_NAME_FIELDS):
+            renamed.append(record)
+        elif _fields(company_metadata(record), COMPANY_METADATA_FIELDS) != _fields(metadata, COMPANY_METADATA_FIELDS):
+            # Also rewrites legacy {type, positional id} metadata as structured fields
+            updated.append(record)
+    return new, renamed, updated
+
+def iter_stored_ids(companies_store, batch_size=5000):
+    """Page through the registry IDs of the companies collection"""
+    offset = 0
+    while True:
+        batch = companies_store._collection.get(include=[], limit=batch_size, offset=offset)
+        if not batch["ids"]:
+            break
+        yield from batch["ids"]
+        offset += len(batch["ids"])
+
+def find_removed_ids(path, companies_store, chunk_size=5000):
+    """(stored count, stored IDs missing from the export), from one pass over the export's IDs"""
+    export_ids = set()
+    for _, records in iter_registry_chunks(path, chunk_size):
+        export_ids.update(record["id"] for record in records)
+
+    stored_count = 0
+    missing = []
+    for doc_id in iter_stored_ids(companies_store):
+        stored_count += 1
+        if doc_id not in export_ids:
+            missing.append(doc_id)
+    return stored_count, missing
+
+# ============================================================================
+# SYNC
+# ============================================================================
+
+def _delete_companies(companies_store, ids, batch_size=5000):
+    for i in range(0, len(ids), batch_size):
+        batch = ids[i:i + batch_size]
+        companies_store._collection.delete(ids=batch)
+
+def _update_metadata(companies_store, records):
+    companies_store._collection.update(
+        ids=[record["id"] for record in records],
+        metadatas=[company_metadata(record) for record in records]
+    )
+
+def sync_registry(path, companies_store, chunk_size=5000, concurrency=4, embed_batch_size=256,
+                  dry_run=False, max_removed_share=MAX_REMOVED_SHARE, versions=None):
+    """Apply a registry export to the companies store as new, renamed, updated and removed companies.
+
+    Returns a summary with the per-kind counts and the new registry version
+    (None for a dry run or a sync that changed nothing). The export's IDs are
+    read first, and the sync raises before writing anything if more than
+    max_removed_share of the stored companies are missing from it.
+    """
+    versions = versions or default_registry_versions()
+    collection = companies_store._collection.name
+    summary = {"as_of": export_date(path), "rows": 0, "new": 0, "renamed": 0, "updated": 0, "removed": 0,
+               "unchanged": 0, "registry_version": None}
+    upserted = []
+    removed = []
+    seen = set()
+    finished = False
+    start = time.perf_counter()
+
+    # A truncated export looks like mass removals: refuse it before applying any chunk
+    stored_count, missing = find_removed_ids(path, companies_store, chunk_size)
+    summary["removed"] = len(missing)
+    if not dry_run and len(missing) > max_removed_share * stored_count:
+        raise RuntimeError(
+            f"The export is missing {len(missing):,} of {stored_count:,} stored companies; "
+            f"raise --max-removed-share to remove them"
+        )
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for rows_read, records in iter_registry_chunks(path, chunk_size):
+                summary["rows"] = rows_read
+                # An ID repeated later in the export keeps its first row, as in ingest.py
+                records = [record for record in records if record["id"] not in seen]
+                new, renamed, updated = diff_chunk(companies_store, records)
+                chunk_ids = {record["id"] for record in records}
+                summary["unchanged"] += len(chunk_ids) - len(new) - len(renamed) - len(updated)
+                seen.update(chunk_ids)
+                summary["new"] += len(new)
+                summary["renamed"] += len(renamed)
+                summary["updated"] += len(updated)
+                if dry_run:
+                    continue
+
+                # Renamed companies are deleted and written anew: Chroma updates existing vectors far
+                # slower than it inserts
+                _delete_companies(companies_store, [record["id"] for record in renamed])
+                write_company_records(
+                    companies_store, new + renamed, executor, embed_batch_size, bump_version=False
+                )
+                if updated:
+                    _update_metadata(companies_store, updated)
+                upserted.extend(new + renamed)
+
+        if not dry_run:
+            removed = missing
+            _delete_companies(companies_store, removed)
+        finished = True
+    finally:
+        if not dry_run and (upserted or removed or summary["updated"]):
+            # One bump for the whole sync; a partial one logs no change set, so readers rebuild
+            complete = finished and len(upserted) + len(removed) <= MAX_LOGGED_CHANGES
+            changes = {"as_of": summary["as_of"], "upserted": upserted, "removed": removed} if complete else None
+            summary["registry_version"] = versions.bump(collection, changes)
+            versions.prune_changes(collection, keep=KEEP_CHANGE_SETS)
+
+    summary["seconds"] = time.perf_counter() - start
+    summary["peak_rss_mb"] = peak_rss_mb()
+    return summary
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="Registry export (.csv or .parquet)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Rows diffed per chunk")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent embedding requests")
+    parser.add_argument("--embed-batch-size", type=int, default=256, help="Documents per embedding request")
+    parser.add_argument("--dry-run", action="store_true", help="Report the changes without applying them")
+    parser.add_argument(
+        "--max-removed-share", type=float, default=MAX_REMOVED_SHARE,
+        help="Largest share of the stored companies a sync may remove"
+    )
+    parser.add_argument(
+        "--embedding-backend", choices=list(EMBEDDING_BACKENDS),
+        help="Embedding backend (default: EMBEDDING_BACKEND env var, else openai)"
+    )
+    args = parser.parse_args()
+
+    setup_chroma_directories()
+    backend = args.embedding_backend or get_embedding_backend()
+    companies_store, _ = initialize_vector_stores(os.getenv("OPENAI_API_KEY"), backend)
+    if not companies_store:
+        sys.exit("Could not open the companies vector store")
+
+    try:
+        summary = sync_registry(
+            args.path,
+            companies_store,
+            chunk_size=args.chunk_size,
+            concurrency=args.concurrency,
+            embed_batch_size=args.embed_batch_size,
+            dry_run=args.dry_run,
+            max_removed_share=args.max_removed_share
+        )
+    except RuntimeError as e:
+        sys.exit(f"Sync failed: {str(e)}")
+    peak = summary["peak_rss_mb"]
+    print(
+        f"{'Dry run' if args.dry_run else 'Synced'} export of {summary['as_of']}: "
+        f"{summary['new']:,} new, {summary['renamed']:,} renamed, {summary['updated']:,} updated, "
+        f"{summary['removed']:,} removed, {summary['unchanged']:,} unchanged in {summary['seconds']:.1f}s"
+        + (f" (registry version {summary['registry_version']})" if summary["registry_version"] else "")
+        + (f", peak RSS {peak:,.0f} MB" if peak is not None else "")
+    )
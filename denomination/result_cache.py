@@ -0,0 +1,206 @@
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# ============================================================================
+# REGISTRY VERSION STAMPS
+# ============================================================================
+
+DEFAULT_VERSIONS_PATH = "./chroma_db/registry_versions.sqlite3"
+
+class RegistryVersions:
+    """Per-collection write counters shared by every process through SQLite.
+
+    Anything that writes to tunisia_companies or hate_words bumps the
+    collection's counter; readers compare counters to tell whether the
+    registry changed since a result was computed. A bump may log the change
+    set it applies, so readers can patch in-memory indexes instead of
+    rebuilding them.
+    """
+
+    def __init__(self, path=DEFAULT_VERSIONS_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS registry_versions (collection TEXT PRIMARY KEY, version INTEGER)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS registry_changes "
+            "(collection TEXT, version INTEGER, changes TEXT, PRIMARY KEY (collection, version))"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get(self, collections):
+        """Version stamp (tuple of counters) for the given collection names"""
+        collections = list(collections)
+        placeholders = ",".join("?" * len(collections))
+        with self._lock:
+            rows = dict(self._conn.execute(
+                f"SELECT collection, version FROM registry_versions WHERE collection IN ({placeholders})",
+                collections
+            ).fetchall())
+        return tuple(rows.get(collection, 0) for collection in collections)
+
+    def bump(self, collection, changes=None):
+        """Record a write to a collection, with its JSON-serializable change set if given; returns the new version"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO registry_versions (collection, version) VALUES (?, 1) "
+                "ON CONFLICT(collection) DO UPDATE SET version = version + 1",
+                (collection,)
+            )
+            version = self._conn.execute(
+                "SELECT version FROM registry_versions WHERE collection = ?", (collection,)
+            ).fetchone()[0]
+            if changes is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO registry_changes (collection, version, changes) VALUES (?, ?, ?)",
+                    (collection, version, json.dumps(changes, ensure_ascii=False))
+                )
+        return version
+
+    def changes_since(self, collection, version):
+        """(current version, change sets logged after version), or (current version, None) if a bump in between logged none"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM registry_versions WHERE collection = ?", (collection,)
+            ).fetchone()
+            current = row[0] if row else 0
+            rows = self._conn.execute(
+                "SELECT version, changes FROM registry_changes WHERE collection = ? AND version > ? AND version <= ? "
+                "ORDER BY version",
+                (collection, version, current)
+            ).fetchall()
+        if [row[0] for row in rows] != list(range(version + 1, current + 1)):
+            return current, None
+        return current, [json.loads(changes) for _, changes in rows]
+
+    def prune_changes(self, collection, keep=20):
+        """Drop all but the newest keep change sets of a collection"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM registry_changes WHERE collection = ? AND version <= "
+                "(SELECT version FROM registry_versions WHERE collection = ?) - ?",
+                (collection, collection, keep)
+            )
+
+_default_versions = None
+_default_versions_lock = threading.Lock()
+
+def default_registry_versions():
+    """Process-wide RegistryVersions over DEFAULT_VERSIONS_PATH"""
+    global _default_versions
+    with _default_versions_lock:
+        if _default_versions is None:
+            _default_versions = RegistryVersions()
+        return _default_versions
+
+def use_registry_versions(path):
+    """Point the process-wide RegistryVersions at another file, e.g. a benchmark's own registry"""
+    global _default_versions
+    with _default_versions_lock:
+        _default_versions = RegistryVersions(path)
+        return _default_versions
+
+def bump_registry_version(store):
+    """Bump the version of a vector store's collection after writing to it"""
+    try:
+        default_registry_versions().bump(store._collection.name)
+    except Exception as e:
+        print(f"Error bumping registry version: {str(e)}")
+
+# ============================================================================
+# ANALYSIS RESULT CACHE
+# ============================================================================
+
+class AnalysisResultCache:
+    """Cross-session LRU cache of analysis results, bounded by size and age.
+
+    Keys are the name as typed, any call variant (e.g. metadata filters) and
+    the current version stamp of the companies and hate collections. The stamp
+    is read on every lookup, so once either collection is written to, results
+    computed before the write stop matching and age out of the LRU.
+    """
+
+    def __init__(self, collections, versions=None, max_entries=5000, max_age_seconds=3600):
+        self.collections = list(collections)
+        self.versions = versions or default_registry_versions()
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_stores(cls, companies_store, hate_store, **kwargs):
+        """Cache watching the collections behind the given vector stores"""
+        collections = [store._collection.name for store in (companies_store, hate_store) if store]
+        return cls(collections, **kwargs)
+
+    def current_stamp(self):
+        """Version stamp of the watched collections"""
+        return self.versions.get(self.collections)
+
+    def _key(self, name, variant, stamp):
+        # Results echo the spelling (alternatives, duplicate fields), so spellings are not shared
+        return (name, json.dumps(variant, sort_keys=True, default=str), stamp)
+
+    def get(self, name, stamp, variant=None):
+        """Copy of the cached result for name under stamp, or None"""
+        key = self._key(name, variant, stamp)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.max_age_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(entry[1])
+
+    def put(self, name, result, stamp, variant=None):
+        """Cache a result computed while the registry was at stamp"""
+        key = self._key(name, variant, stamp)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, name, compute, variant=None, cacheable=None):
+        """Cached result for name, or compute() stored under the stamp read before computing.
+
+        Reading the stamp first means a result computed while the registry was
+        being written to is filed under the old version and never served after
+        the write. Results failing cacheable(result) are returned but not stored.
+        """
+        stamp = self.current_stamp()
+        result = self.get(name, stamp, variant)
+        if result is None:
+            result = compute()
+            if cacheable is None or cacheable(result):
+                self.put(name, result, stamp, variant)
+        return result
+
+    def stats(self):
+        """Hit/miss counters for the cache"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries)
+            }
@@ -0,0 +1,293 @@
+"""Headless HTTP/JSON denomination validation service.
+
+Wraps the analyze_business_name checks behind a small JSON API so clients other
+than the Streamlit app (e.g. the Django front) can validate names. Concurrent
+requests are collected for a few milliseconds into one analyze_business_names()
+call, i.e. one batched embedding request and one query per vector store.
+
+Endpoints:
+    POST /analyze   {"name": "..."} or {"names": ["...", ...]}
+    GET  /health    (503 while the Chroma server, in client/server mode, is unreachable)
+    GET  /stats
+    GET  /metrics   (Prometheus text format)
+
+Usage (from the denomination/ directory):
+    OPENAI_API_KEY=... python service.py --port 8502 --workers 4 --max-wait-ms 5
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from business_validator import analyze_business_names
+from chroma_server import get_chroma_server_url, server_health
+from embedding_providers import EMBEDDING_BACKENDS, get_embedding_backend
+from hate_matcher import HateTermMatcher
+from metrics import count_sdk_retries, register_cache, register_counts, render_metrics, span
+from result_cache import AnalysisResultCache
+from utils import LiveNameIndexes, initialize_vector_stores
+
+# ============================================================================
+# MICRO-BATCHER
+# ============================================================================
+
+class MicroBatcher:
+    """Collects concurrent requests into batched calls on a pool of worker threads.
+
+    A worker takes the first queued name, then keeps collecting until
+    max_batch_size names are queued or max_wait_ms have passed, and resolves
+    every request of the batch from one analyze_batch(names) call.
+    """
+
+    def __init__(self, analyze_batch, max_batch_size=32, max_wait_ms=5, workers=4):
+        self.analyze_batch = analyze_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "batches": 0, "errors": 0, "largest_batch": 0}
+        self._threads = [
+            threading.Thread(target=self._work, name=f"batch-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, name):
+        """Queue one name; the returned Future resolves to its result dict"""
+        future = Future()
+        self._queue.put((name, future))
+        return future
+
+    def _collect(self, first):
+        """Gather a batch starting with first, within the batching window"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # Let the other workers see the shutdown
+                break
+            batch.append(item)
+        return batch
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.put(None)
+                return
+
+            batch = self._collect(item)
+            names = [name for name, _ in batch]
+            try:
+                results = self.analyze_batch(names)
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                with self._lock:
+                    self._counters["errors"] += 1
+
+            with self._lock:
+                self._counters["requests"] += len(batch)
+                self._counters["batches"] += 1
+                self._counters["largest_batch"] = max(self._counters["largest_batch"], len(batch))
+
+    def stats(self):
+        """Request and batch counters"""
+        with self._lock:
+            counters = dict(self._counters)
+        counters["mean_batch_size"] = counters["requests"] / counters["batches"] if counters["batches"] else 0.0
+        counters["queued"] = self._queue.qsize()
+        return counters
+
+    def close(self):
+        """Stop the workers once the queue drains"""
+        self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+# ============================================================================
+# HTTP SERVICE
+# ============================================================================
+
+def _json_default(value):
+    """Serialize NumPy scalars in result dicts"""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+class DenominationServer(ThreadingHTTPServer):
+    """Threaded HTTP server with a listen backlog sized for bursts of concurrent clients"""
+    daemon_threads = True
+    request_queue_size = 256
+
+def make_handler(batcher, request_timeout=30.0, health_check=None):
+    """Request handler class bound to a batcher, with an optional health_check() -> {"status": ...}"""
+
+    class DenominationHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False, default=_json_default).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                health = {"status": "ok"}
+                if health_check is not None:
+                    health["vector_store"] = health_check()
+                    if health["vector_store"]["status"] != "ok":
+                        health["status"] = "degraded"
+                self._send_json(200 if health["status"] == "ok" else 503, health)
+            elif self.path == "/stats":
+                self._send_json(200, batcher.stats())
+            elif self.path == "/metrics":
+                body = render_metrics().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json(404, {"error": "Not found"})
+
+        def do_POST(self):
+            if self.path != "/analyze":
+                self._send_json(404, {"error": "Not found"})
+                return
+
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                data = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send_json(400, {"error": "Invalid JSON body"})
+                return
+
+            names = data.get("names") if isinstance(data, dict) else None
+            single = names is None
+            if single:
+                names = [data.get("name")] if isinstance(data, dict) else [None]
+            if not names or not all(isinstance(name, str) and name.strip() for name in names):
+                self._send_json(400, {"error": "Provide a non-empty 'name' or list of 'names'"})
+                return
+
+            futures = [batcher.submit(name) for name in names]
+            try:
+                results = [future.result(timeout=request_timeout) for future in futures]
+            except Exception as e:
+                self._send_json(503, {"error": f"Analysis failed: {str(e)}"})
+                return
+
+            if single:
+                self._send_json(200, {"name": names[0], "result": results[0]})
+            else:
+                self._send_json(200, {"results": [
+                    {"name": name, "result": result} for name, result in zip(names, results)
+                ]})
+
+        def log_message(self, format, *args):
+            pass  # Keep load tests quiet; errors are returned in the response
+
+    return DenominationHandler
+
+def create_analyzer(backend, screen_alternatives=True, cache_results=True):
+    """Open the stores and indexes once and return a names -> results batch function.
+
+    With cache_results, names analyzed since the last registry or hate list
+    change are answered from the result cache and left out of the batch. The
+    name indexes are patched with any registry syncs before each batch.
+    """
+    companies_store, hate_store = initialize_vector_stores(os.getenv("OPENAI_API_KEY"), backend)
+    if not companies_store:
+        raise RuntimeError("Could not open the vector stores")
+
+    name_indexes = LiveNameIndexes(companies_store)
+    name_index, _ = name_indexes.indexes()
+    hate_matcher = HateTermMatcher(hate_store) if hate_store else None
+    result_cache = AnalysisResultCache.for_stores(companies_store, hate_store) if cache_results else None
+    print(f"Indexed {len(name_index):,} names")
+    
+    count_sdk_retries()
+    for name, cache in (("embedding", companies_store.embeddings), ("result", result_cache)):
+        if hasattr(cache, "stats"):
+            register_cache(name, cache)
+    if hasattr(companies_store, "source_stats"):
+        register_counts(
+            "denomination_company_searches_total", "Company similarity queries by source (snapshot or chroma)",
+            "source", companies_store.source_stats
+        )
+
+    def analyze_batch(names):
+        with span("service_batch"):
+            # Registry syncs since the last batch are applied to the name indexes first
+            try:
+                name_indexes.refresh()
+            except Exception as e:
+                print(f"Error refreshing name indexes: {str(e)}")
+            name_index, fuzzy_index = name_indexes.indexes()
+            return analyze_business_names(
+                names, companies_store, hate_store, None, name_index,
+                fuzzy_index=fuzzy_index, hate_matcher=hate_matcher,
+                screen_alternatives=screen_alternatives, result_cache=result_cache
+            )
+
+    return analyze_batch
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8502, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=4, help="Batch worker threads")
+    parser.add_argument("--max-batch-size", type=int, default=32, help="Most names per batch")
+    parser.add_argument("--max-wait-ms", type=float, default=5, help="Batching window in milliseconds")
+    parser.add_argument("--no-alternatives", action="store_true", help="Skip pre-screening alternatives")
+    parser.add_argument("--no-result-cache", action="store_true", help="Analyze every request, even repeated names")
+    parser.add_argument(
+        "--embedding-backend", choices=list(EMBEDDING_BACKENDS),
+        help="Embedding backend (default: EMBEDDING_BACKEND env var, else openai)"
+    )
+    args = parser.parse_args()
+
+    try:
+        analyze_batch = create_analyzer(
+            args.embedding_backend or get_embedding_backend(),
+            screen_alternatives=not args.no_alternatives, cache_results=not args.no_result_cache
+        )
+    except Exception as e:
+        sys.exit(f"Could not start the service: {str(e)}")
+
+    batcher = MicroBatcher(
+        analyze_batch, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms, workers=args.workers
+    )
+    register_counts(
+        "denomination_service_events_total", "Service requests, batches and failed batches",
+        "event", lambda: {key: batcher.stats()[key] for key in ("requests", "batches", "errors")}
+    )
+    server_url = get_chroma_server_url()
+    health_check = (lambda: server_health(server_url)) if server_url else None
+    server = DenominationServer((args.host, args.port), make_handler(batcher, health_check=health_check))
+    print(f"Denomination service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
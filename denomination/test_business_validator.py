@@ -0,0 +1,43 @@
+import time
+import unittest
+from unittest import mock
+import business_validator
+
+def slow_hate_search(store, text, stage, **kwargs):
+    if stage == "hate":
+        time.sleep(0.5)
+        return []
+    return []
+
+def similarity_result(status):
+    return lambda business_name, results, fuzzy_matches: {'status': status, 'reason': '', 'matches': []}
+
+class IncompleteHateStageTest(unittest.TestCase):
+    """A hate-word search that never reported leaves the result partial and uncacheable"""
+
+    def analyze(self, status, stage_timeouts=None):
+        with mock.patch.object(business_validator, "_timed_similarity_search", slow_hate_search), \
+                mock.patch.object(business_validator, "_similarity_result_from_results", similarity_result(status)):
+            return business_validator._analyze_business_name(
+                "Atlas Negoce", object(), object(), None, stage_timeouts=stage_timeouts
+            )
+
+    def test_cancelled_hate_stage_is_partial(self):
+        result = self.analyze('NOT AVAILABLE')
+        self.assertTrue(result['partial'])
+        self.assertFalse(business_validator.is_cacheable_result(result))
+
+    def test_timed_out_hate_stage_is_partial(self):
+        result = self.analyze('AVAILABLE', stage_timeouts={'hate_words': 0.05})
+        self.assertTrue(result['partial'])
+        self.assertFalse(business_validator.is_cacheable_result(result))
+
+    def test_completed_stages_are_cacheable(self):
+        with mock.patch.object(business_validator, "_timed_similarity_search", lambda *args, **kwargs: []), \
+                mock.patch.object(business_validator, "_similarity_result_from_results", similarity_result('AVAILABLE')):
+            result = business_validator._analyze_business_name("Atlas Negoce", object(), object(), None)
+        self.assertNotIn('partial', result)
+        self.assertTrue(business_validator.is_cacheable_result(result))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+from langchain_core.embeddings import Embeddings
+from embedding_cache import CachedEmbeddings
+
+class SpellingEmbeddings(Embeddings):
+    """Deterministic vectors that differ with case and spacing, counting the texts embedded"""
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), float(sum(map(ord, text)) % 997), float(text.count(" "))] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+class CachedEmbeddingsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def cache(self, name="cache.sqlite3"):
+        return CachedEmbeddings(SpellingEmbeddings(), "test-model", path=os.path.join(self.directory.name, name))
+
+    def test_spellings_that_normalize_alike_get_their_cold_vectors(self):
+        cache = self.cache()
+        cache.embed_query("Atlas Negoce")
+        for i, spelling in enumerate(("ATLAS NEGOCE", "atlas  negoce", "Atlas Negoce")):
+            cold = self.cache(f"cold-{i}.sqlite3").embed_query(spelling)
+            self.assertEqual(cache.embed_query(spelling), cold)
+
+    def test_repeated_text_is_embedded_once(self):
+        cache = self.cache()
+        vectors = cache.embed_queries(["Nour", "Nour", "nour"])
+        self.assertEqual(cache.embeddings.embedded, ["Nour", "nour"])
+        self.assertEqual(vectors[0], vectors[1])
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_vectors_persist_across_instances(self):
+        first = self.cache()
+        vector = first.embed_query("Zitouna")
+        second = self.cache()
+        self.assertEqual(second.embed_query("Zitouna"), vector)
+        self.assertEqual(second.embeddings.embedded, [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import threading
+import time
+import unittest
+from hate_matcher import HateTermMatcher
+
+TERMS = [
+    ("badword1", "inappropriate"),
+    ("offensive2", "hate_speech"),
+    ("shit", "vulgar"),
+    ("ia", "test"),
+    ("1488", "hate_speech"),
+]
+
+def matched(matcher, text):
+    return [match['word'] for match in matcher.match(text)]
+
+class HateTermMatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.matcher = HateTermMatcher(terms=TERMS)
+
+    def test_terms_with_digits_match_as_written(self):
+        self.assertEqual(matched(self.matcher, "Badword1 SARL"), ["badword1"])
+        self.assertEqual(matched(self.matcher, "OFFENSIVE-2 Tech"), ["offensive2"])
+        self.assertEqual(matched(self.matcher, "Bureau 1488"), ["1488"])
+
+    def test_numbers_are_not_read_as_letters(self):
+        self.assertEqual(matched(self.matcher, "1488"), ["1488"])
+        self.assertEqual(matched(self.matcher, "Groupe 2000"), [])
+        self.assertEqual(matched(self.matcher, "Atlas 1 4"), [])
+
+    def test_leetspeak_inside_words_is_folded(self):
+        self.assertEqual(matched(self.matcher, "sh1t corp"), ["shit"])
+        self.assertEqual(matched(self.matcher, "Sh!t Services"), ["shit"])
+        self.assertEqual(matched(self.matcher, "b4dword1 Co"), ["badword1"])
+
+class RefreshTest(unittest.TestCase):
+
+    def test_concurrent_matches_start_one_refresh(self):
+        started = []
+        release = threading.Event()
+
+        class SlowCollection:
+            def get(self, include=None):
+                started.append(threading.current_thread().name)
+                release.wait(5)
+                return {"documents": [], "metadatas": []}
+
+        store = type("Store", (), {"_collection": SlowCollection()})()
+        matcher = HateTermMatcher(terms=TERMS, refresh_interval=0.0)
+        matcher.hate_store = store
+
+        threads = [threading.Thread(target=matcher.match, args=("Atlas",)) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        time.sleep(0.1)
+        release.set()
+        self.assertEqual(len(started), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from name_extractor import DEFAULT_MIN_CONFIDENCE, extract_business_name_rules
+
+class ConsultationQuestionTest(unittest.TestCase):
+    """Questions about the registration process must reach the LLM, not be taken as names"""
+
+    def assertLeftToLLM(self, query):
+        extraction = extract_business_name_rules(query)
+        self.assertLess(extraction['confidence'], DEFAULT_MIN_CONFIDENCE, (query, extraction))
+
+    def test_consultation_questions_name_nothing(self):
+        for query in (
+            "Is registration free?",
+            "Is online registration available?",
+            "Is the registration fee still free?",
+            "Registration available?",
+            "check registration fees",
+            "L'inscription est-elle disponible ?",
+            "Est-ce que l'inscription est libre ?",
+            "هل التسجيل متاح؟",
+        ):
+            self.assertLeftToLLM(query)
+            self.assertIsNone(extract_business_name_rules(query)['name'], query)
+
+    def test_lowercase_free_text_is_left_to_llm(self):
+        self.assertLeftToLLM("is company creation free?")
+        self.assertLeftToLLM("is techcorp available?")
+
+    def test_bare_input_is_below_threshold(self):
+        extraction = extract_business_name_rules("Atlas Negoce")
+        self.assertEqual(extraction['name'], "Atlas Negoce")
+        self.assertLess(extraction['confidence'], DEFAULT_MIN_CONFIDENCE)
+
+class NamedQuestionTest(unittest.TestCase):
+
+    def assertExtracts(self, query, name):
+        extraction = extract_business_name_rules(query)
+        self.assertEqual(extraction['name'], name, query)
+        self.assertGreaterEqual(extraction['confidence'], DEFAULT_MIN_CONFIDENCE, query)
+
+    def test_capitalised_and_quoted_names_skip_the_llm(self):
+        self.assertExtracts("Is the name TechCorp available?", "TechCorp")
+        self.assertExtracts("Is STEG 2 registered?", "STEG 2")
+        self.assertExtracts("check if Atlas Negoce is available", "Atlas Negoce")
+        self.assertExtracts('"blue sky" available?', "blue sky")
+        self.assertExtracts("Est-ce que le nom Dar Zitouna est disponible ?", "Dar Zitouna")
+        self.assertExtracts("هل اسم الشركة الذكية متاح؟", "الشركة الذكية")
+
+if __name__ == "__main__":
+    unittest.main()
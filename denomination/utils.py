@@ -1,29 +1,64 @@
 import os
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
-from langchain_core.prompts import ChatPromptTemplate
+import threading
+from langchain_core.documents import Document
+from chroma_server import get_chroma_server_url, get_server_client
+from embedding_cache import CachedEmbeddings
+from llm_cache import with_llm_cache
+from name_index import ExactNameIndex, OverlayNameIndex, build_exact_name_index
+from result_cache import bump_registry_version, default_registry_versions
+from fuzzy_index import OverlayFuzzyIndex, build_fuzzy_name_index
+from embedding_providers import (
+    DEFAULT_EMBEDDING_BACKEND,
+    backend_requires_openai_key,
+    collection_name_for,
+    create_embeddings
+)
 
-def initialize_vector_stores(openai_key):
-    """Initialize vector stores for companies and hate words"""
+def initialize_vector_stores(openai_key, backend=DEFAULT_EMBEDDING_BACKEND, server_url=None):
+    """Initialize vector stores for companies and hate words with the selected embedding backend.
+
+    The stores are embedded under ./chroma_db unless a Chroma server URL is
+    given or set in CHROMA_SERVER_URL (see chroma_server.py).
+    """
     try:
-        # Initialize embeddings
-        embeddings = OpenAIEmbeddings(
-            api_key=openai_key,
-            model="text-embedding-3-small"
-        )
+        # Imported here: chromadb is the slowest import of the app and only needed once stores open
+        from langchain_chroma import Chroma
+        
+        # Initialize embeddings; remote backends are cached so repeated names skip the paid API call
+        embeddings, model_name, remote = create_embeddings(backend, openai_key)
+        if remote:
+            embeddings = CachedEmbeddings(
+                embeddings,
+                model_name=model_name,
+                path="./chroma_db/embedding_cache.sqlite3"
+            )
+        
+        # Stores share the process's pooled server client, else open their embedded directory
+        server_url = server_url or get_chroma_server_url()
+        if server_url:
+            client = get_server_client(server_url)
+            companies_location = hate_location = {"client": client}
+        else:
+            companies_location = {"persist_directory": "./chroma_db/companies"}
+            hate_location = {"persist_directory": "./chroma_db/hate_words"}
         
-        # Initialize company names vector store
+        # Initialize company names vector store (one collection per backend)
         companies_store = Chroma(
-            collection_name="tunisia_companies",
+            collection_name=collection_name_for("tunisia_companies", backend),
             embedding_function=embeddings,
-            persist_directory="./chroma_db/companies"
+            **companies_location
         )
+        # An exported snapshot (vector_snapshot.py) answers unfiltered searches while it is current,
+        # when enabled: it saves memory, not time
+        from vector_snapshot import attach_snapshot, snapshots_enabled
+        if snapshots_enabled():
+            companies_store = attach_snapshot(companies_store)
         
         # Initialize hate words vector store
         hate_store = Chroma(
-            collection_name="hate_words",
+            collection_name=collection_name_for("hate_words", backend),
             embedding_function=embeddings,
-            persist_directory="./chroma_db/hate_words"
+            **hate_location
         )
         
         return companies_store, hate_store
@@ -32,8 +67,233 @@ def initialize_vector_stores(openai_key):
         print(f"Error initializing vector stores: {str(e)}")
         return None, None
 
-def get_business_name_chain(llm, companies_store):
+def embed_queries(embeddings, texts):
+    """Embed several query texts in one batched embedding request"""
+    texts = list(texts)
+    if not texts:
+        return []
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(texts)
+    return embeddings.embed_documents(texts)
+
+def query_store_by_vectors(store, query_embeddings, k=5, where=None):
+    """Run one multi-query lookup on a Chroma store, returning one [(Document, distance)] list per vector"""
+    if not query_embeddings:
+        return []
+    
+    results = store._collection.query(
+        query_embeddings=query_embeddings,
+        n_results=k,
+        where=where,
+        include=["documents", "metadatas", "distances"]
+    )
+    
+    batches = []
+    for documents, metadatas, ids, distances in zip(
+        results["documents"], results["metadatas"], results["ids"], results["distances"]
+    ):
+        batches.append([
+            (Document(page_content=document, metadata=metadata or {}, id=doc_id), distance)
+            for document, metadata, doc_id, distance in zip(documents, metadatas, ids, distances)
+            if document is not None
+        ])
+    return batches
+
+# Structured metadata fields written for every company at ingest
+COMPANY_METADATA_FIELDS = ["id", "nom_ar", "nom_fr", "forme_juridique", "statut"]
+
+def parse_company_document(content):
+    """Extract (id, arabic name, french name) from an "ID / NOM_AR / NOM_FR" company document"""
+    ar_name = ""
+    fr_name = ""
+    doc_id = ""
+    
+    lines = content.split('\n')
+    for line in lines:
+        if 'NOM_AR:' in line:
+            ar_name = line.split('NOM_AR:')[1].strip()
+        elif 'NOM_FR:' in line:
+            fr_name = line.split('NOM_FR:')[1].strip()
+        elif 'ID:' in line:
+            doc_id = line.split('ID:')[1].strip()
+    
+    return doc_id, ar_name, fr_name
+
+def format_company_document(record):
+    """Render a company record as the "ID / NOM_AR / NOM_FR" text that gets embedded"""
+    return f"ID: {record['id']}\nNOM_AR: {record.get('nom_ar') or ''}\nNOM_FR: {record.get('nom_fr') or ''}"
+
+def company_metadata(record):
+    """Typed Chroma metadata for a company record (Chroma rejects None values)"""
+    metadata = {"type": "company"}
+    for field in COMPANY_METADATA_FIELDS:
+        value = record.get(field)
+        if value is not None and value != "":
+            metadata[field] = str(value)
+    return metadata
+
+def has_company_metadata(metadata):
+    """True if a company document was ingested with structured metadata"""
+    return bool(metadata) and ("nom_ar" in metadata or "nom_fr" in metadata)
+
+def company_record_from_document(content, metadata, fallback_id=""):
+    """Company record from structured metadata, parsing legacy page_content only if needed"""
+    if has_company_metadata(metadata):
+        record = {field: metadata.get(field, "") for field in COMPANY_METADATA_FIELDS}
+        record["id"] = record["id"] or fallback_id
+        return record
+    
+    doc_id, ar_name, fr_name = parse_company_document(content or "")
+    return {"id": doc_id or fallback_id, "nom_ar": ar_name, "nom_fr": fr_name}
+
+def build_company_filter(filters=None):
+    """Build a Chroma `where` clause from {field: value} company filters"""
+    clauses = [{field: value} for field, value in (filters or {}).items() if value not in (None, "")]
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+def add_company_records(companies_store, records):
+    """Embed and upsert company records, keyed by registry ID, with structured metadata"""
+    records = list(records)
+    if not records:
+        return 0
+    companies_store.add_texts(
+        texts=[format_company_document(record) for record in records],
+        metadatas=[company_metadata(record) for record in records],
+        ids=[str(record["id"]) for record in records]
+    )
+    bump_registry_version(companies_store)
+    return len(records)
+
+def iter_company_records(companies_store, batch_size=5000, where=None):
+    """Page through the companies collection, yielding company record dicts"""
+    offset = 0
+    while True:
+        batch = companies_store._collection.get(
+            where=where,
+            include=["documents", "metadatas"],
+            limit=batch_size,
+            offset=offset
+        )
+        if not batch["ids"]:
+            break
+        
+        for chroma_id, document, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+            yield company_record_from_document(document, metadata, fallback_id=chroma_id)
+        
+        offset += len(batch["ids"])
+
+def build_name_indexes(companies_store):
+    """Build the exact-duplicate and fuzzy name indexes in one pass over the registry"""
+    name_index = ExactNameIndex()
+    
+    def index_exact(records):
+        for record in records:
+            name_index.add(record['id'], (record.get('nom_ar'), record.get('nom_fr')))
+            yield record
+    
+    fuzzy_index = build_fuzzy_name_index(index_exact(iter_company_records(companies_store)))
+    return name_index, fuzzy_index
+
+class LiveNameIndexes:
+    """Exact and fuzzy name indexes kept in step with the companies registry.
+
+    refresh() applies the change sets that registry syncs (registry_sync.py)
+    logged since the indexes were built, as small overlay indexes over the
+    changed companies. A write that logged no change set, or an overlay
+    grown past max_overlay companies, triggers a full rebuild instead.
+    """
+
+    def __init__(self, companies_store, versions=None, max_overlay=50000):
+        self.companies_store = companies_store
+        self.versions = versions or default_registry_versions()
+        self.collection = companies_store._collection.name
+        self.max_overlay = max_overlay
+        self._lock = threading.Lock()
+        self._rebuild()
+
+    def _rebuild(self):
+        # Read the version first: a write during the build is applied again by the next refresh
+        self.version = self.versions.get([self.collection])[0]
+        self._base = build_name_indexes(self.companies_store)
+        self._changed = {}
+        self._indexes = self._base
+
+    def indexes(self):
+        """The current (name_index, fuzzy_index) pair"""
+        return self._indexes
+
+    def refresh(self):
+        """Bring the indexes up to the registry's current version; returns True if they changed"""
+        with self._lock:
+            current, change_sets = self.versions.changes_since(self.collection, self.version)
+            if current == self.version:
+                return False
+            if change_sets is None:
+                self._rebuild()
+                return True
+
+            # Registry ID -> current record, or None once removed
+            for changes in change_sets:
+                for record in changes.get("upserted", []):
+                    self._changed[record["id"]] = record
+                for doc_id in changes.get("removed", []):
+                    self._changed[doc_id] = None
+            if len(self._changed) > self.max_overlay:
+                self._rebuild()
+                return True
+
+            records = [record for record in self._changed.values() if record]
+            changed_ids = frozenset(self._changed)
+            base_name_index, base_fuzzy_index = self._base
+            self._indexes = (
+                OverlayNameIndex(base_name_index, build_exact_name_index(records), changed_ids),
+                OverlayFuzzyIndex(base_fuzzy_index, build_fuzzy_name_index(records), changed_ids)
+            )
+            self.version = current
+            return True
+
+def migrate_company_metadata(companies_store, batch_size=1000):
+    """Rewrite legacy company metadata ({type, positional id}) as structured fields, without re-embedding"""
+    migrated = 0
+    offset = 0
+    while True:
+        batch = companies_store._collection.get(
+            include=["documents", "metadatas"],
+            limit=batch_size,
+            offset=offset
+        )
+        if not batch["ids"]:
+            break
+        
+        ids = []
+        metadatas = []
+        for chroma_id, document, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+            if has_company_metadata(metadata):
+                continue
+            record = company_record_from_document(document, metadata, fallback_id=chroma_id)
+            ids.append(chroma_id)
+            metadatas.append({**(metadata or {}), **company_metadata(record)})
+        
+        if ids:
+            companies_store._collection.update(ids=ids, metadatas=metadatas)
+            migrated += len(ids)
+        
+        offset += len(batch["ids"])
+    
+    if migrated:
+        bump_registry_version(companies_store)
+    return migrated
+
+# Bump when the consultation prompt changes, so cached answers are not reused
+CONSULTATION_PROMPT_VERSION = "1"
+
+def get_business_name_chain(llm, companies_store, llm_cache=None):
     """Create a business name consultation chain"""
+    from langchain_core.prompts import ChatPromptTemplate
     
     business_consultation_prompt = ChatPromptTemplate.from_messages([
         ("system", """You are an expert business name consultant for Tunisia RNE (Registre National des Entreprises).
@@ -66,7 +326,7 @@ Keep responses concise and actionable."""),
     ])
     
     # Create the chain
-    chain = business_consultation_prompt | llm
+    chain = business_consultation_prompt | with_llm_cache(llm, llm_cache, CONSULTATION_PROMPT_VERSION)
     
     return chain
 
@@ -85,13 +345,13 @@ def setup_chroma_directories():
 def load_sample_data(companies_store, hate_store):
     """Load sample data into vector stores (for testing/demo purposes)"""
     try:
-        # Sample company names (in a real implementation, this would load from a database)
+        # Sample company records (in a real implementation, this would load from a database)
         sample_companies = [
-            "ID: 001\nNOM_AR: الشركة التونسية للتكنولوجيا\nNOM_FR: Société Tunisienne de Technologie",
-            "ID: 002\nNOM_AR: مؤسسة النور للخدمات\nNOM_FR: Entreprise Nour Services",
-            "ID: 003\nNOM_AR: شركة المستقبل للتجارة\nNOM_FR: Société Avenir Commerce",
-            "ID: 004\nNOM_AR: تكنولوجي سولوشنز\nNOM_FR: TechSolutions SARL",
-            "ID: 005\nNOM_AR: الشركة الذكية للبرمجيات\nNOM_FR: Smart Software Company"
+            {"id": "001", "nom_ar": "الشركة التونسية للتكنولوجيا", "nom_fr": "Société Tunisienne de Technologie", "forme_juridique": "SA", "statut": "ACTIF"},
+            {"id": "002", "nom_ar": "مؤسسة النور للخدمات", "nom_fr": "Entreprise Nour Services", "forme_juridique": "SUARL", "statut": "ACTIF"},
+            {"id": "003", "nom_ar": "شركة المستقبل للتجارة", "nom_fr": "Société Avenir Commerce", "forme_juridique": "SARL", "statut": "RADIE"},
+            {"id": "004", "nom_ar": "تكنولوجي سولوشنز", "nom_fr": "TechSolutions SARL", "forme_juridique": "SARL", "statut": "ACTIF"},
+            {"id": "005", "nom_ar": "الشركة الذكية للبرمجيات", "nom_fr": "Smart Software Company", "forme_juridique": "SA", "statut": "ACTIF"}
         ]
         
         # Sample hate words/inappropriate content
@@ -103,10 +363,7 @@ def load_sample_data(companies_store, hate_store):
         
         # Add companies to vector store
         if companies_store and len(sample_companies) > 0:
-            companies_store.add_texts(
-                texts=sample_companies,
-                metadatas=[{"type": "company", "id": i+1} for i in range(len(sample_companies))]
-            )
+            add_company_records(companies_store, sample_companies)
         
         # Add hate words to vector store
         if hate_store and len(sample_hate_words) > 0:
@@ -116,6 +373,7 @@ def load_sample_data(companies_store, hate_store):
                 texts=hate_texts,
                 metadatas=hate_metadatas
             )
+            bump_registry_version(hate_store)
         
         return True
         
@@ -123,9 +381,11 @@ def load_sample_data(companies_store, hate_store):
         print(f"Error loading sample data: {str(e)}")
         return False
 
-def validate_environment():
+def validate_environment(backend=DEFAULT_EMBEDDING_BACKEND):
     """Validate that required environment variables and dependencies are available"""
-    required_vars = ["OPENAI_API_KEY", "GROQ_API_KEY"]
+    required_vars = ["GROQ_API_KEY"]
+    if backend_requires_openai_key(backend):
+        required_vars.insert(0, "OPENAI_API_KEY")
     missing_vars = []
     
     for var in required_vars:
@@ -143,6 +403,9 @@ def get_system_info():
         "python_version": os.sys.version,
         "current_directory": os.getcwd(),
         "environment_vars": {
+            "EMBEDDING_BACKEND": os.getenv("EMBEDDING_BACKEND", DEFAULT_EMBEDDING_BACKEND),
+            "CHROMA_SERVER_URL": os.getenv("CHROMA_SERVER_URL", "Not Set (embedded stores)"),
+            "VECTOR_SNAPSHOTS": os.getenv("VECTOR_SNAPSHOTS", "Not Set (Chroma search)"),
             "OPENAI_API_KEY": "Set" if os.getenv("OPENAI_API_KEY") else "Not Set",
             "GROQ_API_KEY": "Set" if os.getenv("GROQ_API_KEY") else "Not Set",
             "LANGCHAIN_TRACING_V2": os.getenv("LANGCHAIN_TRACING_V2", "Not Set"),
@@ -0,0 +1,364 @@
+"""Export Chroma collections to memory-mapped, quantized vector snapshots.
+
+A snapshot directory holds the collection's vectors as an int8 (per-row
+scale) or float16 matrix for scanning, the float32 vectors for exact
+re-scoring, and the IDs, documents and metadata as JSON lines with an offset
+table. Everything is opened with mmap, so several app or service processes
+on one machine share the same page-cached index instead of each loading it.
+
+Usage (from the denomination/ directory):
+    python vector_snapshot.py --dtype int8
+"""
+import argparse
+import json
+import mmap
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+import numpy as np
+from numpy.lib.format import open_memmap
+from langchain_core.documents import Document
+from result_cache import default_registry_versions
+from utils import query_store_by_vectors
+
+DEFAULT_SNAPSHOT_DIR = "./chroma_db/snapshots"
+SNAPSHOT_DTYPES = ("int8", "float16")
+
+# Quantized-scan candidates re-scored exactly per requested result
+DEFAULT_OVERSAMPLE = 8
+
+# Rows scanned per block (bounds the scan's scratch memory)
+SCAN_BLOCK_ROWS = 4096
+
+# Batches this large dequantize each block once for a BLAS matmul; smaller ones use einsum
+BLAS_MIN_QUERIES = 4
+
+# Seconds a registry version read is trusted before is_fresh() reads it again
+FRESHNESS_CHECK_INTERVAL = 2.0
+
+def snapshots_enabled(config=None):
+    """Whether searches may use exported snapshots: config (e.g. st.secrets), then the VECTOR_SNAPSHOTS env var; off by default"""
+    value = (config or {}).get("VECTOR_SNAPSHOTS") or os.getenv("VECTOR_SNAPSHOTS") or ""
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+# ============================================================================
+# DISTANCES
+# ============================================================================
+
+def collection_space(collection):
+    """Distance function of a Chroma collection: 'l2', 'ip' or 'cosine'"""
+    hnsw = (getattr(collection, "configuration", None) or {}).get("hnsw") or {}
+    return hnsw.get("space") or (collection.metadata or {}).get("hnsw:space", "l2")
+
+def chroma_distances(space, dots, query_norms, row_norms):
+    """Chroma distances from dot products: squared L2, 1 - inner product or cosine distance"""
+    if space == "ip":
+        return 1.0 - dots
+    if space == "cosine":
+        return 1.0 - dots / np.maximum(query_norms[:, None] * row_norms[None, :], 1e-12)
+    return np.maximum(query_norms[:, None] ** 2 + row_norms[None, :] ** 2 - 2.0 * dots, 0.0)
+
+def quantize_int8(vectors):
+    """Symmetric per-row int8 quantization: (codes, scales) with vectors ~= codes * scales[:, None]"""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+def snapshot_path(collection_name, directory=DEFAULT_SNAPSHOT_DIR):
+    """Snapshot directory of a collection"""
+    return os.path.join(directory, collection_name)
+
+def export_snapshot(store, path, dtype="int8", version_collection=None, versions=None, batch_size=5000):
+    """Write a Chroma store's vectors, IDs, documents and metadata to a snapshot directory.
+
+    The registry version of version_collection (default: the store's own
+    collection) is read before paging, so a write during the export leaves
+    the snapshot stale rather than silently incomplete. The new snapshot
+    replaces the old one once fully written.
+    """
+    if dtype not in SNAPSHOT_DTYPES:
+        raise ValueError(f"Unknown snapshot dtype {dtype!r}; expected one of {', '.join(SNAPSHOT_DTYPES)}")
+
+    collection = store._collection
+    version_collection = version_collection or collection.name
+    registry_version = (versions or default_registry_versions()).get([version_collection])[0]
+    count = collection.count()
+    if not count:
+        raise ValueError(f"Collection {collection.name} is empty")
+
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    arrays = {}
+    rows = 0
+    with open(os.path.join(tmp_path, "records.jsonl"), "wb") as records:
+        while rows < count:
+            batch = collection.get(
+                include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=rows
+            )
+            if not batch["ids"]:
+                break
+            vectors = np.asarray(batch["embeddings"], dtype=np.float32)[:count - rows]
+            if not arrays:
+                shape = (count, vectors.shape[1])
+                arrays["exact"] = open_memmap(
+                    os.path.join(tmp_path, "vectors.f32.npy"), mode="w+", dtype=np.float32, shape=shape
+                )
+                arrays["scan"] = open_memmap(
+                    os.path.join(tmp_path, f"vectors.{dtype}.npy"), mode="w+", dtype=dtype, shape=shape
+                )
+                arrays["norms"] = open_memmap(
+                    os.path.join(tmp_path, "norms.npy"), mode="w+", dtype=np.float32, shape=(count,)
+                )
+                if dtype == "int8":
+                    arrays["scales"] = open_memmap(
+                        os.path.join(tmp_path, "scales.npy"), mode="w+", dtype=np.float32, shape=(count,)
+                    )
+
+            end = rows + len(vectors)
+            arrays["exact"][rows:end] = vectors
+            arrays["norms"][rows:end] = np.linalg.norm(vectors, axis=1)
+            if dtype == "int8":
+                arrays["scan"][rows:end], arrays["scales"][rows:end] = quantize_int8(vectors)
+            else:
+                arrays["scan"][rows:end] = vectors.astype(np.float16)
+
+            for chroma_id, document, metadata in zip(batch["ids"], batch["documents"], batch["metadatas"]):
+                if rows == end:
+                    break
+                records.write(json.dumps(
+                    {"id": chroma_id, "document": document, "metadata": metadata or {}}, ensure_ascii=False
+                ).encode("utf-8") + b"\n")
+                rows += 1
+                offsets[rows] = records.tell()
+
+    for array in arrays.values():
+        array.flush()
+    np.save(os.path.join(tmp_path, "offsets.npy"), offsets[:rows + 1])
+
+    manifest = {
+        "collection": collection.name,
+        "rows": rows,
+        "dimensions": arrays["exact"].shape[1],
+        "dtype": dtype,
+        "space": collection_space(collection),
+        "version_collection": version_collection,
+        "registry_version": registry_version,
+        "created_at": time.time()
+    }
+    with open(os.path.join(tmp_path, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    arrays.clear()
+
+    # Processes with the old snapshot mapped keep reading its (unlinked) files
+    old_path = f"{path}.old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return manifest
+
+# ============================================================================
+# QUERY ENGINE
+# ============================================================================
+
+class SnapshotIndex:
+    """Top-k search over a memory-mapped snapshot, with exact re-scoring.
+
+    Queries scan the quantized matrix block by block with one vectorized
+    product per block, keep the k * oversample nearest rows by approximate distance, and
+    re-score those rows exactly from the float32 vectors, so the returned
+    distances are the ones Chroma computes. Only the scan matrix is read in
+    full; the float32 vectors and the records are touched for candidates only.
+    """
+
+    def __init__(self, path, versions=None):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.rows = self.manifest["rows"]
+        self.space = self.manifest["space"]
+        self.versions = versions or default_registry_versions()
+        self._fresh = True
+        self._checked_at = float("-inf")
+
+        def load(name):
+            return np.load(os.path.join(path, name), mmap_mode="r")[:self.rows]
+
+        self.scan = load(f"vectors.{self.manifest['dtype']}.npy")
+        self.exact = load("vectors.f32.npy")
+        self.norms = load("norms.npy")
+        self.scales = load("scales.npy") if self.manifest["dtype"] == "int8" else None
+        self.offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+
+        with open(os.path.join(path, "records.jsonl"), "rb") as f:
+            self._records = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def is_fresh(self):
+        """True while the registry is at the version the snapshot was exported from.
+
+        The version is read at most every FRESHNESS_CHECK_INTERVAL seconds, and
+        not at all once a write made the snapshot stale: versions only go up.
+        """
+        now = time.monotonic()
+        if self._fresh and now - self._checked_at >= FRESHNESS_CHECK_INTERVAL:
+            self._checked_at = now
+            current = self.versions.get([self.manifest["version_collection"]])[0]
+            self._fresh = current == self.manifest["registry_version"]
+        return self._fresh
+
+    def _record(self, row):
+        return json.loads(self._records[int(self.offsets[row]):int(self.offsets[row + 1])])
+
+    def _candidates(self, queries, query_norms, n_candidates):
+        """(rows, approximate distances) of the n_candidates nearest rows per query"""
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_distances = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, self.rows, SCAN_BLOCK_ROWS):
+            stop = min(start + SCAN_BLOCK_ROWS, self.rows)
+            block = self.scan[start:stop]
+            if len(queries) < BLAS_MIN_QUERIES:
+                # einsum accumulates the rows in float32 without a dequantized copy of the block
+                dots = np.einsum('rd,qd->qr', block, queries, dtype=np.float32)
+            else:
+                dots = queries @ block.astype(np.float32).T
+            if self.scales is not None:
+                dots *= self.scales[start:stop]
+            distances = chroma_distances(self.space, dots, query_norms, self.norms[start:stop])
+
+            # Keep the block's own nearest rows, then merge them into the running candidates
+            if distances.shape[1] > n_candidates:
+                keep = np.argpartition(distances, n_candidates - 1, axis=1)[:, :n_candidates]
+                distances = np.take_along_axis(distances, keep, axis=1)
+                rows = keep + start
+            else:
+                rows = np.broadcast_to(np.arange(start, stop), distances.shape)
+            best_rows = np.concatenate([best_rows, rows], axis=1)
+            best_distances = np.concatenate([best_distances, distances], axis=1)
+            if best_rows.shape[1] > n_candidates:
+                keep = np.argpartition(best_distances, n_candidates - 1, axis=1)[:, :n_candidates]
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+                best_distances = np.take_along_axis(best_distances, keep, axis=1)
+        return best_rows
+
+    def search(self, query_embeddings, k=5, oversample=DEFAULT_OVERSAMPLE):
+        """One [(Document, distance)] list per query vector, nearest first"""
+        if not len(query_embeddings):
+            return []
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        query_norms = np.linalg.norm(queries, axis=1)
+        candidates = self._candidates(queries, query_norms, min(self.rows, k * oversample))
+
+        results = []
+        for query, query_norm, rows in zip(queries, query_norms, candidates):
+            # Sorted rows read the float32 vectors in file order
+            rows = np.sort(rows)
+            distances = chroma_distances(
+                self.space, (self.exact[rows] @ query)[None, :], query_norm[None], self.norms[rows]
+            )[0]
+            hits = []
+            for i in np.argsort(distances, kind="stable")[:k]:
+                record = self._record(rows[i])
+                hits.append((
+                    Document(page_content=record["document"], metadata=record["metadata"], id=record["id"]),
+                    float(distances[i])
+                ))
+            results.append(hits)
+        return results
+
+def open_snapshot(path, versions=None):
+    """SnapshotIndex for a snapshot directory, or None if there is none"""
+    if not os.path.exists(os.path.join(path, "manifest.json")):
+        return None
+    try:
+        return SnapshotIndex(path, versions)
+    except Exception as e:
+        print(f"Error opening vector snapshot {path}: {str(e)}")
+        return None
+
+# ============================================================================
+# SNAPSHOT-BACKED COMPANIES STORE
+# ============================================================================
+
+class SnapshotCompanyStore:
+    """The companies store with its exported snapshot in front of Chroma.
+
+    Unfiltered searches are answered from the snapshot while the registry is
+    at the version it was exported from; filtered or stale ones go to Chroma
+    as before. Other attributes (embeddings, _collection, add_texts...) are
+    the wrapped store's, so this is passed wherever a companies store is.
+    """
+
+    def __init__(self, companies_store, snapshot):
+        self.companies_store = companies_store
+        self.snapshot = snapshot
+        self._sources = Counter()
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name == "companies_store":
+            raise AttributeError(name)
+        return getattr(self.companies_store, name)
+
+    def search_by_vectors(self, query_embeddings, k=5, where=None):
+        """One [(Document, distance)] list per query vector, from the snapshot when it is fresh"""
+        if not query_embeddings:
+            return []
+        source = "snapshot" if where is None and self.snapshot.is_fresh() else "chroma"
+        with self._lock:
+            self._sources[source] += len(query_embeddings)
+        if source == "snapshot":
+            return self.snapshot.search(query_embeddings, k=k)
+        return query_store_by_vectors(self.companies_store, query_embeddings, k=k, where=where)
+
+    def source_stats(self):
+        """Company queries answered per source: the snapshot or Chroma"""
+        with self._lock:
+            return dict(self._sources)
+
+def attach_snapshot(companies_store, directory=DEFAULT_SNAPSHOT_DIR):
+    """The companies store wrapped with its exported snapshot, or the store itself if it has none"""
+    snapshot = open_snapshot(snapshot_path(companies_store._collection.name, directory))
+    return companies_store if snapshot is None else SnapshotCompanyStore(companies_store, snapshot)
+
+if __name__ == "__main__":
+    from embedding_providers import EMBEDDING_BACKENDS, get_embedding_backend
+    from utils import initialize_vector_stores
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dtype", choices=SNAPSHOT_DTYPES, default="int8", help="Scan matrix precision")
+    parser.add_argument("--directory", default=DEFAULT_SNAPSHOT_DIR, help="Snapshot root directory")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Vectors read per page")
+    parser.add_argument(
+        "--embedding-backend", choices=list(EMBEDDING_BACKENDS),
+        help="Embedding backend (default: EMBEDDING_BACKEND env var, else openai)"
+    )
+    args = parser.parse_args()
+
+    companies_store, _ = initialize_vector_stores(
+        os.getenv("OPENAI_API_KEY"), args.embedding_backend or get_embedding_backend()
+    )
+    if not companies_store:
+        sys.exit("Could not open the companies vector store")
+
+    start = time.perf_counter()
+    manifest = export_snapshot(
+        companies_store, snapshot_path(companies_store._collection.name, args.directory), dtype=args.dtype,
+        batch_size=args.batch_size
+    )
+    print(
+        f"{manifest['collection']}: {manifest['rows']:,} vectors ({manifest['dtype']}) "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
@@ -6,4 +6,5 @@ urlpatterns = [
     path('SimulateurDenomination.html', views.simulateur, name='simulateur'),
     path('Chatbot.html', views.Chatter, name='ChatBot'),
     path('api/chatbot/', views.chatbot_api, name='chatbot_api'),
+    path('api/denomination/', views.denomination_api, name='denomination_api'),
 ]
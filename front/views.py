@@ -57,3 +57,25 @@ def chatbot_api(request):
                 return JsonResponse({'error': 'LLM API error'}, status=500)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
+
+@csrf_exempt
+def denomination_api(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    try:
+        data = json.loads(request.body)
+        name = data.get('name', '')
+        if not name or not name.strip():
+            return JsonResponse({'error': 'No name provided'}, status=400)
+
+        # Headless validator from denomination/service.py
+        service_url = getattr(settings, 'DENOMINATION_SERVICE_URL', 'http://127.0.0.1:8502')
+        response = requests.post(f'{service_url}/analyze', json={'name': name}, timeout=30)
+        if response.status_code == 200:
+            return JsonResponse(response.json())
+        else:
+            return JsonResponse({'error': 'Denomination service error'}, status=502)
+    except requests.RequestException:
+        return JsonResponse({'error': 'Denomination service unavailable'}, status=503)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)